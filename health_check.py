@@ -2,11 +2,18 @@
 """
 Health check script for Rental Contract RAG Demo
 Run this script to verify that everything is set up correctly.
+
+Pass --url to also check the /healthz and /readyz endpoints of a running app:
+    python health_check.py --url http://localhost:8050
 """
 
+import argparse
+import json
 import sys
 import os
 import importlib
+import urllib.error
+import urllib.request
 from pathlib import Path
 
 
@@ -107,8 +114,49 @@ def check_imports():
     return all_imported
 
 
+def get_endpoint(url, timeout=2):
+    """GET an endpoint and return its status code and JSON body."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def check_endpoints(base_url):
+    """Check that a running app is alive and ready to serve."""
+    base_url = base_url.rstrip("/")
+    try:
+        status_code, _ = get_endpoint(f"{base_url}/healthz")
+    except Exception as e:
+        print(f"❌ /healthz ({e})")
+        return False
+    if status_code != 200:
+        print(f"❌ /healthz (HTTP {status_code})")
+        return False
+    print("✅ /healthz")
+
+    status_code, body = get_endpoint(f"{base_url}/readyz")
+    if status_code == 200:
+        print("✅ /readyz")
+        return True
+
+    print(f"❌ /readyz ({body.get('status', f'HTTP {status_code}')})")
+    for check, passed in body.get("checks", {}).items():
+        print(f"   {'✅' if passed else '⏳'} {check}")
+    if body.get("error"):
+        print(f"   Error: {body['error']}")
+    return False
+
+
 def main():
     """Run all health checks."""
+    parser = argparse.ArgumentParser(description="Check the Rental Contract RAG setup")
+    parser.add_argument(
+        "--url", help="Also check a running app, e.g. http://localhost:8050"
+    )
+    args = parser.parse_args()
+
     print("🏥 Rental Contract RAG Health Check")
     print("=" * 40)
 
@@ -119,6 +167,8 @@ def main():
         ("Data Directories", check_data_directories),
         ("Module Imports", check_imports),
     ]
+    if args.url:
+        checks.append(("Service Endpoints", lambda: check_endpoints(args.url)))
 
     results = []
     for name, check_func in checks:
@@ -2,17 +2,44 @@ import os
 from dash import Dash
 import dash_bootstrap_components as dbc
 
+from config import DASH_HOST, DASH_PORT, RAG_CHAIN_STARTUP, configure_tracing
+from services.health_service import Readiness, register_health_routes
+from startup import LazyRAGChain
 from ui.layout import create_layout
 from ui.callbacks import register_callbacks
-from rag import RAGChain
 
 
-def create_app():
-    """Create and configure the Dash app"""
+def create_rag_chain():
+    """Build the RAG chain, importing the LLM and vector store libraries"""
+    from rag import RAGChain
+    import services.job_service  # noqa: F401 - so the first validation doesn't wait on it
+
+    return RAGChain()
+
+
+def create_app(rag_chain_startup: str = RAG_CHAIN_STARTUP):
+    """Create and configure the Dash app.
+
+    With ``rag_chain_startup`` "background" or "lazy" the RAG chain is built in
+    a warm-up thread or on first use, so the server can start right away.
+    Unless lazy, the warm-up also runs a probe query and fills the sample
+    contract caches, after which ``/readyz`` reports the app as ready.
+    """
+    configure_tracing()
     app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
     # Initialize RAG chain
-    rag_chain = RAGChain()
+    if rag_chain_startup == "eager":
+        rag_chain = create_rag_chain()
+    else:
+        rag_chain = LazyRAGChain(create_rag_chain)
+    app.rag_chain = rag_chain
+
+    # Health checks, with a warm-up that builds a lazy chain too
+    app.readiness = Readiness(rag_chain)
+    if rag_chain_startup != "lazy":
+        app.readiness.start()
+    register_health_routes(app.server, app.readiness)
 
     # Set layout
     app.layout = create_layout()
@@ -28,8 +55,8 @@ if __name__ == "__main__":
 
     # Get configuration from environment variables
     debug_mode = os.getenv("DEBUG_MODE", "false").lower() == "true"
-    host = os.getenv("DASH_HOST", "0.0.0.0")
-    port = int(os.getenv("DASH_PORT", "8050"))
+    host = DASH_HOST
+    port = DASH_PORT
 
     # Determine the display URL based on the host
     if host == "0.0.0.0":
@@ -0,0 +1,408 @@
+"""Validate many contracts from the command line
+
+Usage:
+    python src/batch_validation.py contracts/ --output results.jsonl
+    python src/batch_validation.py manifest.txt --output results.parquet
+    python src/batch_validation.py contracts/ --batch-api openai
+
+The source is a directory, searched recursively for PDFs, or a manifest file
+with one PDF path per line (relative paths are relative to the manifest).
+
+PDFs are parsed in a process pool, since OCR is CPU bound, and each parsed
+contract is handed to a thread pool that extracts its information and runs the
+validators, since those calls mostly wait on the LLM. With ``--batch-api`` the
+LLM requests of all contracts are instead sent as provider-side batch jobs,
+one for extraction and one for validation. Every contract is
+appended to a JSONL file as soon as it is finished, so an interrupted run can
+be started again and skips the contracts that are already done.
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+
+from config import BATCH_LLM_WORKERS, BATCH_OCR_WORKERS, LLM_BATCH_BACKEND
+from contract_loader import (
+    extract_contract_info,
+    hash_file_contents,
+    parse_contract_pdf_to_text,
+)
+from llm_batch import BatchBackend, extract_contract_infos_in_batch, get_batch_backend
+from rag import RAGChain
+from services.validation_service import (
+    validate_contract_info,
+    validate_contract_infos_in_batch,
+)
+
+STAGES = ["parse", "extract", "validate"]
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def find_contract_files(source: str | Path) -> list[Path]:
+    """List the PDFs in a directory, or the PDFs listed in a manifest file"""
+    source = Path(source)
+    if source.is_dir():
+        return sorted(
+            path for path in source.rglob("*") if path.suffix.lower() == ".pdf"
+        )
+
+    file_paths = []
+    for line in source.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            file_paths.append(source.parent / line)
+    return file_paths
+
+
+def get_results_path(output_path: str | Path) -> Path:
+    """Get the JSONL file results are appended to while a batch runs"""
+    return Path(output_path).with_suffix(".jsonl")
+
+
+def load_completed(results_path: Path) -> set[str]:
+    """Get the content hashes of contracts already validated in earlier runs"""
+    completed = set()
+    if not results_path.exists():
+        return completed
+
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partly written line from a crashed run
+            if record.get("status") == STATUS_DONE:
+                completed.add(record["sha256"])
+    return completed
+
+
+def _parse_contract(file_path: str, file_hash: str) -> dict:
+    """Parse one contract, OCR'ing its pages in this worker process"""
+    start = time.perf_counter()
+    try:
+        contract = parse_contract_pdf_to_text(file_path, ocr_workers=1)
+        error = None
+    except Exception as e:
+        contract, error = None, str(e)
+    return {
+        "file": file_path,
+        "sha256": file_hash,
+        "contract": contract,
+        "error": error,
+        "timings": {"parse": time.perf_counter() - start},
+    }
+
+
+def _validate_contract(rag_chain, parsed: dict) -> dict:
+    """Extract contract information and run the validators one after another"""
+    record = {
+        "file": parsed["file"],
+        "sha256": parsed["sha256"],
+        "status": STATUS_DONE,
+        "error": None,
+        "timings": dict(parsed["timings"]),
+    }
+    try:
+        start = time.perf_counter()
+        contract_info = extract_contract_info(parsed["contract"])
+        record["timings"]["extract"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # The thread pool already caps concurrent LLM calls across contracts
+        results = validate_contract_info(rag_chain, contract_info, concurrent=False)
+        record["timings"]["validate"] = time.perf_counter() - start
+    except Exception as e:
+        record["status"] = STATUS_FAILED
+        record["error"] = str(e)
+        return record
+
+    record["contract_info"] = contract_info.model_dump()
+    for name, result in results.items():
+        record[name] = result.model_dump()
+    return record
+
+
+def _validate_in_batch(
+    rag_chain, parsed_contracts: list[dict], backend: BatchBackend
+) -> list[dict]:
+    """Extract and validate parsed contracts with one batch job per stage"""
+    contracts = {parsed["sha256"]: parsed["contract"] for parsed in parsed_contracts}
+
+    start = time.perf_counter()
+    contract_infos, errors = extract_contract_infos_in_batch(contracts, backend)
+    extract_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results, validation_errors = validate_contract_infos_in_batch(
+        rag_chain, contract_infos, backend
+    )
+    validate_seconds = time.perf_counter() - start
+    errors.update(validation_errors)
+
+    records = []
+    for parsed in parsed_contracts:
+        contract_id = parsed["sha256"]
+        record = {
+            "file": parsed["file"],
+            "sha256": contract_id,
+            "status": STATUS_DONE,
+            "error": errors.get(contract_id),
+            "timings": dict(parsed["timings"]),
+        }
+        if record["error"]:
+            record["status"] = STATUS_FAILED
+        else:
+            # Every contract in a batch waits for the whole batch job
+            record["timings"]["extract"] = extract_seconds
+            record["timings"]["validate"] = validate_seconds
+            record["contract_info"] = contract_infos[contract_id].model_dump()
+            for name, result in results[contract_id].items():
+                record[name] = result.model_dump()
+        records.append(record)
+    return records
+
+
+def _iter_parsed(pending: list[tuple[str, str]], ocr_workers: int):
+    """Parse contracts, yielding each one as soon as it is ready.
+
+    At most twice as many contracts as there are workers are parsed ahead of
+    the consumer, so a large batch is not held in memory all at once.
+    """
+    if ocr_workers <= 1:
+        for file_path, file_hash in pending:
+            yield _parse_contract(file_path, file_hash)
+        return
+
+    items = iter(pending)
+    with ProcessPoolExecutor(max_workers=ocr_workers) as pool:
+        in_flight = set()
+        while True:
+            for item in items:
+                in_flight.add(pool.submit(_parse_contract, *item))
+                if len(in_flight) >= 2 * ocr_workers:
+                    break
+            if not in_flight:
+                return
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def write_parquet(results_path: Path, output_path: Path):
+    """Convert the latest result of each contract to a Parquet file.
+
+    Nested results are stored as JSON strings, since their keys vary between
+    contracts. Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Writing Parquet requires pyarrow: pip install pyarrow"
+        ) from e
+
+    records = {}
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            # Files that could not be read have no content hash
+            records[record["sha256"] or record["file"]] = record
+
+    rows = [
+        {
+            key: json.dumps(value, ensure_ascii=False)
+            if isinstance(value, dict)
+            else value
+            for key, value in record.items()
+        }
+        for record in records.values()
+    ]
+    pq.write_table(pa.Table.from_pylist(rows), output_path)
+
+
+def validate_contracts(
+    file_paths: list[str | Path],
+    output_path: str | Path,
+    rag_chain,
+    ocr_workers: int = BATCH_OCR_WORKERS,
+    llm_workers: int = BATCH_LLM_WORKERS,
+    resume: bool = True,
+    batch_backend: BatchBackend | None = None,
+) -> dict:
+    """Validate contracts and write one result per contract to ``output_path``.
+
+    Results are written as JSONL, or converted to Parquet at the end if the
+    output path ends in ``.parquet``. With a ``batch_backend``, the LLM
+    requests of all contracts are sent as provider-side batch jobs instead of
+    one at a time. Returns the run's throughput metrics.
+    """
+    start = time.perf_counter()
+    output_path = Path(output_path)
+    results_path = get_results_path(output_path)
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    if not resume:
+        results_path.unlink(missing_ok=True)
+
+    completed = load_completed(results_path)
+    pending, unreadable = [], []
+    for file_path in file_paths:
+        try:
+            file_hash = hash_file_contents(str(file_path))
+        except OSError as e:
+            unreadable.append(
+                {
+                    "file": str(file_path),
+                    "sha256": None,
+                    "status": STATUS_FAILED,
+                    "error": str(e),
+                    "timings": {},
+                }
+            )
+            continue
+        if file_hash not in completed:
+            pending.append((str(file_path), file_hash))
+            completed.add(file_hash)  # Duplicates in the batch are validated once
+    skipped = len(file_paths) - len(pending) - len(unreadable)
+    print(f"Validating {len(pending)} contracts, skipping {skipped} already done")
+
+    stage_counts = dict.fromkeys(STAGES, 0)
+    stage_seconds = dict.fromkeys(STAGES, 0.0)
+    status_counts = {STATUS_DONE: 0, STATUS_FAILED: 0}
+    write_lock = threading.Lock()
+
+    with open(results_path, "a", encoding="utf-8") as results_file:
+
+        def write_record(record):
+            with write_lock:
+                results_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                results_file.flush()
+                status_counts[record["status"]] += 1
+                for stage, seconds in record["timings"].items():
+                    stage_counts[stage] += 1
+                    stage_seconds[stage] += seconds
+            if record["error"]:
+                print(f"Failed to validate {record['file']}: {record['error']}")
+
+        for record in unreadable:
+            write_record(record)
+
+        # Parsed contracts waiting for an LLM worker, capped like the parse window
+        llm_workers = max(1, llm_workers)
+        llm_slots = threading.BoundedSemaphore(2 * llm_workers)
+
+        def validate_and_write(parsed):
+            try:
+                write_record(_validate_contract(rag_chain, parsed))
+            finally:
+                llm_slots.release()
+
+        with ThreadPoolExecutor(
+            max_workers=llm_workers, thread_name_prefix="batch-validation"
+        ) as llm_pool:
+            futures, parsed_contracts = [], []
+            for parsed in _iter_parsed(pending, ocr_workers):
+                if parsed["error"]:
+                    del parsed["contract"]
+                    write_record({**parsed, "status": STATUS_FAILED})
+                elif batch_backend is not None:
+                    parsed_contracts.append(parsed)
+                else:
+                    llm_slots.acquire()
+                    futures.append(llm_pool.submit(validate_and_write, parsed))
+            for future in futures:
+                future.result()
+
+        if parsed_contracts:
+            for record in _validate_in_batch(
+                rag_chain, parsed_contracts, batch_backend
+            ):
+                write_record(record)
+
+    if output_path.suffix.lower() == ".parquet":
+        write_parquet(results_path, output_path)
+
+    seconds = time.perf_counter() - start
+    metrics = {
+        "files": len(file_paths),
+        "skipped": skipped,
+        "done": status_counts[STATUS_DONE],
+        "failed": status_counts[STATUS_FAILED],
+        "seconds": seconds,
+        "stages": {
+            stage: {
+                "files": stage_counts[stage],
+                "files_per_second": stage_counts[stage] / seconds if seconds else 0.0,
+                "average_seconds": (
+                    stage_seconds[stage] / stage_counts[stage]
+                    if stage_counts[stage]
+                    else 0.0
+                ),
+            }
+            for stage in STAGES
+        },
+    }
+
+    print(
+        f"Validated {metrics['done']} contracts ({metrics['failed']} failed) "
+        f"in {seconds:.1f}s"
+    )
+    for stage, stats in metrics["stages"].items():
+        print(
+            f"  {stage}: {stats['files']} files, "
+            f"{stats['files_per_second']:.2f} files/s, "
+            f"{stats['average_seconds']:.2f}s per file"
+        )
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate many rental contracts")
+    parser.add_argument("source", help="Directory of PDFs or manifest of PDF paths")
+    parser.add_argument(
+        "--output",
+        default="batch_results.jsonl",
+        help="Output file, .jsonl or .parquet (default: batch_results.jsonl)",
+    )
+    parser.add_argument("--ocr-workers", type=int, default=BATCH_OCR_WORKERS)
+    parser.add_argument("--llm-workers", type=int, default=BATCH_LLM_WORKERS)
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Validate all contracts again instead of skipping finished ones",
+    )
+    parser.add_argument(
+        "--batch-api",
+        nargs="?",
+        const=LLM_BATCH_BACKEND,
+        choices=["openai", "local"],
+        help="Send LLM requests as provider-side batch jobs "
+        f"(default backend: {LLM_BATCH_BACKEND})",
+    )
+    args = parser.parse_args()
+
+    validate_contracts(
+        find_contract_files(args.source),
+        args.output,
+        RAGChain(),
+        ocr_workers=args.ocr_workers,
+        llm_workers=args.llm_workers,
+        resume=not args.no_resume,
+        batch_backend=get_batch_backend(args.batch_api) if args.batch_api else None,
+    )
+
+
+if __name__ == "__main__":
+    main()
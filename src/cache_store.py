@@ -0,0 +1,492 @@
+"""Bounded on-disk cache with size and age based eviction, and an in-memory tier
+
+Files are written to a temporary file and renamed into place, so readers in
+other threads and processes see either the old file or the whole new one.
+Computing a missing entry is done under a per-key lock, which with ``fcntl``
+also holds across processes, so concurrent requests for the same contract
+wait for one OCR run or LLM call instead of each making their own.
+
+Usage:
+    python src/cache_store.py stats
+    python src/cache_store.py prune [--namespace ocr]
+    python src/cache_store.py clear [--namespace uploads]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from config import CACHE_DIR, CACHE_MAX_BYTES, CACHE_TTL_DAYS, MEMORY_CACHE_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows: keys are only locked within the process
+    fcntl = None
+
+# Lock files per namespace; keys sharing a lock file only wait on each other
+LOCK_STRIPES = 64
+# Temporary files of writers that crashed are removed by prune after this long
+STALE_TEMP_FILE_SECONDS = 60 * 60
+# Writes only scan the namespace once the bytes written since the last scan take
+# it over max_bytes, or this long after it, to expire files and see other processes
+PRUNE_INTERVAL_SECONDS = 60
+# Pruning after a write evicts down to this fraction of max_bytes, so a full
+# cache is not scanned again on the very next write
+PRUNE_LOW_WATER_RATIO = 0.9
+
+
+class CacheStore:
+    """A namespaced directory of cache files evicted by age (TTL) and LRU by size"""
+
+    def __init__(
+        self,
+        namespace: str,
+        root: Path = CACHE_DIR,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl_seconds: float | None = CACHE_TTL_DAYS * 24 * 60 * 60,
+    ):
+        self.namespace = namespace
+        self.directory = Path(root) / namespace
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        # Size of the namespace as of the last scan plus the bytes written since
+        self._estimated_bytes = None
+        self._last_prune = 0.0
+        self._prune_lock = threading.Lock()
+
+    @staticmethod
+    def key_to_file_name(key: str, suffix: str = ".json") -> str:
+        """Hash an arbitrary cache key into a file name"""
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + suffix
+
+    def _is_expired(self, path: Path, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - path.stat().st_mtime > self.ttl_seconds
+
+    def get_file(self, file_name: str) -> Path | None:
+        """Get the path of a cached file, or None if it is missing or expired"""
+        path = self.directory / file_name
+        now = time.time()
+        try:
+            if self._is_expired(path, now):
+                path.unlink(missing_ok=True)
+                return None
+            # Record the access explicitly, filesystems are often mounted noatime
+            os.utime(path, (now, path.stat().st_mtime))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put_file(self, file_name: str, data: bytes) -> Path:
+        """Atomically write a file to the cache and evict old entries if over budget.
+
+        The namespace is only scanned when the running size estimate crosses
+        max_bytes or the last scan is PRUNE_INTERVAL_SECONDS old, so filling
+        a cache with many small files doesn't scan it on every write.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / file_name
+        fd, temp_name = tempfile.mkstemp(
+            dir=self.directory, prefix=f".{file_name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_name, path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+        if self._record_write(len(data)):
+            self.prune(
+                keep=path, target_bytes=int(self.max_bytes * PRUNE_LOW_WATER_RATIO)
+            )
+        return path
+
+    def _record_write(self, size: int) -> bool:
+        """Add a write to the size estimate, returning whether a prune is due"""
+        with self._prune_lock:
+            if self._estimated_bytes is None:
+                return True
+            self._estimated_bytes += size
+            return (
+                self._estimated_bytes > self.max_bytes
+                or time.time() - self._last_prune > PRUNE_INTERVAL_SECONDS
+            )
+
+    def get_json(self, key: str) -> dict | None:
+        """Load a cached JSON value, or None on a cache miss"""
+        path = self.get_file(self.key_to_file_name(key))
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None  # Evicted by another process since get_file
+        except ValueError as e:
+            # Left behind by a writer before writes were atomic, recompute it
+            print(f"Removing unreadable cache file {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """Hold the lock of a key, across threads and (with fcntl) processes"""
+        with self._key_locks_lock:
+            key_lock, users = self._key_locks.get(key, (threading.Lock(), 0))
+            self._key_locks[key] = (key_lock, users + 1)
+        try:
+            with key_lock, self._file_lock(key):
+                yield
+        finally:
+            with self._key_locks_lock:
+                key_lock, users = self._key_locks[key]
+                if users == 1:
+                    del self._key_locks[key]
+                else:
+                    self._key_locks[key] = (key_lock, users - 1)
+
+    @contextmanager
+    def _file_lock(self, key: str) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        stripe = int(self.key_to_file_name(key, suffix=""), 16) % LOCK_STRIPES
+        lock_directory = self.directory / ".locks"
+        lock_directory.mkdir(parents=True, exist_ok=True)
+        with open(lock_directory / f"{stripe}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def set_json(self, key: str, data: dict) -> Path:
+        """Store a JSON value in the cache"""
+        content = json.dumps(data, ensure_ascii=False, indent=2)
+        return self.put_file(self.key_to_file_name(key), content.encode("utf-8"))
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        if not self.directory.exists():
+            return []
+        entries = []
+        for path in self.directory.iterdir():
+            if path.name.startswith("."):
+                continue  # Temporary files being written, and the lock files
+            try:
+                if path.is_file():
+                    entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue  # Removed by another process while listing
+        return entries
+
+    def stats(self) -> dict:
+        """Get the number of files and total size of this namespace"""
+        entries = self._entries()
+        return {
+            "namespace": self.namespace,
+            "files": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def prune(self, keep: Path | None = None, target_bytes: int | None = None) -> dict:
+        """Remove expired files, then least recently used files until under max_bytes.
+
+        With ``target_bytes`` the least recently used files are removed until
+        under that size instead, once the namespace is over max_bytes.
+        """
+        now = time.time()
+        self._remove_stale_temp_files(now)
+        removed = 0
+        freed_bytes = 0
+        remaining = []
+        for path, stat in self._entries():
+            if self.ttl_seconds and now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                removed += 1
+                freed_bytes += stat.st_size
+            else:
+                remaining.append((path, stat))
+
+        total_bytes = sum(stat.st_size for _, stat in remaining)
+        if target_bytes is None or total_bytes <= self.max_bytes:
+            target_bytes = self.max_bytes
+        for path, stat in sorted(remaining, key=lambda entry: entry[1].st_atime):
+            if total_bytes <= target_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+            freed_bytes += stat.st_size
+            total_bytes -= stat.st_size
+
+        with self._prune_lock:
+            self._estimated_bytes = total_bytes
+            self._last_prune = now
+        return {
+            "namespace": self.namespace,
+            "removed": removed,
+            "freed_bytes": freed_bytes,
+            "bytes": total_bytes,
+        }
+
+    def _remove_stale_temp_files(self, now: float):
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob(".*.tmp"):
+            try:
+                if now - path.stat().st_mtime > STALE_TEMP_FILE_SECONDS:
+                    path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                continue  # Renamed into place meanwhile
+
+    def clear(self) -> dict:
+        """Remove every file in this namespace"""
+        entries = self._entries()
+        for path, _ in entries:
+            path.unlink(missing_ok=True)
+        with self._prune_lock:
+            self._estimated_bytes = 0
+            self._last_prune = time.time()
+        return {
+            "namespace": self.namespace,
+            "removed": len(entries),
+            "freed_bytes": sum(stat.st_size for _, stat in entries),
+            "bytes": 0,
+        }
+
+
+class ModelCache:
+    """In-memory LRU of parsed Pydantic models in front of a CacheStore.
+
+    Memory hits skip both disk I/O and JSON decoding. Cached models are shared
+    between callers, so use ``model_copy`` instead of mutating them.
+    """
+
+    def __init__(
+        self,
+        store: CacheStore,
+        model_class: type[BaseModel],
+        maxsize: int = MEMORY_CACHE_SIZE,
+    ):
+        self.store = store
+        self.model_class = model_class
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: BaseModel):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> BaseModel | None:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        data = self.store.get_json(key)
+        if data is None:
+            return None
+
+        value = self.model_class(**data)
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    def get(self, key: str) -> BaseModel | None:
+        """Get a cached model from memory, falling back to the disk store"""
+        value = self._lookup(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    def set(self, key: str, value: BaseModel):
+        """Store a model in memory and on disk"""
+        self.store.set_json(key, value.model_dump())
+        self._remember(key, value)
+
+    def get_or_create(self, key: str, factory: Callable[[], BaseModel]) -> BaseModel:
+        """Get a cached model, or create and store it if missing.
+
+        Concurrent callers missing the same key, in this or another process,
+        wait for the first one to create it and then read its result.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self.store.lock(key):
+            value = self._lookup(key)  # Created while waiting for the lock
+            if value is None:
+                value = factory()
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        """Drop the in-memory tier, leaving the disk store untouched"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> dict:
+        """Get hit/miss counters for both cache tiers"""
+        with self._lock:
+            return {
+                "namespace": self.store.namespace,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+class SemanticAnswerCache:
+    """Cache of RAG answers keyed on the question and the context it was answered with.
+
+    The context key should identify everything besides the question that shapes
+    the answer (retrieved documents, prompt template and model). With a
+    ``similarity_threshold`` a near-identical question asked with the same
+    context is also a hit, as long as it mentions exactly the same numbers.
+    """
+
+    def __init__(
+        self,
+        store: CacheStore,
+        model_class: type[BaseModel],
+        similarity_threshold: float | None = None,
+        maxsize: int = MEMORY_CACHE_SIZE,
+    ):
+        self.store = store
+        self.answers = ModelCache(store, model_class, maxsize)
+        self.similarity_threshold = similarity_threshold
+        self._questions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Lowercase and collapse whitespace and trailing punctuation"""
+        return " ".join(question.lower().split()).rstrip("?.! ")
+
+    @staticmethod
+    def make_context_key(document_ids: list[str], prompt: str, model_name: str) -> str:
+        """Build a key for the retrieved documents, prompt template and model"""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{model_name}:{prompt_hash}:{','.join(document_ids)}"
+
+    def _answer_key(self, question: str, context_key: str) -> str:
+        return f"answer:{context_key}:{question}"
+
+    def _index_key(self, context_key: str) -> str:
+        return f"questions:{context_key}"
+
+    def _known_questions(self, context_key: str) -> list[str]:
+        with self._lock:
+            if context_key not in self._questions:
+                index = self.store.get_json(self._index_key(context_key)) or {}
+                self._questions[context_key] = index.get("questions", [])
+            return list(self._questions[context_key])
+
+    def _find_similar(self, question: str, context_key: str) -> str | None:
+        numbers = re.findall(r"\d+", question)
+        best_question, best_ratio = None, self.similarity_threshold
+        for known in self._known_questions(context_key):
+            if re.findall(r"\d+", known) != numbers:
+                continue
+            ratio = SequenceMatcher(None, question, known).ratio()
+            if ratio >= best_ratio:
+                best_question, best_ratio = known, ratio
+        return best_question
+
+    def get(self, question: str, context_key: str) -> BaseModel | None:
+        """Get a cached answer for a question asked with the given context"""
+        question = self.normalize_question(question)
+        answer = self.answers.get(self._answer_key(question, context_key))
+        if answer is not None or self.similarity_threshold is None:
+            return answer
+
+        similar = self._find_similar(question, context_key)
+        if similar is None:
+            return None
+        return self.answers.get(self._answer_key(similar, context_key))
+
+    def set(self, question: str, context_key: str, answer: BaseModel):
+        """Store the answer to a question asked with the given context.
+
+        The question index is shared with other processes, so it is read again
+        under the store lock and the question is added to what is on disk.
+        """
+        question = self.normalize_question(question)
+        self.answers.set(self._answer_key(question, context_key), answer)
+
+        index_key = self._index_key(context_key)
+        with self.store.lock(index_key):
+            questions = (self.store.get_json(index_key) or {}).get("questions", [])
+            if question not in questions:
+                questions.append(question)
+                self.store.set_json(index_key, {"questions": questions})
+        with self._lock:
+            self._questions[context_key] = questions
+
+
+UPLOAD_CACHE = CacheStore("uploads")
+OCR_CACHE = CacheStore("ocr")
+EXTRACTION_CACHE = CacheStore("extractions")
+ANSWER_CACHE = CacheStore("answers")
+EMBEDDING_CACHE = CacheStore("embeddings")
+
+CACHE_STORES = {
+    store.namespace: store
+    for store in (
+        UPLOAD_CACHE,
+        OCR_CACHE,
+        EXTRACTION_CACHE,
+        ANSWER_CACHE,
+        EMBEDDING_CACHE,
+    )
+}
+
+
+def main():
+    """Inspect and prune the cache from the command line"""
+    parser = argparse.ArgumentParser(description="Inspect and prune the cache")
+    parser.add_argument("command", choices=["stats", "prune", "clear"])
+    parser.add_argument(
+        "--namespace",
+        choices=sorted(CACHE_STORES),
+        help="Only operate on this namespace (default: all)",
+    )
+    args = parser.parse_args()
+
+    stores = [CACHE_STORES[args.namespace]] if args.namespace else CACHE_STORES.values()
+    for store in stores:
+        result = getattr(store, args.command)()
+        print(
+            ", ".join(f"{key}={value}" for key, value in result.items()),
+        )
+
+
+if __name__ == "__main__":
+    main()
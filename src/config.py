@@ -5,6 +5,11 @@ from pathlib import Path
 # Load environment variables
 load_dotenv()
 CACHE_DIR = Path("src/data/cache")
+# Each cache namespace (uploads, ocr, extractions, answers, embeddings) is pruned to this size and age
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_TTL_DAYS = float(os.getenv("CACHE_TTL_DAYS", "30"))
+# Number of parsed contracts and extractions kept in memory per cache
+MEMORY_CACHE_SIZE = int(os.getenv("MEMORY_CACHE_SIZE", "128"))
 
 # LangSmith Configuration - defaults for CI/testing
 LANGCHAIN_API_KEY = os.getenv("LANGCHAIN_API_KEY")
@@ -16,22 +21,129 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # RAG Configuration
 VECTOR_STORE_DIR = Path("src/data/vector_stores")
-EMBEDDING_MODEL = "text-embedding-3-small"
+# "openai" embeds with the OpenAI API (or EMBEDDING_API_BASE), "local" runs a
+# sentence-transformer on the CPU and requires the optional langchain-huggingface
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+# An empty EMBEDDING_MODEL uses the default model of the backend
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or (
+    LOCAL_EMBEDDING_MODEL if EMBEDDING_BACKEND == "local" else "text-embedding-3-small"
+)
+# Where local models are downloaded to, and texts per batch of local inference
+EMBEDDING_MODEL_CACHE_DIR = Path(
+    os.getenv("EMBEDDING_MODEL_CACHE_DIR", str(CACHE_DIR / "models"))
+)
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
 COLLECTION_NAME = "rental_law_2025"
+# Optional OpenAI-compatible embedding server, e.g. a local stand-in for testing
+EMBEDDING_API_BASE = os.getenv("EMBEDDING_API_BASE") or None
+# Bulk embedding during index builds: texts per request, estimated tokens per
+# request, concurrent requests and retries with exponential backoff
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "50000"))
+EMBEDDING_PARALLEL_BATCHES = int(os.getenv("EMBEDDING_PARALLEL_BATCHES", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+EMBEDDING_INITIAL_BACKOFF_SECONDS = float(
+    os.getenv("EMBEDDING_INITIAL_BACKOFF_SECONDS", "1.0")
+)
+# Timeout of the query embeddings of the hybrid retriever, sent without retries so
+# it falls back to BM25 right away when the embedding API is unreachable
+EMBEDDING_QUERY_TIMEOUT_SECONDS = float(
+    os.getenv("EMBEDDING_QUERY_TIMEOUT_SECONDS", "5.0")
+)
+# Cache embedding vectors on disk, keeping this many in memory
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_MEMORY_CACHE_SIZE = int(os.getenv("EMBEDDING_MEMORY_CACHE_SIZE", "1024"))
+# "hybrid" fuses BM25 with the in-memory copy of the collection, "memory" searches
+# only that copy, "chroma" queries Chroma directly and "bm25" works fully offline
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "hybrid")
+# Estimated token budget for the retrieved law paragraphs in each prompt
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+# Search only the chapters relevant to each check, always including key paragraphs
+RETRIEVAL_PROFILES_ENABLED = (
+    os.getenv("RETRIEVAL_PROFILES_ENABLED", "true").lower() == "true"
+)
 
 # LLM Configuration
 LLM_MODEL = "gpt-4o-mini"
 LLM_TEMPERATURE = 0.0
 
-# Setup LangSmith tracing - only if explicitly enabled AND API key available
-if ENABLE_TRACING and LANGCHAIN_API_KEY:
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    os.environ["LANGCHAIN_API_KEY"] = LANGCHAIN_API_KEY
-    os.environ["LANGCHAIN_PROJECT"] = LANGCHAIN_PROJECT
-    print(f"✅ LangSmith tracing enabled for: {LANGCHAIN_PROJECT}")
-else:
-    # Explicitly disable tracing
-    os.environ["LANGCHAIN_TRACING_V2"] = "false"
-    if "LANGCHAIN_API_KEY" in os.environ:
-        del os.environ["LANGCHAIN_API_KEY"]  # Remove to prevent accidental tracing
-    print("🔇 LangSmith tracing disabled")
+# OCR Configuration
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", str(os.cpu_count() or 1)))
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+# Pages whose embedded text layer is shorter than this are OCR'd instead
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "50"))
+
+# Answer cache for RAGChain.ask. Set a similarity threshold (0-1) to also reuse
+# answers to near-identical questions, leave it empty for exact matches only
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY_THRESHOLD = (
+    float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD"))
+    if os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD")
+    else None
+)
+
+# Background validation jobs, polled by the UI while they run
+VALIDATION_JOB_DB = CACHE_DIR / "validation_jobs.sqlite3"
+VALIDATION_JOB_WORKERS = int(os.getenv("VALIDATION_JOB_WORKERS", "4"))
+VALIDATION_JOB_TTL_HOURS = float(os.getenv("VALIDATION_JOB_TTL_HOURS", "24"))
+VALIDATION_POLL_INTERVAL_MS = int(os.getenv("VALIDATION_POLL_INTERVAL_MS", "500"))
+
+# Validation Configuration
+# Decide deposit and prepaid rent checks arithmetically when the amounts can be parsed
+RULE_BASED_VALIDATION = os.getenv("RULE_BASED_VALIDATION", "true").lower() == "true"
+# Run the rule checks for a contract in parallel, capped across all the validations
+# of a process to stay under provider rate limits
+CONCURRENT_VALIDATION = os.getenv("CONCURRENT_VALIDATION", "true").lower() == "true"
+VALIDATION_MAX_CONCURRENCY = int(os.getenv("VALIDATION_MAX_CONCURRENCY", "4"))
+
+# Batch validation of many contracts: processes parsing PDFs and threads calling the LLM
+BATCH_OCR_WORKERS = int(os.getenv("BATCH_OCR_WORKERS", str(OCR_MAX_WORKERS)))
+BATCH_LLM_WORKERS = int(os.getenv("BATCH_LLM_WORKERS", "8"))
+
+# Provider-side batch jobs ("openai" Batch API, or "local" to run the file in-process)
+LLM_BATCH_BACKEND = os.getenv("LLM_BATCH_BACKEND", "openai")
+LLM_BATCH_DIR = CACHE_DIR / "batches"
+LLM_BATCH_COMPLETION_WINDOW = os.getenv("LLM_BATCH_COMPLETION_WINDOW", "24h")
+LLM_BATCH_POLL_INTERVAL_SECONDS = float(
+    os.getenv("LLM_BATCH_POLL_INTERVAL_SECONDS", "30")
+)
+
+# Build the RAG chain on startup: "background" in a warm-up thread while the server
+# already answers, "lazy" on first use, or "eager" before the server starts
+RAG_CHAIN_STARTUP = os.getenv("RAG_CHAIN_STARTUP", "background")
+
+# Web server address, and for gunicorn (src/gunicorn.conf.py) the worker processes,
+# threads per worker and seconds before a worker that stopped responding is restarted
+DASH_HOST = os.getenv("DASH_HOST", "0.0.0.0")
+DASH_PORT = int(os.getenv("DASH_PORT", "8050"))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "120"))
+
+_tracing_configured = False
+
+
+def configure_tracing():
+    """Set up LangSmith tracing, only if explicitly enabled AND API key available.
+
+    Called by the entry points before the first LLM call, rather than when
+    this module is imported. Only the first call has an effect.
+    """
+    global _tracing_configured
+    if _tracing_configured:
+        return
+    _tracing_configured = True
+
+    if ENABLE_TRACING and LANGCHAIN_API_KEY:
+        os.environ["LANGCHAIN_TRACING_V2"] = "true"
+        os.environ["LANGCHAIN_API_KEY"] = LANGCHAIN_API_KEY
+        os.environ["LANGCHAIN_PROJECT"] = LANGCHAIN_PROJECT
+        print(f"✅ LangSmith tracing enabled for: {LANGCHAIN_PROJECT}")
+    else:
+        # Explicitly disable tracing
+        os.environ["LANGCHAIN_TRACING_V2"] = "false"
+        if "LANGCHAIN_API_KEY" in os.environ:
+            del os.environ["LANGCHAIN_API_KEY"]  # Remove to prevent accidental tracing
+        print("🔇 LangSmith tracing disabled")
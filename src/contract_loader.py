@@ -1,17 +1,23 @@
 from langchain_core.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from langchain.chains import LLMChain
-from langchain_community.chat_models import ChatOpenAI
-from pdf2image import convert_from_path
-import pytesseract
 from pathlib import Path
 
 from pydantic import BaseModel, Field
 from typing import Dict
-import os
 import hashlib
 import json
-from config import CACHE_DIR, LLM_MODEL, LLM_TEMPERATURE
+import os
+from functools import lru_cache
+from cache_store import EXTRACTION_CACHE, OCR_CACHE, ModelCache
+from config import (
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    OCR_MAX_WORKERS,
+    TEXT_LAYER_MIN_CHARS,
+    configure_tracing,
+)
+from data_loading import find_pages_with_form_values, load_pdf_by_page
+from ocr import get_ocr_settings, get_page_count, ocr_pages
 
 
 class ContractInfo(BaseModel):
@@ -98,50 +104,113 @@ class RentalContract(BaseModel):
 
     text: str = Field(description="Full text of the rental contract")
     file_name: str = Field(description="File name of the contract")
+    ocr_pages: list[int] = Field(
+        description="Pages (1-indexed) whose text was extracted with OCR",
+        default_factory=list,
+    )
+
+
+# Parsed contracts and extracted info, kept in memory in front of the disk cache
+CONTRACT_TEXT_CACHE = ModelCache(OCR_CACHE, RentalContract)
+CONTRACT_INFO_CACHE = ModelCache(EXTRACTION_CACHE, ContractInfo)
+
+
+def is_usable_text_layer(text: str, min_chars: int = TEXT_LAYER_MIN_CHARS) -> bool:
+    """Check if text extracted from a PDF text layer is good enough to skip OCR"""
+    stripped = "".join(text.split())
+    if len(stripped) < min_chars:
+        return False
 
+    # Garbled text layers (e.g. broken font encodings) are mostly symbols
+    alphanumeric = sum(char.isalnum() for char in stripped)
+    return alphanumeric / len(stripped) >= 0.5
 
-def parse_contract_pdf_to_text(file_path: str) -> RentalContract:
-    """Parse a PDF rental contract to text using OCR"""
 
-    # Ensure cache directory exists
-    cache_dir = CACHE_DIR
-    os.makedirs(cache_dir, exist_ok=True)
+@lru_cache(maxsize=1024)
+def _hash_file_version(file_path: str, mtime_ns: int, size: int) -> str:
+    content_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            content_hash.update(block)
+    return content_hash.hexdigest()
 
-    # Create a unique cache key based on file path
-    cache_key_str = f"pdf_parse:{file_path}"
-    cache_key_hash = hashlib.sha256(cache_key_str.encode("utf-8")).hexdigest()
-    cache_file_path = os.path.join(cache_dir, f"{cache_key_hash}.json")
 
-    # Try to load from cache
-    if os.path.exists(cache_file_path):
-        with open(cache_file_path, "r", encoding="utf-8") as f:
-            cached_data = json.load(f)
-        return RentalContract(**cached_data)
+def hash_file_contents(file_path: str) -> str:
+    """Compute a SHA-256 hash of a file's contents.
 
-    # If not in cache, process the PDF
-    pages = convert_from_path(
-        file_path,
+    Hashes are memoized per path, modification time and size, so repeated
+    calls for an unchanged file do not read it again.
+    """
+    stat = os.stat(file_path)
+    return _hash_file_version(
+        os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
     )
-    text = ""
-    for page in pages:
-        text += pytesseract.image_to_string(page)
-
-    # Save to cache
-    with open(cache_file_path, "w", encoding="utf-8") as f:
-        json.dump(
-            {"text": text, "file_name": Path(file_path).name},
-            f,
-            ensure_ascii=False,
-            indent=2,
-        )
 
-    return RentalContract(text=text, file_name=Path(file_path).name)
 
+def extract_text_by_page(
+    file_path: str, ocr_workers: int = OCR_MAX_WORKERS
+) -> tuple[list[str], list[int]]:
+    """Extract the text of each page, using OCR only where the text layer falls short.
 
-def extract_contract_info(rental_contract: RentalContract) -> ContractInfo:
-    """Extract key information from a rental contract using an LLM"""
+    Returns the page texts in page order and the pages (1-indexed) that were OCR'd.
+    """
+    try:
+        documents = load_pdf_by_page(file_path)
+        form_pages = find_pages_with_form_values(file_path)
+        texts = [doc.page_content for doc in documents]
+        pages_to_ocr = [
+            page_number + 1
+            for page_number, text in enumerate(texts)
+            if page_number in form_pages or not is_usable_text_layer(text)
+        ]
+    except Exception as e:
+        print(f"Could not read text layer of {file_path}, using OCR: {e}")
+        page_count = get_page_count(file_path)
+        texts = [""] * page_count
+        pages_to_ocr = list(range(1, page_count + 1))
+
+    for page_number, text in zip(
+        pages_to_ocr, ocr_pages(file_path, pages_to_ocr, ocr_workers)
+    ):
+        texts[page_number - 1] = text
+
+    return texts, pages_to_ocr
+
+
+def parse_contract_pdf_to_text(
+    file_path: str, ocr_workers: int = OCR_MAX_WORKERS
+) -> RentalContract:
+    """Parse a PDF rental contract to text, falling back to OCR per page"""
+
+    # Create a unique cache key based on file contents and extraction settings,
+    # so identical files share results and changed files are parsed again
+    extraction_settings = {
+        **get_ocr_settings(),
+        "text_layer_min_chars": TEXT_LAYER_MIN_CHARS,
+    }
+    cache_key_str = (
+        f"pdf_parse:{hash_file_contents(file_path)}:"
+        f"{json.dumps(extraction_settings, sort_keys=True)}"
+    )
 
-    # Create Pydantic output parser
+    def parse() -> RentalContract:
+        # Read the text layer and OCR only the pages that need it
+        page_texts, pages_ocrd = extract_text_by_page(file_path, ocr_workers)
+        print(f"OCR used for {len(pages_ocrd)} of {len(page_texts)} pages")
+        return RentalContract(
+            text="\n".join(page_texts),
+            file_name=Path(file_path).name,
+            ocr_pages=pages_ocrd,
+        )
+
+    # Load from cache, or parse once while concurrent requests for it wait
+    contract = CONTRACT_TEXT_CACHE.get_or_create(cache_key_str, parse)
+    # The same contents may have been cached under another file name
+    return contract.model_copy(update={"file_name": Path(file_path).name})
+
+
+def get_extraction_prompt() -> PromptTemplate:
+    """Get the prompt template for extracting contract information"""
     parser = PydanticOutputParser(pydantic_object=ContractInfo)
 
     prompt_contract_all_info = f"""
@@ -157,45 +226,48 @@ def extract_contract_info(rental_contract: RentalContract) -> ContractInfo:
     {{contract_text}}
     """
 
-    llm = ChatOpenAI(model_name=LLM_MODEL, temperature=LLM_TEMPERATURE)
-
-    prompt_template = PromptTemplate(
+    return PromptTemplate(
         template=prompt_contract_all_info,
         input_variables=["contract_text"],
         partial_variables={"format_instructions": parser.get_format_instructions()},
     )
 
-    llm_chain = LLMChain(
-        llm=llm,
-        prompt=prompt_template,
-    )
 
-    # Ensure cache directory exists
-    cache_dir = CACHE_DIR
-    os.makedirs(cache_dir, exist_ok=True)
+def get_contract_info_cache_key(
+    rental_contract: RentalContract, prompt_template: PromptTemplate
+) -> str:
+    """Create a unique cache key based on contract text and prompt"""
+    text_hash = hashlib.sha256(rental_contract.text.encode("utf-8")).hexdigest()
+    return f"contract_info_{text_hash}:{prompt_template.template}"
 
-    # Create a unique cache key based on file name and prompt
-    cache_key_str = (
-        f"contract_info_{rental_contract.file_name}:{prompt_contract_all_info}"
-    )
-    cache_key_hash = hashlib.sha256(cache_key_str.encode("utf-8")).hexdigest()
-    cache_file_path = os.path.join(cache_dir, f"{cache_key_hash}.json")
 
-    # Try to load from cache
-    if os.path.exists(cache_file_path):
-        with open(cache_file_path, "r", encoding="utf-8") as f:
-            cached_data = json.load(f)
-        return ContractInfo(**cached_data)
+def extract_contract_info(rental_contract: RentalContract) -> ContractInfo:
+    """Extract key information from a rental contract using an LLM"""
 
-    # Get the raw output and parse with Pydantic
-    raw_output = llm_chain.run(contract_text=rental_contract.text)
-    result = parser.parse(raw_output)
+    # Create Pydantic output parser
+    parser = PydanticOutputParser(pydantic_object=ContractInfo)
+    prompt_template = get_extraction_prompt()
+
+    def extract() -> ContractInfo:
+        # Imported here, since the legacy chains are slow to import and only
+        # needed when an extraction isn't cached
+        from langchain.chains import LLMChain
+        from langchain_community.chat_models import ChatOpenAI
+
+        configure_tracing()
+        llm = ChatOpenAI(model_name=LLM_MODEL, temperature=LLM_TEMPERATURE)
+        llm_chain = LLMChain(
+            llm=llm,
+            prompt=prompt_template,
+        )
 
-    # Save to cache
-    with open(cache_file_path, "w", encoding="utf-8") as f:
-        json.dump(result.model_dump(), f, ensure_ascii=False, indent=2)
+        # Get the raw output and parse with Pydantic
+        raw_output = llm_chain.run(contract_text=rental_contract.text)
+        return parser.parse(raw_output)
 
-    return result
+    # Load from cache, or call the LLM once while concurrent requests for it wait
+    cache_key_str = get_contract_info_cache_key(rental_contract, prompt_template)
+    return CONTRACT_INFO_CACHE.get_or_create(cache_key_str, extract)
 
 
 def load_contract_and_extract_info(file_path: str) -> ContractInfo:
@@ -1,11 +1,36 @@
 from langchain_community.document_loaders import PyPDFLoader
+from pypdf import PdfReader
 from langchain.schema import Document
+import hashlib
+import json
 import re
 from langchain_chroma import Chroma
-from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain_core.vectorstores import VectorStoreRetriever
-from config import VECTOR_STORE_DIR, EMBEDDING_MODEL, COLLECTION_NAME
-
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+from config import (
+    VECTOR_STORE_DIR,
+    EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    EMBEDDING_API_BASE,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_QUERY_TIMEOUT_SECONDS,
+    COLLECTION_NAME,
+    RETRIEVER_BACKEND,
+)
+from bulk_embedding import BulkEmbedder
+from embedding_backends import (
+    EmbeddingMismatchError,
+    check_embedding_signature,
+    create_embeddings,
+    get_embedding_signature,
+)
+from embedding_cache import CachedEmbeddings
+from hybrid_retrieval import BM25Index, BM25Retriever, HybridRetriever
+from vector_index import MemoryVectorIndex, MemoryVectorRetriever
+from vector_store_registry import VECTOR_STORE_REGISTRY
+
+RENTAL_LAW_FILE_PATH = "src/data/lejeloven_2025.pdf"
 CHAPTER_REGEX = r"(Kapitel \d+)\n"
 PARAGRAPH_REGEX = r"((?:^|\x0c|(?<=[\w\.]\n))§ \d{1,3}\.)"  # Matches "§ 1.", "§ 23." at start of line or after a form feed or after a newline
 
@@ -24,6 +49,28 @@ def load_pdf_by_page(file_paths: str) -> list[Document]:
     return documents
 
 
+def find_pages_with_form_values(file_path: str) -> set[int]:
+    """Find pages (0-indexed) with filled-in form fields.
+
+    Form field values live in widget annotations rather than in the page text
+    layer, so text extracted from these pages misses what was filled in.
+    """
+    reader = PdfReader(file_path)
+    pages = set()
+    for page_number, page in enumerate(reader.pages):
+        for annotation in page.get("/Annots") or []:
+            annotation = annotation.get_object()
+            if annotation.get("/Subtype") != "/Widget":
+                continue
+            field = annotation
+            if "/V" not in field and "/Parent" in field:
+                field = field["/Parent"].get_object()
+            if field.get("/V") not in (None, "", "/Off"):
+                pages.add(page_number)
+                break
+    return pages
+
+
 def split_doc_by_regex(doc: Document, regex_pattern: str) -> list[Document]:
     text = doc.page_content
     parent_title = doc.metadata.get("title", "")
@@ -86,91 +133,427 @@ def add_page_numbers_to_paragraphs(
     return paragraphs
 
 
+def load_law_paragraphs(file_path: str = RENTAL_LAW_FILE_PATH) -> list[Document]:
+    """Split a law into paragraph chunks with their chapter and page number"""
+    chapters = read_and_split_document_by_chapter(file_path)
+    paragraphs = read_and_split_document_by_paragraph(chapters)
+    # Page numbers let answers cite where a § is; Chroma rejects None metadata
+    paragraphs = add_page_numbers_to_paragraphs(
+        paragraphs, load_pdf_by_page(file_path), PARAGRAPH_REGEX
+    )
+    for paragraph in paragraphs:
+        if paragraph.metadata["page"] is None:
+            del paragraph.metadata["page"]
+    return paragraphs
+
+
+def get_embeddings(
+    embedding_model: str = EMBEDDING_MODEL,
+    backend: str = EMBEDDING_BACKEND,
+    fail_fast: bool = False,
+) -> Embeddings:
+    """Get the embeddings used for the rental law, shared within the process.
+
+    API requests are sent in batches with retries, a local model batches its
+    own inference, and vectors are cached. With ``fail_fast`` API requests are
+    sent once with a short timeout, for searches that have a fallback.
+    """
+
+    def create():
+        if fail_fast and backend == "openai":
+            embeddings = create_embeddings(
+                backend,
+                embedding_model,
+                max_retries=0,
+                timeout=EMBEDDING_QUERY_TIMEOUT_SECONDS,
+            )
+        else:
+            embeddings = create_embeddings(backend, embedding_model)
+            if backend == "openai":
+                embeddings = BulkEmbedder(embeddings)
+        if EMBEDDING_CACHE_ENABLED:
+            embeddings = CachedEmbeddings(
+                embeddings,
+                embedding_model,
+                backend=backend,
+                api_base=EMBEDDING_API_BASE if backend == "openai" else None,
+            )
+        return embeddings
+
+    key = ("embeddings", backend, embedding_model)
+    if fail_fast and backend == "openai":
+        key += ("fail_fast",)
+    return VECTOR_STORE_REGISTRY.get(key, create)
+
+
+def get_vector_store(
+    collection_name: str = COLLECTION_NAME,
+    embedding_model: str = EMBEDDING_MODEL,
+    persist_directory: Path | None = None,
+) -> Chroma:
+    """Get the Chroma store of a collection, shared within the process"""
+    path = VECTOR_STORE_REGISTRY.normalize_path(persist_directory or VECTOR_STORE_DIR)
+
+    def create():
+        return Chroma(
+            collection_name=collection_name,
+            embedding_function=get_embeddings(embedding_model),
+            client=VECTOR_STORE_REGISTRY.get_client(path),
+        )
+
+    key = ("vector_store", path, collection_name, EMBEDDING_BACKEND, embedding_model)
+    return VECTOR_STORE_REGISTRY.get(key, create)
+
+
+def get_chunk_id(chunk: Document) -> str:
+    """Get a stable ID for a chunk from its § or chapter title"""
+    return chunk.metadata["title"]
+
+
+def get_chunk_fingerprint(chunk: Document) -> str:
+    """Hash the text and metadata of a chunk to detect changes between versions"""
+    metadata = {k: v for k, v in chunk.metadata.items() if k != "fingerprint"}
+    content = chunk.page_content + json.dumps(metadata, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def sync_collection(vector_store: Chroma, chunks: list[Document]) -> dict[str, int]:
+    """Upsert new and changed chunks and delete removed ones.
+
+    Each chunk is fingerprinted and compared with the fingerprint stored in the
+    collection, so only chunks whose text changed are embedded.
+    """
+    chunks_by_id = {}
+    for chunk in chunks:
+        chunk_id = get_chunk_id(chunk)
+        if chunk_id in chunks_by_id:
+            raise ValueError(f"Duplicate chunk ID '{chunk_id}'")
+        chunk.metadata["fingerprint"] = get_chunk_fingerprint(chunk)
+        chunks_by_id[chunk_id] = chunk
+
+    existing = vector_store._collection.get(include=["metadatas"])
+    existing_fingerprints = {
+        chunk_id: (metadata or {}).get("fingerprint")
+        for chunk_id, metadata in zip(existing["ids"], existing["metadatas"])
+    }
+
+    added = [i for i in chunks_by_id if i not in existing_fingerprints]
+    updated = [
+        i
+        for i, chunk in chunks_by_id.items()
+        if i in existing_fingerprints
+        and existing_fingerprints[i] != chunk.metadata["fingerprint"]
+    ]
+    deleted = [i for i in existing_fingerprints if i not in chunks_by_id]
+
+    upserts = added + updated
+    if upserts:
+        vector_store.add_documents(
+            [chunks_by_id[i] for i in upserts],
+            ids=upserts,
+        )
+    if deleted:
+        vector_store.delete(ids=deleted)
+
+    return {
+        "added": len(added),
+        "updated": len(updated),
+        "deleted": len(deleted),
+        "unchanged": len(chunks_by_id) - len(upserts),
+    }
+
+
+def record_embedding_signature(
+    vector_store: Chroma,
+    embedding_model: str = EMBEDDING_MODEL,
+    backend: str = EMBEDDING_BACKEND,
+):
+    """Store the backend, model and dimension that built a collection in its metadata"""
+    data = vector_store._collection.get(limit=1, include=["embeddings"])
+    dimension = len(data["embeddings"][0]) if len(data["embeddings"]) else None
+    metadata = (vector_store._collection.metadata or {}) | get_embedding_signature(
+        backend, embedding_model, dimension
+    )
+    vector_store._collection.modify(metadata=metadata)
+
+
 def build_rental_law_collection(
-    file_path: str = "src/data/lejeloven_2025.pdf",
+    file_path: str = RENTAL_LAW_FILE_PATH,
     collection_name: str = COLLECTION_NAME,
     embedding_model: str = EMBEDDING_MODEL,
     force_rebuild: bool = False,
-):
-    """Build a persistent document collection using Chroma"""
+) -> dict[str, int]:
+    """Build or incrementally update a persistent document collection using Chroma.
+
+    Only paragraphs that are new or changed since the last build are embedded,
+    and paragraphs that no longer exist are removed. With ``force_rebuild`` the
+    collection is emptied first. Returns a summary of the changes.
+    """
 
     persist_directory = str(VECTOR_STORE_DIR)
+    VECTOR_STORE_DIR.mkdir(exist_ok=True, parents=True)
 
-    # Check if collection exists
-    if not force_rebuild:
-        try:
-            embeddings = OpenAIEmbeddings(model=embedding_model)
-            existing_db = Chroma(
-                collection_name=collection_name,
-                embedding_function=embeddings,
-                persist_directory=persist_directory,
-            )
-            if existing_db._collection.count() > 0:
-                print(
-                    f"Collection '{collection_name}' already exists. Use force_rebuild=True to recreate."
-                )
-                return
-        except Exception as e:
-            print(f"Error loading collection '{collection_name}': {e}")
-            print(f"Building document collection '{collection_name}'...")
-
-            # Process documents
-            embeddings = OpenAIEmbeddings(model=embedding_model)
-            chapters = read_and_split_document_by_chapter(file_path)
-            paragraphs = read_and_split_document_by_paragraph(chapters)
-
-            # Create Chroma vector store
-            VECTOR_STORE_DIR.mkdir(exist_ok=True, parents=True)
-            Chroma.from_documents(
-                documents=paragraphs,
-                embedding=embeddings,
-                collection_name=collection_name,
-                persist_directory=persist_directory,
-            )
+    vector_store = get_vector_store(collection_name, embedding_model)
+    if force_rebuild:
+        print(f"Emptying collection '{collection_name}' before rebuilding...")
+        vector_store.reset_collection()
+    else:
+        check_embedding_signature(
+            collection_name,
+            vector_store._collection.metadata,
+            EMBEDDING_BACKEND,
+            embedding_model,
+        )
 
-            print(f"Document collection saved to {persist_directory}")
-            print(f"Total documents: {len(paragraphs)}")
+    # Process documents
+    print(f"Updating document collection '{collection_name}' from {file_path}...")
+    summary = sync_collection(vector_store, load_law_paragraphs(file_path))
+    record_embedding_signature(vector_store, embedding_model)
 
+    print(
+        f"Document collection saved to {persist_directory}: "
+        f"{summary['added']} added, {summary['updated']} updated, "
+        f"{summary['deleted']} deleted, {summary['unchanged']} unchanged"
+    )
 
-def load_rental_law_retriever(
-    collection_name: str = COLLECTION_NAME,
+    # Keep an exported memory index in sync with the collection
+    changed = summary["added"] or summary["updated"] or summary["deleted"]
+    if changed and MemoryVectorIndex.exists(VECTOR_STORE_DIR, collection_name):
+        export_memory_index(vector_store, collection_name, embedding_model)
+
+    return summary
+
+
+def build_law_collections(
+    file_paths: dict[str, str],
     embedding_model: str = EMBEDDING_MODEL,
-    k: int = 5,
     force_rebuild: bool = False,
-) -> VectorStoreRetriever:
-    """Load an existing document collection"""
+) -> dict[str, dict[str, int]]:
+    """Build or update several law collections, e.g. one per act or year.
+
+    ``file_paths`` maps each collection name to the PDF it is built from.
+    Returns the change summary of each collection.
+    """
+    return {
+        collection_name: build_rental_law_collection(
+            file_path=file_path,
+            collection_name=collection_name,
+            embedding_model=embedding_model,
+            force_rebuild=force_rebuild,
+        )
+        for collection_name, file_path in file_paths.items()
+    }
+
 
-    persist_directory = str(VECTOR_STORE_DIR)  # Same as build function
+def load_rental_law_vector_store(
+    collection_name: str = COLLECTION_NAME,
+    embedding_model: str = EMBEDDING_MODEL,
+    force_rebuild: bool = False,
+) -> Chroma:
+    """Load an existing document collection, building it if it is empty"""
 
     if force_rebuild:
         print(f"Force rebuilding collection '{collection_name}'...")
-        build_rental_law_collection(force_rebuild=True)
+        build_rental_law_collection(
+            collection_name=collection_name,
+            embedding_model=embedding_model,
+            force_rebuild=True,
+        )
 
     try:
         print(f"Loading document collection '{collection_name}'...")
-        embeddings = OpenAIEmbeddings(model=embedding_model)
-
-        # Use Chroma constructor, not load_local
-        vector_store = Chroma(
-            collection_name=collection_name,
-            embedding_function=embeddings,
-            persist_directory=persist_directory,
-        )
+        vector_store = get_vector_store(collection_name, embedding_model)
 
         # Check if collection has documents
         if vector_store._collection.count() == 0:
             raise ValueError("Collection is empty")
+        check_embedding_signature(
+            collection_name,
+            vector_store._collection.metadata,
+            EMBEDDING_BACKEND,
+            embedding_model,
+        )
 
+    except EmbeddingMismatchError:
+        raise
     except Exception:
         print(f"Collection '{collection_name}' not found. Building it now...")
-        build_rental_law_collection()
+        build_rental_law_collection(
+            collection_name=collection_name, embedding_model=embedding_model
+        )
+        # The build filled the same shared store
+        vector_store = get_vector_store(collection_name, embedding_model)
 
-        # Load the newly created collection
-        embeddings = OpenAIEmbeddings(model=embedding_model)
-        vector_store = Chroma(
-            collection_name=collection_name,
-            embedding_function=embeddings,
-            persist_directory=persist_directory,
+    return vector_store
+
+
+def export_memory_index(
+    vector_store: Chroma,
+    index_name: str = COLLECTION_NAME,
+    embedding_model: str = EMBEDDING_MODEL,
+    directory: Path = VECTOR_STORE_DIR,
+    embedding_backend: str = EMBEDDING_BACKEND,
+) -> MemoryVectorIndex:
+    """Export the embeddings and documents of a Chroma collection to a memory index"""
+    data = vector_store._collection.get(
+        include=["embeddings", "documents", "metadatas"]
+    )
+    documents = [
+        Document(id=doc_id, page_content=text, metadata=metadata or {})
+        for doc_id, text, metadata in zip(
+            data["ids"], data["documents"], data["metadatas"]
+        )
+    ]
+    index = MemoryVectorIndex.from_vectors(
+        data["embeddings"], data["ids"], documents, embedding_model, embedding_backend
+    )
+    index.save(directory, index_name)
+    VECTOR_STORE_REGISTRY.discard(
+        "memory_index", VECTOR_STORE_REGISTRY.normalize_path(directory), index_name
+    )
+    print(f"Memory index with {len(documents)} documents saved to {directory}")
+    return index
+
+
+def load_memory_index(
+    collection_name: str = COLLECTION_NAME,
+    embedding_model: str = EMBEDDING_MODEL,
+    force_rebuild: bool = False,
+) -> MemoryVectorIndex:
+    """Load the memory index of a collection, exporting it from Chroma if needed"""
+    index = None
+    if not force_rebuild and MemoryVectorIndex.exists(
+        VECTOR_STORE_DIR, collection_name
+    ):
+        index = MemoryVectorIndex.load(VECTOR_STORE_DIR, collection_name)
+        if index.embedding_backend is None:
+            # Exported before signatures were recorded: export again if stale
+            if index.embedding_model != embedding_model:
+                print(f"Memory index '{collection_name}' uses another embedding model")
+                index = None
+        else:
+            check_embedding_signature(
+                collection_name,
+                index.embedding_signature,
+                EMBEDDING_BACKEND,
+                embedding_model,
+            )
+
+    if index is None:
+        vector_store = load_rental_law_vector_store(
+            collection_name, embedding_model, force_rebuild
+        )
+        export_memory_index(vector_store, collection_name, embedding_model)
+        index = MemoryVectorIndex.load(VECTOR_STORE_DIR, collection_name)
+    return index
+
+
+def load_memory_retriever(
+    collection_name: str = COLLECTION_NAME,
+    embedding_model: str = EMBEDDING_MODEL,
+    k: int = 5,
+    force_rebuild: bool = False,
+    fail_fast: bool = False,
+) -> MemoryVectorRetriever:
+    """Load a retriever over the memory index of a collection, shared within the process.
+
+    With ``fail_fast`` queries are embedded without retries, see ``get_embeddings``.
+    """
+    path = VECTOR_STORE_REGISTRY.normalize_path(VECTOR_STORE_DIR)
+    key = ("memory_index", path, collection_name, EMBEDDING_BACKEND, embedding_model)
+    if force_rebuild:
+        VECTOR_STORE_REGISTRY.discard(*key)
+    index = VECTOR_STORE_REGISTRY.get(
+        key, lambda: load_memory_index(collection_name, embedding_model, force_rebuild)
+    )
+    return MemoryVectorRetriever(
+        index=index,
+        embeddings=get_embeddings(embedding_model, fail_fast=fail_fast),
+        search_kwargs={"k": k},
+    )
+
+
+def load_collection_paragraphs(
+    collection_name: str = COLLECTION_NAME,
+) -> list[Document]:
+    """Read the paragraphs stored in a collection, without any embedding calls"""
+    client = VECTOR_STORE_REGISTRY.get_client(VECTOR_STORE_DIR)
+    data = client.get_collection(collection_name).get(
+        include=["documents", "metadatas"]
+    )
+    return [
+        Document(id=doc_id, page_content=text, metadata=metadata or {})
+        for doc_id, text, metadata in zip(
+            data["ids"], data["documents"], data["metadatas"]
         )
+    ]
 
+
+def load_bm25_retriever(
+    collection_name: str = COLLECTION_NAME, k: int = 5
+) -> BM25Retriever:
+    """Build a BM25 retriever over the paragraphs of a collection.
+
+    The rental law collection is indexed straight from its PDF, so it works
+    fully offline before the collection is built. Other collections are
+    indexed from the paragraphs stored in them.
+    """
+
+    def create():
+        if collection_name != COLLECTION_NAME:
+            return BM25Index(load_collection_paragraphs(collection_name))
+        paragraphs = load_law_paragraphs(RENTAL_LAW_FILE_PATH)
+        for paragraph in paragraphs:
+            paragraph.id = get_chunk_id(paragraph)  # Same IDs as in the vector store
+        return BM25Index(paragraphs)
+
+    path = VECTOR_STORE_REGISTRY.normalize_path(VECTOR_STORE_DIR)
+    index = VECTOR_STORE_REGISTRY.get(("bm25_index", path, collection_name), create)
+    return BM25Retriever(index=index, search_kwargs={"k": k})
+
+
+def load_hybrid_retriever(
+    collection_name: str = COLLECTION_NAME,
+    embedding_model: str = EMBEDDING_MODEL,
+    k: int = 5,
+    force_rebuild: bool = False,
+) -> HybridRetriever | BM25Retriever:
+    """Fuse BM25 and memory index retrieval, or use BM25 alone if the index can't load.
+
+    Queries are embedded without retries, so when the embedding API is
+    unreachable the hybrid retriever answers from BM25 right away.
+    """
+    sparse = load_bm25_retriever(collection_name, k)
+    try:
+        dense = load_memory_retriever(
+            collection_name, embedding_model, k, force_rebuild, fail_fast=True
+        )
+    except EmbeddingMismatchError:
+        raise
+    except Exception as e:
+        print(f"Vector retriever unavailable, using BM25 only: {e}")
+        return sparse
+    return HybridRetriever(retrievers=[sparse, dense], search_kwargs={"k": k})
+
+
+def load_rental_law_retriever(
+    collection_name: str = COLLECTION_NAME,
+    embedding_model: str = EMBEDDING_MODEL,
+    k: int = 5,
+    force_rebuild: bool = False,
+    backend: str = RETRIEVER_BACKEND,
+) -> VectorStoreRetriever | MemoryVectorRetriever | HybridRetriever | BM25Retriever:
+    """Load a retriever over the rental law using the configured backend"""
+    if backend == "hybrid":
+        return load_hybrid_retriever(collection_name, embedding_model, k, force_rebuild)
+    if backend == "bm25":
+        return load_bm25_retriever(collection_name, k)
+    if backend == "memory":
+        return load_memory_retriever(collection_name, embedding_model, k, force_rebuild)
+    if backend != "chroma":
+        raise ValueError(f"Unknown retriever backend '{backend}'")
+
+    vector_store = load_rental_law_vector_store(
+        collection_name, embedding_model, force_rebuild
+    )
     return vector_store.as_retriever(search_type="similarity", search_kwargs={"k": k})
@@ -0,0 +1,134 @@
+"""Embedding backends for the law collections
+
+"openai" embeds with the OpenAI API, or an OpenAI-compatible server at
+``EMBEDDING_API_BASE``. "local" runs a sentence-transformer on the CPU, so the
+law can be indexed and searched without network access. It requires the
+optional ``langchain-huggingface`` package, and the model is downloaded once
+into ``EMBEDDING_MODEL_CACHE_DIR``.
+
+Collections and memory indexes record the backend, model and dimension that
+built them, so loading them with other embeddings fails right away instead of
+returning meaningless search results.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBEDDING_API_BASE,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    EMBEDDING_MODEL_CACHE_DIR,
+    LOCAL_EMBEDDING_BATCH_SIZE,
+)
+
+EMBEDDING_BACKENDS = ("openai", "local")
+# Dimensions of the OpenAI embedding models, known without calling the API
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingMismatchError(ValueError):
+    """A collection is loaded with other embeddings than the ones that built it"""
+
+
+@lru_cache(maxsize=4)
+def load_local_embeddings(
+    model: str,
+    cache_dir: Path = EMBEDDING_MODEL_CACHE_DIR,
+    batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+) -> Embeddings:
+    """Load a sentence-transformer on the CPU, once per process"""
+    try:
+        from langchain_huggingface import HuggingFaceEmbeddings
+    except ImportError as e:
+        raise ImportError(
+            "The local embedding backend requires langchain-huggingface: "
+            "pip install langchain-huggingface sentence-transformers"
+        ) from e
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    print(f"Loading local embedding model '{model}'...")
+    return HuggingFaceEmbeddings(
+        model_name=model,
+        cache_folder=str(cache_dir),
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": batch_size, "normalize_embeddings": True},
+    )
+
+
+def create_embeddings(
+    backend: str = EMBEDDING_BACKEND,
+    model: str = EMBEDDING_MODEL,
+    max_retries: int = 2,
+    timeout: float | None = None,
+) -> Embeddings:
+    """Create the embeddings of a backend, without batching or caching.
+
+    ``max_retries`` and ``timeout`` apply to the requests of the API backend.
+    """
+    if backend == "openai":
+        from langchain_openai.embeddings import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(
+            model=model,
+            base_url=EMBEDDING_API_BASE,
+            # Token length checks download an OpenAI tokenizer, skip them for other servers
+            check_embedding_ctx_length=EMBEDDING_API_BASE is None,
+            max_retries=max_retries,
+            request_timeout=timeout,
+        )
+    if backend == "local":
+        return load_local_embeddings(model)
+    raise ValueError(f"Unknown embedding backend '{backend}'")
+
+
+def get_embedding_dimension(
+    backend: str = EMBEDDING_BACKEND, model: str = EMBEDDING_MODEL
+) -> int | None:
+    """Get the vector dimension of a model without embedding anything, if known"""
+    if backend == "local":
+        embeddings = load_local_embeddings(model)
+        return embeddings._client.get_sentence_embedding_dimension()
+    if EMBEDDING_API_BASE is None:
+        return OPENAI_EMBEDDING_DIMENSIONS.get(model)
+    return None  # Models of other servers are unknown
+
+
+def get_embedding_signature(
+    backend: str = EMBEDDING_BACKEND,
+    model: str = EMBEDDING_MODEL,
+    dimension: int | None = None,
+) -> dict:
+    """Metadata recording which embeddings built a collection"""
+    signature = {"embedding_backend": backend, "embedding_model": model}
+    dimension = dimension or get_embedding_dimension(backend, model)
+    if dimension:
+        signature["embedding_dimension"] = dimension
+    return signature
+
+
+def check_embedding_signature(
+    name: str,
+    recorded: dict | None,
+    backend: str = EMBEDDING_BACKEND,
+    model: str = EMBEDDING_MODEL,
+):
+    """Raise EmbeddingMismatchError if a collection was built with other embeddings.
+
+    Collections built before the signature was recorded are not checked.
+    """
+    if not recorded or "embedding_backend" not in recorded:
+        return
+    for key, value in get_embedding_signature(backend, model).items():
+        if key in recorded and recorded[key] != value:
+            raise EmbeddingMismatchError(
+                f"'{name}' was built with {key} {recorded[key]!r}, but is loaded "
+                f"with {value!r}. Rebuild it with force_rebuild=True, or set "
+                "EMBEDDING_BACKEND and EMBEDDING_MODEL to match it."
+            )
@@ -0,0 +1,114 @@
+"""Persistent cache for embedding vectors"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from cache_store import EMBEDDING_CACHE, CacheStore
+from config import EMBEDDING_BACKEND, EMBEDDING_MEMORY_CACHE_SIZE
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches vectors by backend, model and text.
+
+    Vectors are stored on disk as raw float32 bytes, with an in-memory LRU in
+    front. Queries and documents share the cache, so a paragraph that was
+    embedded while building the index is never embedded again. The backend
+    and API base are part of the key, since a model name served by another
+    backend or server embeds into another space.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        store: CacheStore = EMBEDDING_CACHE,
+        maxsize: int = EMBEDDING_MEMORY_CACHE_SIZE,
+        backend: str = EMBEDDING_BACKEND,
+        api_base: str | None = None,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.backend = backend
+        self.api_base = api_base
+        self.store = store
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _file_name(self, text: str) -> str:
+        key = f"{self.backend}:{self.api_base or ''}:{self.model_name}:{text}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".f32"
+
+    def _remember(self, file_name: str, vector: list[float]):
+        with self._lock:
+            self._memory[file_name] = vector
+            self._memory.move_to_end(file_name)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _get(self, file_name: str) -> list[float] | None:
+        with self._lock:
+            if file_name in self._memory:
+                self._memory.move_to_end(file_name)
+                return self._memory[file_name]
+
+        path = self.store.get_file(file_name)
+        if path is None:
+            return None
+        vector = np.frombuffer(path.read_bytes(), dtype=np.float32).tolist()
+        self._remember(file_name, vector)
+        return vector
+
+    def _set(self, file_name: str, vector: list[float]):
+        self.store.put_file(file_name, np.asarray(vector, dtype=np.float32).tobytes())
+        self._remember(file_name, vector)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, only calling the underlying model for uncached ones"""
+        file_names = [self._file_name(text) for text in texts]
+        vectors = [self._get(file_name) for file_name in file_names]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, new_vectors):
+                self._set(file_names[i], vector)
+                vectors[i] = vector
+
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query, reusing the cached vector if the text was seen before"""
+        file_name = self._file_name(text)
+        vector = self._get(file_name)
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._set(file_name, vector)
+        return vector
+
+    def stats(self) -> dict:
+        """Get hit/miss counters"""
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "model": self.model_name,
+                "memory_entries": len(self._memory),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
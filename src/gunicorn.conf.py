@@ -0,0 +1,34 @@
+"""gunicorn settings for serving the app in production
+
+Run from the repository root, like the other entry points:
+    gunicorn --config src/gunicorn.conf.py "wsgi:create_server()"
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import (  # noqa: E402
+    DASH_HOST,
+    DASH_PORT,
+    WEB_THREADS,
+    WEB_TIMEOUT,
+    WEB_WORKERS,
+)
+
+bind = f"{DASH_HOST}:{DASH_PORT}"
+workers = WEB_WORKERS
+# Threads serve the Dash callbacks while the validation jobs wait on the LLM
+worker_class = "gthread"
+threads = WEB_THREADS
+timeout = WEB_TIMEOUT
+# Load the law indexes once in the master, shared copy-on-write by the workers
+preload_app = True
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    from wsgi import start_worker
+
+    start_worker()
@@ -0,0 +1,192 @@
+"""Sparse BM25 retrieval and hybrid retrieval with reciprocal-rank fusion
+
+BM25 matches the exact legal terms ("depositum", "forudbetalt leje",
+"opsigelse") that dense embeddings can miss, and needs no embedding API, so
+it also serves as an offline fallback. The hybrid retriever fuses the ranked
+results of several retrievers by reciprocal-rank fusion and keeps answering
+from the others when one fails.
+"""
+
+import math
+import re
+import time
+from collections import Counter, defaultdict
+
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, PrivateAttr
+
+from vector_index import matches_filter
+
+# Constant of reciprocal-rank fusion, damping the weight of the top ranks
+RRF_K = 60
+# Common Danish inflection suffixes, longest first
+DANISH_SUFFIXES = (
+    "ernes",
+    "erne",
+    "ene",
+    "ens",
+    "ets",
+    "en",
+    "et",
+    "er",
+    "es",
+    "e",
+    "s",
+)
+MIN_STEM_LENGTH = 4
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase terms with a light Danish suffix stripping.
+
+    "Opsigelsen" and "opsigelse" both become "opsigels", so inflected forms
+    of a term match each other.
+    """
+    terms = []
+    for word in re.findall(r"\w+", text.lower()):
+        for suffix in DANISH_SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+                word = word[: -len(suffix)]
+                break
+        terms.append(word)
+    return terms
+
+
+class BM25Index:
+    """Inverted index scoring documents with Okapi BM25"""
+
+    def __init__(self, documents: list[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(document index, term frequency)]
+        self.lengths = []
+        for i, doc in enumerate(documents):
+            terms = tokenize(doc.page_content)
+            self.lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings[term].append((i, frequency))
+        self.average_length = sum(self.lengths) / len(self.lengths) if documents else 0
+        self.idf = {
+            term: math.log(1 + (len(documents) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(
+        self, query: str, k: int = 5, filter: dict | None = None
+    ) -> list[tuple[Document, float]]:
+        """Top-k documents by BM25 score, optionally filtered by metadata.
+
+        Without a filter only documents sharing a term with the query are
+        returned. With a filter, matching documents are returned even if they
+        score zero, since the filter itself names the documents wanted.
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            for i, frequency in self.postings.get(term, []):
+                length_norm = (
+                    1 - self.b + self.b * self.lengths[i] / self.average_length
+                )
+                scores[i] += (
+                    self.idf[term]
+                    * frequency
+                    * (self.k1 + 1)
+                    / (frequency + self.k1 * length_norm)
+                )
+
+        if filter:
+            candidates = [
+                i
+                for i, doc in enumerate(self.documents)
+                if matches_filter(doc.metadata, filter)
+            ]
+        else:
+            candidates = list(scores)
+        top = sorted(candidates, key=lambda i: (-scores.get(i, 0.0), i))[:k]
+        return [(self.documents[i], scores.get(i, 0.0)) for i in top]
+
+
+class BM25Retriever(BaseRetriever):
+    """Retriever over a BM25Index.
+
+    Besides ``k`` and ``filter`` it accepts ``keywords``, extra terms added to
+    the query, e.g. the Danish legal terms for an English question.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: BM25Index
+    search_kwargs: dict = {"k": 5}
+    supports_keywords: bool = True
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs
+    ) -> list[Document]:
+        search_kwargs = self.search_kwargs | kwargs
+        keywords = search_kwargs.get("keywords") or []
+        results = self.index.search(
+            " ".join([query, *keywords]),
+            k=search_kwargs.get("k", 5),
+            filter=search_kwargs.get("filter"),
+        )
+        return [doc for doc, _ in results]
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[Document]], rrf_k: int = RRF_K
+) -> list[Document]:
+    """Fuse ranked document lists, scoring each document by the sum of 1 / (rrf_k + rank)"""
+    scores = defaultdict(float)
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.id or doc.page_content
+            scores[key] += 1 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=lambda key: -scores[key])]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever fusing several retrievers by reciprocal-rank fusion.
+
+    Each retriever is asked for ``fetch_k`` documents. A retriever that fails,
+    e.g. a vector retriever when the embedding API is unavailable, is skipped
+    for ``retry_seconds`` while the others keep answering.
+    """
+
+    retrievers: list[BaseRetriever]
+    search_kwargs: dict = {"k": 5}
+    fetch_k: int = 20
+    rrf_k: int = RRF_K
+    retry_seconds: float = 60.0
+    supports_keywords: bool = True
+
+    _unavailable_until: dict = PrivateAttr(default_factory=dict)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs
+    ) -> list[Document]:
+        search_kwargs = self.search_kwargs | kwargs
+        k = search_kwargs.get("k", 5)
+        keywords = search_kwargs.pop("keywords", None)
+        retriever_kwargs = search_kwargs | {"k": max(k, self.fetch_k)}
+
+        rankings, errors = [], []
+        for i, retriever in enumerate(self.retrievers):
+            if time.monotonic() < self._unavailable_until.get(i, 0):
+                continue
+            kwargs_i = dict(retriever_kwargs)
+            if keywords and getattr(retriever, "supports_keywords", False):
+                kwargs_i["keywords"] = keywords
+            try:
+                rankings.append(retriever.invoke(query, **kwargs_i))
+            except Exception as e:
+                print(f"{type(retriever).__name__} failed, skipping it: {e}")
+                self._unavailable_until[i] = time.monotonic() + self.retry_seconds
+                errors.append(e)
+
+        if not rankings and errors:
+            raise errors[-1]
+        return reciprocal_rank_fusion(rankings, self.rrf_k)[:k]
@@ -0,0 +1,324 @@
+"""Provider-side batch jobs for bulk LLM requests
+
+Requests are written to a JSONL file in the OpenAI Batch API format and
+submitted through a backend as a single job. The job is polled until it has
+finished, and the answers are parsed back into ContractInfo and LLMOutput
+objects. Throughput comes from the provider working through the whole file,
+so there is no client-side concurrency.
+"""
+
+import json
+import time
+import uuid
+from pathlib import Path
+
+import openai
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_openai import ChatOpenAI
+
+from config import (
+    LLM_BATCH_BACKEND,
+    LLM_BATCH_COMPLETION_WINDOW,
+    LLM_BATCH_DIR,
+    LLM_BATCH_POLL_INTERVAL_SECONDS,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+)
+from contract_loader import (
+    CONTRACT_INFO_CACHE,
+    ContractInfo,
+    RentalContract,
+    get_contract_info_cache_key,
+    get_extraction_prompt,
+)
+from rag import LLMOutput, RAGChain
+from retrieval_profiles import RetrievalProfile
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+MESSAGE_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+def make_batch_request(
+    custom_id: str,
+    messages: list[BaseMessage],
+    model: str = LLM_MODEL,
+    temperature: float = LLM_TEMPERATURE,
+) -> dict:
+    """Create one line of a batch job file"""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "temperature": temperature,
+            "messages": [
+                {"role": MESSAGE_ROLES[message.type], "content": message.content}
+                for message in messages
+            ],
+        },
+    }
+
+
+def write_batch_file(requests: list[dict], path: Path):
+    """Write batch requests as JSONL"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+def read_batch_output(path: Path) -> tuple[dict[str, str], dict[str, str]]:
+    """Read a batch output file into answers and errors keyed by custom ID"""
+    answers, errors = {}, {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            custom_id = result["custom_id"]
+            response = result.get("response")
+            if result.get("error"):
+                errors[custom_id] = result["error"].get("message", "Unknown error")
+            elif response is None or response["status_code"] != 200:
+                body = (response or {}).get("body") or {}
+                errors[custom_id] = body.get("error", {}).get("message", str(body))
+            else:
+                answers[custom_id] = response["body"]["choices"][0]["message"][
+                    "content"
+                ]
+    return answers, errors
+
+
+class BatchBackend:
+    """A provider that runs batch job files"""
+
+    def submit(self, input_path: Path) -> str:
+        """Submit a batch job file and return the batch ID"""
+        raise NotImplementedError
+
+    def get_status(self, batch_id: str) -> str:
+        """Get the status of a batch, e.g. "in_progress" or "completed" """
+        raise NotImplementedError
+
+    def download_results(self, batch_id: str, output_path: Path):
+        """Write the output and error lines of a finished batch to a file"""
+        raise NotImplementedError
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """Runs batch jobs with the OpenAI Batch API"""
+
+    def __init__(
+        self,
+        client: openai.OpenAI | None = None,
+        completion_window: str = LLM_BATCH_COMPLETION_WINDOW,
+    ):
+        self.client = client or openai.OpenAI()
+        self.completion_window = completion_window
+
+    def submit(self, input_path: Path) -> str:
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def get_status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def download_results(self, batch_id: str, output_path: Path):
+        batch = self.client.batches.retrieve(batch_id)
+        with open(output_path, "w", encoding="utf-8") as f:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    f.write(self.client.files.content(file_id).text)
+
+
+class LocalBatchBackend(BatchBackend):
+    """Runs batch jobs in-process with a chat model.
+
+    A stand-in for the provider in tests, or for local model servers without a
+    batch API. Requests are answered one after another when the file is
+    submitted.
+    """
+
+    def __init__(self, llm: BaseChatModel | None = None):
+        self.llm = llm or ChatOpenAI(model=LLM_MODEL, temperature=LLM_TEMPERATURE)
+        self._outputs = {}
+
+    def _answer(self, request: dict) -> dict:
+        messages = [
+            (message["role"], message["content"])
+            for message in request["body"]["messages"]
+        ]
+        try:
+            content = self.llm.invoke(messages).content
+        except Exception as e:
+            return {"response": None, "error": {"code": "error", "message": str(e)}}
+        return {
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "object": "chat.completion",
+                    "model": request["body"]["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                },
+            },
+            "error": None,
+        }
+
+    def submit(self, input_path: Path) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        lines = []
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line in f:
+                request = json.loads(line)
+                lines.append(
+                    {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": request["custom_id"],
+                        **self._answer(request),
+                    }
+                )
+        self._outputs[batch_id] = lines
+        return batch_id
+
+    def get_status(self, batch_id: str) -> str:
+        return "completed"
+
+    def download_results(self, batch_id: str, output_path: Path):
+        write_batch_file(self._outputs.pop(batch_id), output_path)
+
+
+def get_batch_backend(name: str = LLM_BATCH_BACKEND) -> BatchBackend:
+    """Create the batch backend configured by name"""
+    if name == "openai":
+        return OpenAIBatchBackend()
+    if name == "local":
+        return LocalBatchBackend()
+    raise ValueError(f"Unknown batch backend: {name}")
+
+
+def run_batch(
+    requests: list[dict],
+    backend: BatchBackend,
+    name: str = "batch",
+    work_dir: Path | None = None,
+    poll_interval: float = LLM_BATCH_POLL_INTERVAL_SECONDS,
+) -> tuple[dict[str, str], dict[str, str]]:
+    """Run requests as one batch job and wait for it to finish.
+
+    Returns the answer texts and the errors, both keyed by custom ID. Requests
+    missing from the output, e.g. because the batch expired, count as errors.
+    The job files are kept in ``work_dir``, ``LLM_BATCH_DIR`` by default.
+    """
+    if not requests:
+        return {}, {}
+    work_dir = Path(work_dir or LLM_BATCH_DIR)
+
+    job_name = f"{name}-{uuid.uuid4().hex[:8]}"
+    input_path = work_dir / f"{job_name}-input.jsonl"
+    output_path = work_dir / f"{job_name}-output.jsonl"
+    write_batch_file(requests, input_path)
+
+    batch_id = backend.submit(input_path)
+    print(f"Submitted batch {batch_id} with {len(requests)} requests")
+    start = time.perf_counter()
+    status = backend.get_status(batch_id)
+    while status not in BATCH_FINAL_STATUSES:
+        time.sleep(poll_interval)
+        status = backend.get_status(batch_id)
+    print(f"Batch {batch_id} {status} after {time.perf_counter() - start:.0f}s")
+
+    backend.download_results(batch_id, output_path)
+    answers, errors = read_batch_output(output_path)
+    for request in requests:
+        custom_id = request["custom_id"]
+        if custom_id not in answers and custom_id not in errors:
+            errors[custom_id] = f"No result, batch {status}"
+    return answers, errors
+
+
+def extract_contract_infos_in_batch(
+    contracts: dict[str, RentalContract], backend: BatchBackend, **batch_kwargs
+) -> tuple[dict[str, ContractInfo], dict[str, str]]:
+    """Extract contract information for many contracts with one batch job.
+
+    Contracts are keyed by an ID of the caller's choice. Cached extractions
+    are reused, and new ones are cached like ``extract_contract_info`` does.
+    """
+    parser = PydanticOutputParser(pydantic_object=ContractInfo)
+    prompt_template = get_extraction_prompt()
+
+    contract_infos, cache_keys, requests = {}, {}, []
+    for contract_id, contract in contracts.items():
+        cache_keys[contract_id] = get_contract_info_cache_key(contract, prompt_template)
+        cached_info = CONTRACT_INFO_CACHE.get(cache_keys[contract_id])
+        if cached_info is not None:
+            contract_infos[contract_id] = cached_info
+            continue
+        prompt = prompt_template.format(contract_text=contract.text)
+        requests.append(make_batch_request(contract_id, [HumanMessage(prompt)]))
+
+    answers, errors = run_batch(requests, backend, name="extract", **batch_kwargs)
+    for contract_id, text in answers.items():
+        try:
+            contract_infos[contract_id] = parser.parse(text)
+        except Exception as e:
+            errors[contract_id] = str(e)
+            continue
+        CONTRACT_INFO_CACHE.set(cache_keys[contract_id], contract_infos[contract_id])
+    return contract_infos, errors
+
+
+def answer_questions_in_batch(
+    rag_chain: RAGChain,
+    questions: dict[str, str],
+    backend: BatchBackend,
+    profiles: dict[str, RetrievalProfile | None] | None = None,
+    **batch_kwargs,
+) -> tuple[dict[str, LLMOutput], dict[str, str]]:
+    """Answer many questions with one batch job.
+
+    Context is retrieved locally, with the retrieval profile of each question
+    if given, and cached answers are reused and new ones cached like
+    ``RAGChain.ask`` does.
+    """
+    profiles = profiles or {}
+    answers, pending, requests = {}, {}, []
+    for question_id, question in questions.items():
+        docs, context_key, cached_answer = rag_chain.retrieve(
+            question, profiles.get(question_id)
+        )
+        if cached_answer is not None:
+            answers[question_id] = cached_answer
+            continue
+        pending[question_id] = context_key
+        requests.append(
+            make_batch_request(question_id, rag_chain.format_messages(question, docs))
+        )
+
+    texts, errors = run_batch(requests, backend, name="answer", **batch_kwargs)
+    for question_id, text in texts.items():
+        try:
+            answers[question_id] = rag_chain.parse_answer(text)
+        except Exception as e:
+            errors[question_id] = str(e)
+            continue
+        rag_chain.cache_answer(
+            questions[question_id], pending[question_id], answers[question_id]
+        )
+    return answers, errors
@@ -0,0 +1,81 @@
+"""Page-level OCR engine for scanned rental contracts"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from config import OCR_DPI, OCR_LANGUAGE, OCR_MAX_WORKERS
+
+
+@lru_cache(maxsize=1)
+def get_tesseract_version() -> str:
+    """Get the installed Tesseract version, or "unknown" if it cannot be found"""
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return "unknown"
+
+
+def get_ocr_settings(dpi: int = OCR_DPI, language: str = OCR_LANGUAGE) -> dict:
+    """Settings that change OCR output, used to invalidate cached results"""
+    return {
+        "engine": "tesseract",
+        "version": get_tesseract_version(),
+        "language": language,
+        "dpi": dpi,
+    }
+
+
+def get_page_count(file_path: str) -> int:
+    """Get the number of pages in a PDF"""
+    return int(pdfinfo_from_path(file_path)["Pages"])
+
+
+def ocr_page(
+    file_path: str, page_number: int, dpi: int = OCR_DPI, language: str = OCR_LANGUAGE
+) -> str:
+    """Rasterize and OCR a single page (1-indexed) of a PDF.
+
+    Only the requested page is rendered, so a worker never holds more than one
+    page image in memory.
+    """
+    images = convert_from_path(
+        file_path, dpi=dpi, first_page=page_number, last_page=page_number
+    )
+    return "".join(
+        pytesseract.image_to_string(image, lang=language) for image in images
+    )
+
+
+def ocr_pages(
+    file_path: str,
+    page_numbers: list[int],
+    max_workers: int = OCR_MAX_WORKERS,
+    dpi: int = OCR_DPI,
+    language: str = OCR_LANGUAGE,
+) -> list[str]:
+    """OCR the given pages of a PDF, returning their text in the same order"""
+    workers = min(max_workers, len(page_numbers))
+    if workers <= 1:
+        return [ocr_page(file_path, page, dpi, language) for page in page_numbers]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(
+            pool.map(
+                ocr_page, repeat(file_path), page_numbers, repeat(dpi), repeat(language)
+            )
+        )
+
+
+def ocr_pdf(
+    file_path: str,
+    max_workers: int = OCR_MAX_WORKERS,
+    dpi: int = OCR_DPI,
+    language: str = OCR_LANGUAGE,
+) -> str:
+    """OCR every page of a PDF in parallel and join the text in page order"""
+    page_numbers = list(range(1, get_page_count(file_path) + 1))
+    return "".join(ocr_pages(file_path, page_numbers, max_workers, dpi, language))
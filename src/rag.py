@@ -1,17 +1,143 @@
-from langchain_core.runnables import RunnablePassthrough
+import hashlib
+import re
+
+from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStoreRetriever
 from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
-from config import LLM_MODEL, LLM_TEMPERATURE
+from bulk_embedding import estimate_tokens
+from cache_store import ANSWER_CACHE, SemanticAnswerCache
+from config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    CONTEXT_MAX_TOKENS,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    RETRIEVAL_PROFILES_ENABLED,
+    RULE_BASED_VALIDATION,
+    configure_tracing,
+)
 from data_loading import load_rental_law_retriever
+from retrieval_profiles import (
+    DEPOSIT_PROFILE,
+    PREPAID_RENT_PROFILE,
+    PRICE_ADJUSTMENT_PROFILE,
+    TERMINATION_PROFILE,
+    RetrievalProfile,
+)
+from rule_checks import check_deposit_amount, check_prepaid_rent
 from pydantic import BaseModel, Field
 from langchain_core.output_parsers import PydanticOutputParser
 
 
-def format_docs(docs):
-    """Simple document formatter"""
-    return "\n\n".join(doc.page_content for doc in docs)
+SUBSECTION_REGEX = r"\s+(?=Stk\. \d+\.)"  # Splits "§ 59. ... Stk. 2. ... Stk. 3. ..."
+MIN_TRIMMED_TOKENS = 20
+
+
+def get_document_id(doc: Document) -> str:
+    """Get the vector store ID of a document, or a hash of its content"""
+    return doc.id or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def get_citation(doc: Document) -> str:
+    """Format the §, chapter and page of a law paragraph, e.g. "[§ 59. | Kapitel 6 | page 18]" """
+    parts = [doc.metadata.get("title"), doc.metadata.get("parent_title")]
+    if doc.metadata.get("page") is not None:
+        # Pages are 0-indexed by the PDF loader, cite them as printed
+        parts.append(f"page {doc.metadata['page'] + 1}")
+    return "[" + " | ".join(str(part) for part in parts if part) + "]"
+
+
+def _terms(text: str) -> set[str]:
+    return {word for word in re.findall(r"\w+", text.lower()) if len(word) > 2}
+
+
+def _trim_parts(parts: list[str], question: str, max_tokens: int) -> list[str]:
+    """Keep the first part, which names the §, and the parts most relevant to the question"""
+    question_terms = _terms(question)
+    ranked = sorted(
+        range(len(parts)),
+        key=lambda i: (i != 0, -len(_terms(parts[i]) & question_terms), i),
+    )
+    kept, budget = [], max_tokens
+    for i in ranked:
+        tokens = estimate_tokens(parts[i])
+        if tokens <= budget:
+            kept.append(i)
+            budget -= tokens
+
+    if not kept:
+        if max_tokens < MIN_TRIMMED_TOKENS:
+            return []
+        return [parts[0][: (max_tokens - 1) * 3] + " [...]"]
+
+    trimmed = []
+    for previous, i in zip([-1] + sorted(kept), sorted(kept)):
+        if i != previous + 1:
+            trimmed.append("[...]")
+        trimmed.append(parts[i])
+    if max(kept) != len(parts) - 1:
+        trimmed.append("[...]")
+    return trimmed
+
+
+def build_context(
+    docs: list[Document], question: str = "", max_tokens: int = CONTEXT_MAX_TOKENS
+) -> tuple[str, dict]:
+    """Assemble retrieved paragraphs into a context within a token budget.
+
+    Paragraphs are added in retrieval order, each under a citation with its §,
+    chapter and page. Duplicate paragraphs and subsections (stk.) that are
+    already in the context are left out. A paragraph that does not fit in the
+    remaining budget is trimmed to its share of it, keeping the subsections
+    that share the most words with the question. Returns the context and its estimated token counts.
+    """
+    blocks, seen_ids, seen_parts = [], set(), set()
+    used_tokens = 0
+    for position, doc in enumerate(docs):
+        doc_id = get_document_id(doc)
+        if doc_id in seen_ids:
+            continue
+        seen_ids.add(doc_id)
+
+        parts = [
+            part
+            for part in re.split(SUBSECTION_REGEX, doc.page_content.strip())
+            if part and " ".join(part.split()) not in seen_parts
+        ]
+        citation = get_citation(doc)
+        remaining = max_tokens - used_tokens - estimate_tokens(citation)
+        if not parts or remaining <= 0:
+            continue
+        if sum(estimate_tokens(part) for part in parts) > remaining:
+            # Leave room for the paragraphs after this one
+            share = max(remaining // (len(docs) - position), MIN_TRIMMED_TOKENS)
+            parts = _trim_parts(parts, question, min(share, remaining))
+            if not parts:
+                continue
+
+        seen_parts.update(" ".join(part.split()) for part in parts)
+        block = citation + "\n" + "\n".join(parts)
+        used_tokens += estimate_tokens(block) + 1  # Including the separator
+        blocks.append(block)
+
+    context = "\n\n".join(blocks)
+    original_tokens = sum(estimate_tokens(doc.page_content) for doc in docs)
+    context_tokens = estimate_tokens(context) if blocks else 0
+    return context, {
+        "documents": len(docs),
+        "included": len(blocks),
+        "original_tokens": original_tokens,
+        "context_tokens": context_tokens,
+        "saved_tokens": max(0, original_tokens - context_tokens),
+    }
+
+
+def format_docs(docs, question: str = "", max_tokens: int = CONTEXT_MAX_TOKENS):
+    """Format retrieved documents as a cited context within a token budget"""
+    return build_context(docs, question, max_tokens)[0]
 
 
 class LLMOutput(BaseModel):
@@ -64,50 +190,149 @@ class RAGChain:
         retriever: VectorStoreRetriever = None,
         llm: BaseLanguageModel = None,
         llm_output: LLMOutput = None,
+        answer_cache: SemanticAnswerCache = None,
+        context_max_tokens: int = CONTEXT_MAX_TOKENS,
+        use_profiles: bool = RETRIEVAL_PROFILES_ENABLED,
     ):
+        configure_tracing()
         self.retriever = retriever or load_rental_law_retriever()
         self.llm = llm or ChatOpenAI(model=LLM_MODEL, temperature=LLM_TEMPERATURE)
 
         if llm_output is None:
-            self.output_parser = LLMOutput.get_parser()
-            self.prompt = LLMOutput.get_prompt()
-        else:
-            self.output_parser = llm_output.get_parser()
-            self.prompt = llm_output.get_prompt()
+            llm_output = LLMOutput
+        self.output_parser = llm_output.get_parser()
+        self.prompt = llm_output.get_prompt()
+
+        if answer_cache is None and ANSWER_CACHE_ENABLED:
+            answer_cache = SemanticAnswerCache(
+                ANSWER_CACHE,
+                llm_output,
+                similarity_threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD,
+            )
+        self.answer_cache = answer_cache
+        self.context_max_tokens = context_max_tokens
+        self.use_profiles = use_profiles
+        # The budget changes the context, so cached answers are keyed on it too
+        self._prompt_text = (
+            f"{self.prompt.pretty_repr()}\nContext budget: {context_max_tokens}"
+        )
+        self._model_name = (
+            getattr(self.llm, "model_name", None)
+            or getattr(self.llm, "model", None)
+            or type(self.llm).__name__
+        )
 
         self._chain = self._build_chain()
 
     def _build_chain(self):
-        """Build the RAG chain"""
-        return (
-            {
-                "context": self.retriever | format_docs,
-                "question": RunnablePassthrough(),
-            }
-            | self.prompt
-            | self.llm
-            | self.output_parser
+        """Build the answer chain, which gets the retrieved context as input"""
+        return self.prompt | self.llm | self.output_parser
+
+    def retrieve_documents(
+        self, question: str, profile: RetrievalProfile | None = None
+    ) -> list[Document]:
+        """Retrieve the law paragraphs for a question, following a retrieval profile"""
+        if profile is None or not self.use_profiles:
+            return self.retriever.invoke(question)
+
+        supports_keywords = getattr(self.retriever, "supports_keywords", False)
+        docs = self.retriever.invoke(
+            question, **profile.search_kwargs(keywords=supports_keywords)
+        )
+        if profile.pinned:
+            pinned = self.retriever.invoke(question, **profile.pinned_search_kwargs())
+            pinned_ids = {get_document_id(doc) for doc in pinned}
+            docs = pinned + [
+                doc for doc in docs if get_document_id(doc) not in pinned_ids
+            ]
+        return docs
+
+    def retrieve(
+        self, question: str, profile: RetrievalProfile | None = None
+    ) -> tuple[list[Document], str | None, LLMOutput | None]:
+        """Retrieve the context for a question.
+
+        Returns the documents, the answer cache key for them and the cached
+        answer, if there is one.
+        """
+        docs = self.retrieve_documents(question, profile)
+        if self.answer_cache is None:
+            return docs, None, None
+
+        context_key = SemanticAnswerCache.make_context_key(
+            [get_document_id(doc) for doc in docs],
+            self._prompt_text,
+            self._model_name,
+        )
+        return docs, context_key, self.answer_cache.get(question, context_key)
+
+    def build_context(self, question: str, docs: list[Document]) -> str:
+        """Build the context for a question and report the prompt size"""
+        context, stats = build_context(docs, question, self.context_max_tokens)
+        prompt_tokens = estimate_tokens(
+            self.prompt.format(context=context, question=question)
+        )
+        print(
+            f"Prompt ~{prompt_tokens} tokens: {stats['included']} of "
+            f"{stats['documents']} paragraphs, {stats['saved_tokens']} context "
+            f"tokens saved"
         )
+        return context
+
+    def format_messages(self, question: str, docs: list[Document]) -> list[BaseMessage]:
+        """Render the prompt for a question and its retrieved documents"""
+        return self.prompt.format_messages(
+            context=self.build_context(question, docs), question=question
+        )
+
+    def parse_answer(self, text: str) -> LLMOutput:
+        """Parse the raw text of an LLM answer"""
+        return self.output_parser.parse(text)
 
-    def ask(self, question: str) -> LLMOutput | str:
-        """Ask a question and get an answer"""
-        return self._chain.invoke(question)
+    def cache_answer(self, question: str, context_key: str | None, answer: LLMOutput):
+        """Store an answer in the answer cache, if caching is enabled"""
+        if self.answer_cache is not None:
+            self.answer_cache.set(question, context_key, answer)
+
+    def ask(
+        self, question: str, profile: RetrievalProfile | None = None
+    ) -> LLMOutput | str:
+        """Ask a question and get an answer, reusing cached answers when possible"""
+        docs, context_key, cached_answer = self.retrieve(question, profile)
+        if cached_answer is not None:
+            return cached_answer
+
+        answer = self._chain.invoke(
+            {"context": self.build_context(question, docs), "question": question}
+        )
+        self.cache_answer(question, context_key, answer)
+        return answer
 
 
 def validate_deposit_amount(
     rag_chain: RAGChain, deposit_amount: str, monthly_rental_amount: str
 ) -> LLMOutput:
-    """Check if deposit amount is legal"""
+    """Check if deposit amount is legal, asking the LLM only if the amounts can't be parsed"""
+    if RULE_BASED_VALIDATION:
+        result = check_deposit_amount(deposit_amount, monthly_rental_amount)
+        if result is not None:
+            return LLMOutput(**result)
+
     question = f"Is a deposit of {deposit_amount} legal for a rental property with monthly rent of {monthly_rental_amount}?"
-    return rag_chain.ask(question)
+    return rag_chain.ask(question, DEPOSIT_PROFILE)
 
 
 def validate_prepaid_rent(
     rag_chain: RAGChain, prepaid_rent: str, monthly_rental_amount: str
 ) -> LLMOutput:
-    """Check if prepaid rent is legal"""
+    """Check if prepaid rent is legal, asking the LLM only if the amounts can't be parsed"""
+    if RULE_BASED_VALIDATION:
+        result = check_prepaid_rent(prepaid_rent, monthly_rental_amount)
+        if result is not None:
+            return LLMOutput(**result)
+
     question = f"Is a prepaid rent of {prepaid_rent} legal for a rental property with monthly rent of {monthly_rental_amount}?"
-    return rag_chain.ask(question)
+    return rag_chain.ask(question, PREPAID_RENT_PROFILE)
 
 
 def validate_termination_conditions(
@@ -115,7 +340,7 @@ def validate_termination_conditions(
 ) -> LLMOutput:
     """Check if termination conditions are legal"""
     question = f"Are these termination conditions legal: {termination_conditions}?"
-    return rag_chain.ask(question)
+    return rag_chain.ask(question, TERMINATION_PROFILE)
 
 
 def validate_price_adjustments(
@@ -123,4 +348,4 @@ def validate_price_adjustments(
 ) -> LLMOutput:
     """Check if price adjustment conditions are legal"""
     question = f"Are these price adjustment conditions legal: {price_adjustments}?"
-    return rag_chain.ask(question)
+    return rag_chain.ask(question, PRICE_ADJUSTMENT_PROFILE)
@@ -0,0 +1,62 @@
+"""Retrieval profiles that target the parts of the rental law each check needs
+
+The chapters and paragraphs refer to lejeloven 2025, as split into chunks by
+``split_doc_by_regex``: ``parent_title`` is the chapter ("Kapitel 6") and
+``title`` the paragraph ("§ 59.").
+"""
+
+from pydantic import BaseModel, Field
+
+
+class RetrievalProfile(BaseModel):
+    """How to retrieve the law paragraphs for one kind of question"""
+
+    chapters: list[str] = Field(
+        description="Only search paragraphs in these chapters (all if empty)",
+        default_factory=list,
+    )
+    pinned: list[str] = Field(
+        description="Paragraphs that are always included, ahead of the search results",
+        default_factory=list,
+    )
+    keywords: list[str] = Field(
+        description="Danish legal terms added to the query of keyword (BM25) search",
+        default_factory=list,
+    )
+    k: int = Field(description="Number of paragraphs to search for", default=5)
+
+    def search_kwargs(self, keywords: bool = False) -> dict:
+        """Search keyword arguments for a retriever, with ``keywords`` if it supports them"""
+        search_kwargs = {"k": self.k}
+        if self.chapters:
+            search_kwargs["filter"] = {"parent_title": {"$in": self.chapters}}
+        if keywords and self.keywords:
+            search_kwargs["keywords"] = self.keywords
+        return search_kwargs
+
+    def pinned_search_kwargs(self) -> dict:
+        """Search keyword arguments that retrieve exactly the pinned paragraphs"""
+        return {"k": len(self.pinned), "filter": {"title": {"$in": self.pinned}}}
+
+
+# Kapitel 6: Betaling af leje, with § 59 on deposit and prepaid rent
+DEPOSIT_PROFILE = RetrievalProfile(
+    chapters=["Kapitel 6"], pinned=["§ 59."], keywords=["depositum"], k=3
+)
+PREPAID_RENT_PROFILE = RetrievalProfile(
+    chapters=["Kapitel 6"], pinned=["§ 59."], keywords=["forudbetalt leje"], k=3
+)
+# Kapitel 20: Opsigelse, Kapitel 21: Udlejerens ret til at hæve lejeaftalen
+TERMINATION_PROFILE = RetrievalProfile(
+    chapters=["Kapitel 20", "Kapitel 21"],
+    pinned=["§ 169.", "§ 170."],
+    keywords=["opsigelse", "opsigelsesvarsel", "ophævelse"],
+    k=4,
+)
+# Kapitel 3-5: rent setting and regulation, with § 53 on net price index regulation
+PRICE_ADJUSTMENT_PROFILE = RetrievalProfile(
+    chapters=["Kapitel 3", "Kapitel 4", "Kapitel 5"],
+    pinned=["§ 53."],
+    keywords=["lejeforhøjelse", "regulering", "nettoprisindeks"],
+    k=4,
+)
@@ -0,0 +1,137 @@
+"""Deterministic checks for contract terms that are plain arithmetic"""
+
+import re
+
+# Lejeloven § 59: deposit (stk. 1) and prepaid rent (stk. 3) of at most 3 months' rent
+MAX_DEPOSIT_MONTHS = 3
+MAX_PREPAID_RENT_MONTHS = 3
+DEPOSIT_REFERENCES = {"§ 59, stk. 1": "18"}
+PREPAID_RENT_REFERENCES = {"§ 59, stk. 3": "18"}
+
+NUMBER_REGEX = r"\d(?:[\d.,]|\s(?=\d{3}\b))*"
+MONTHS_REGEX = rf"({NUMBER_REGEX})\s*(?:måneder|måneders|mdr\.?|months?)\b"
+CURRENCY_REGEX = r"\b(?:kr|dkk)\b|,-"
+ZERO_AMOUNT_TERMS = {"0", "ingen", "none", "nej", "no"}
+
+
+def parse_number(text: str) -> float | None:
+    """Parse a number written in Danish or English notation.
+
+    "12.000,00", "12 000", "12,000.00" and "12000" are all 12000.
+    """
+    text = re.sub(r"\s", "", text).rstrip(".,")
+    if not text:
+        return None
+
+    if "." in text and "," in text:
+        # The separator that comes last is the decimal separator
+        decimal, thousands = (
+            (",", ".") if text.rfind(",") > text.rfind(".") else (".", ",")
+        )
+        text = text.replace(thousands, "").replace(decimal, ".")
+    elif "," in text or "." in text:
+        separator = "," if "," in text else "."
+        groups = text.split(separator)
+        if len(groups) > 2 or len(groups[-1]) == 3:
+            text = "".join(groups)  # Thousands separator, e.g. "12.000"
+        else:
+            text = ".".join(groups)  # Decimal separator, e.g. "3000,50"
+
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_amount(text: str) -> float | None:
+    """Parse a single DKK amount such as "6000 DKK", "kr. 12.000,00" or "9.000,-".
+
+    Returns None when the text does not contain exactly one amount.
+    """
+    normalized = text.strip().lower()
+    if normalized.rstrip(".") in ZERO_AMOUNT_TERMS:
+        return 0.0
+
+    numbers = re.findall(NUMBER_REGEX, normalized)
+    has_currency = re.search(CURRENCY_REGEX, normalized) is not None
+    is_bare_number = re.fullmatch(rf"\s*{NUMBER_REGEX}\s*", normalized) is not None
+    if len(numbers) != 1 or not (has_currency or is_bare_number):
+        return None
+    return parse_number(numbers[0])
+
+
+def parse_months(text: str) -> float | None:
+    """Parse an amount expressed in months of rent, e.g. "3 måneders leje" """
+    matches = re.findall(MONTHS_REGEX, text.lower())
+    if len(matches) != 1 or len(re.findall(NUMBER_REGEX, text)) != 1:
+        return None
+    return parse_number(matches[0])
+
+
+def check_months_of_rent(
+    amount_text: str,
+    monthly_rent_text: str,
+    max_months: int,
+    term: str,
+    references: dict[str, str],
+) -> dict | None:
+    """Check that an amount does not exceed ``max_months`` of rent.
+
+    Returns the fields of an LLMOutput, or None if the amounts cannot be parsed
+    unambiguously and the check should be left to the LLM.
+    """
+    months = parse_months(amount_text)
+    if months is None:
+        amount = parse_amount(amount_text)
+        monthly_rent = parse_amount(monthly_rent_text)
+        if amount is None or not monthly_rent:
+            return None
+        months = amount / monthly_rent
+
+    if months <= max_months:
+        description = (
+            f"The {term} of {amount_text} corresponds to {months:g} months' rent "
+            f"(monthly rent {monthly_rent_text}), which is within the legal maximum "
+            f"of {max_months} months' rent."
+        )
+    else:
+        description = (
+            f"The {term} of {amount_text} corresponds to {months:g} months' rent "
+            f"(monthly rent {monthly_rent_text}), which exceeds the legal maximum "
+            f"of {max_months} months' rent."
+        )
+
+    return {
+        "should_be_checked": months > max_months,
+        "description": description,
+        "references": dict(references),
+    }
+
+
+def check_deposit_amount(
+    deposit_amount: str, monthly_rental_amount: str
+) -> dict | None:
+    """Check the deposit against the 3 months' rent limit"""
+    return check_months_of_rent(
+        deposit_amount,
+        monthly_rental_amount,
+        MAX_DEPOSIT_MONTHS,
+        "deposit",
+        DEPOSIT_REFERENCES,
+    )
+
+
+def check_prepaid_rent(prepaid_rent: str, monthly_rental_amount: str) -> dict | None:
+    """Check the prepaid rent against the 3 months' rent limit"""
+    result = check_months_of_rent(
+        prepaid_rent,
+        monthly_rental_amount,
+        MAX_PREPAID_RENT_MONTHS,
+        "prepaid rent",
+        PREPAID_RENT_REFERENCES,
+    )
+    if result is not None and not result["should_be_checked"]:
+        result["description"] += (
+            " It must also not exceed the rent payable during the tenant's notice period."
+        )
+    return result
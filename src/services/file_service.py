@@ -3,7 +3,7 @@
 import base64
 import hashlib
 from pathlib import Path
-from config import CACHE_DIR
+from cache_store import UPLOAD_CACHE
 
 
 def get_cached_file_path(contents, filename):
@@ -22,11 +22,11 @@ def get_cached_file_path(contents, filename):
 
     # Create cached filename: originalname_hash.pdf
     cached_filename = f"{name_without_ext}_{content_hash}{ext}"
-    cached_file_path = CACHE_DIR / cached_filename
 
-    # Write file if it doesn't exist
-    if not cached_file_path.exists():
-        cached_file_path.write_bytes(decoded)
+    # Write file if it isn't cached yet
+    cached_file_path = UPLOAD_CACHE.get_file(cached_filename)
+    if cached_file_path is None:
+        cached_file_path = UPLOAD_CACHE.put_file(cached_filename, decoded)
 
     return str(cached_file_path)
 
@@ -0,0 +1,120 @@
+"""Liveness and readiness of the app
+
+``/healthz`` answers as soon as the server runs. ``/readyz`` only answers 200
+once the warm-up has loaded the law index, run a probe query against it and
+parsed and extracted the sample contracts, so a load balancer doesn't route
+traffic to a replica whose first requests would take half a minute.
+"""
+
+import threading
+import time
+
+from flask import Flask, jsonify
+
+from startup import LazyRAGChain
+from ui.contracts import SAMPLE_CONTRACTS
+
+# Warm-up steps, in order
+CHECK_INDEX = "index"
+CHECK_PROBE = "probe"
+CHECK_SAMPLES = "sample_caches"
+CHECKS = [CHECK_INDEX, CHECK_PROBE, CHECK_SAMPLES]
+PROBE_QUESTION = "Hvor stort må depositum være?"
+
+
+class Readiness:
+    """Warms up the RAG chain and caches in a background thread.
+
+    A failed step is reported with its error and retried by the next
+    ``start``, while the steps that passed are not repeated.
+    """
+
+    def __init__(self, rag_chain, sample_contracts: list[dict] = SAMPLE_CONTRACTS):
+        self.rag_chain = rag_chain
+        self.sample_contracts = sample_contracts
+        self.checks = dict.fromkeys(CHECKS, False)
+        self.error = None
+        self.seconds = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return all(self.checks.values())
+
+    @property
+    def warming_up(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> threading.Thread | None:
+        """Start the warm-up, unless it is running or has finished"""
+        with self._lock:
+            if self.ready or self.warming_up:
+                return self._thread
+            self._thread = threading.Thread(
+                target=self._warm_up, name="readiness-warm-up", daemon=True
+            )
+            self._thread.start()
+            return self._thread
+
+    def _get_chain(self):
+        if isinstance(self.rag_chain, LazyRAGChain):
+            return self.rag_chain.get()
+        return self.rag_chain
+
+    def _warm_up(self):
+        start = time.perf_counter()
+        try:
+            chain = self._get_chain()
+            self.checks[CHECK_INDEX] = True
+
+            if not self.checks[CHECK_PROBE]:
+                if not chain.retriever.invoke(PROBE_QUESTION):
+                    raise RuntimeError("Probe query returned no law paragraphs")
+                self.checks[CHECK_PROBE] = True
+
+            if not self.checks[CHECK_SAMPLES]:
+                self._warm_sample_caches()
+                self.checks[CHECK_SAMPLES] = True
+        except Exception as e:
+            self.error = str(e)
+            print(f"Warm-up failed: {e}")
+            return
+        self.error = None
+        self.seconds = time.perf_counter() - start
+        print(f"Ready after a warm-up of {self.seconds:.1f}s")
+
+    def _warm_sample_caches(self):
+        """Parse and extract the sample contracts, filling their caches"""
+        from contract_loader import extract_contract_info, parse_contract_pdf_to_text
+        from services.file_service import get_sample_filepath
+
+        for contract in self.sample_contracts:
+            file_path = get_sample_filepath(contract["filename"])
+            if file_path is None:
+                continue  # Already reported, and the app works without it
+            extract_contract_info(parse_contract_pdf_to_text(file_path))
+
+    def status(self) -> dict:
+        if self.ready:
+            status = "ready"
+        elif self.warming_up:
+            status = "warming_up"
+        else:
+            status = "failed" if self.error else "not_started"
+        return {"status": status, "checks": dict(self.checks), "error": self.error}
+
+
+def register_health_routes(server: Flask, readiness: Readiness):
+    """Add ``/healthz`` and ``/readyz`` to the Flask server of the Dash app"""
+
+    @server.route("/healthz")
+    def healthz():
+        return jsonify({"status": "ok"})
+
+    @server.route("/readyz")
+    def readyz():
+        if not readiness.ready:
+            readiness.start()  # Retries a failed warm-up, or starts a lazy one
+        status = readiness.status()
+        return jsonify(status), 200 if readiness.ready else 503
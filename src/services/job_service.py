@@ -0,0 +1,146 @@
+"""Background validation jobs with results stored in SQLite
+
+Jobs run in a thread pool in the process that submitted them, while their state
+and partial results are written to SQLite. Any process serving the app can
+therefore poll a job, and the callback that starts it returns immediately.
+Jobs for a contract that is already being validated follow that validation
+instead of running their own.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from config import VALIDATION_JOB_DB, VALIDATION_JOB_TTL_HOURS, VALIDATION_JOB_WORKERS
+from services.validation_service import iter_shared_contract_validation
+
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class JobStore:
+    """SQLite-backed store of job status and per-stage results"""
+
+    def __init__(self, db_path: Path = VALIDATION_JOB_DB):
+        self.db_path = Path(db_path)
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._init_lock:
+            if not self._initialized:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                with closing(sqlite3.connect(self.db_path)) as connection:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS jobs (
+                            job_id TEXT PRIMARY KEY,
+                            status TEXT NOT NULL,
+                            error TEXT,
+                            created_at REAL NOT NULL
+                        );
+                        CREATE TABLE IF NOT EXISTS job_results (
+                            job_id TEXT NOT NULL,
+                            name TEXT NOT NULL,
+                            value TEXT NOT NULL,
+                            PRIMARY KEY (job_id, name)
+                        );
+                        """
+                    )
+                self._initialized = True
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _execute(self, *statements: tuple[str, tuple]):
+        with closing(self._connect()) as connection, connection:
+            for sql, parameters in statements:
+                connection.execute(sql, parameters)
+
+    def create(self) -> str:
+        """Create a running job and drop jobs past their TTL"""
+        job_id = uuid.uuid4().hex
+        expired = time.time() - VALIDATION_JOB_TTL_HOURS * 60 * 60
+        self._execute(
+            (
+                "DELETE FROM job_results WHERE job_id IN "
+                "(SELECT job_id FROM jobs WHERE created_at < ?)",
+                (expired,),
+            ),
+            ("DELETE FROM jobs WHERE created_at < ?", (expired,)),
+            (
+                "INSERT INTO jobs (job_id, status, created_at) VALUES (?, ?, ?)",
+                (job_id, JOB_RUNNING, time.time()),
+            ),
+        )
+        return job_id
+
+    def add_result(self, job_id: str, name: str, value):
+        """Store the result of one stage of a job"""
+        if isinstance(value, BaseModel):
+            value = value.model_dump()
+        self._execute(
+            (
+                "INSERT OR REPLACE INTO job_results (job_id, name, value) "
+                "VALUES (?, ?, ?)",
+                (job_id, name, json.dumps(value, ensure_ascii=False)),
+            )
+        )
+
+    def finish(self, job_id: str, error: str | None = None):
+        """Mark a job as done, or as failed if an error is given"""
+        status = JOB_FAILED if error else JOB_DONE
+        self._execute(
+            (
+                "UPDATE jobs SET status = ?, error = ? WHERE job_id = ?",
+                (status, error, job_id),
+            )
+        )
+
+    def get(self, job_id: str) -> dict | None:
+        """Get a job's status, error and the results of the stages finished so far"""
+        with closing(self._connect()) as connection:
+            job = connection.execute(
+                "SELECT status, error FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            results = connection.execute(
+                "SELECT name, value FROM job_results WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {
+            "status": job[0],
+            "error": job[1],
+            "results": {name: json.loads(value) for name, value in results},
+        }
+
+
+JOB_STORE = JobStore()
+_executor = ThreadPoolExecutor(
+    max_workers=VALIDATION_JOB_WORKERS, thread_name_prefix="validation-job"
+)
+
+
+def _run_validation_job(job_store, job_id, rag_chain, file_path):
+    try:
+        for name, result in iter_shared_contract_validation(rag_chain, file_path):
+            job_store.add_result(job_id, name, result)
+    except Exception as e:
+        print(f"Validation job {job_id} failed: {e}")
+        job_store.finish(job_id, error=str(e))
+    else:
+        job_store.finish(job_id)
+
+
+def submit_validation_job(rag_chain, file_path, job_store: JobStore = JOB_STORE) -> str:
+    """Start validating a contract in the background and return the job ID"""
+    job_id = job_store.create()
+    _executor.submit(_run_validation_job, job_store, job_id, rag_chain, file_path)
+    return job_id
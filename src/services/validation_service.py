@@ -1,6 +1,13 @@
 """Contract validation services"""
 
-from contract_loader import load_contract_and_extract_info
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from config import CONCURRENT_VALIDATION, VALIDATION_MAX_CONCURRENCY
+from contract_loader import hash_file_contents, load_contract_and_extract_info
+from llm_batch import BatchBackend, answer_questions_in_batch
 from rag import (
     validate_deposit_amount,
     validate_prepaid_rent,
@@ -9,32 +16,273 @@ from rag import (
 )
 
 
-def validate_contract_file(rag_chain, file_path):
-    """Validate a contract file and return all validation results"""
+VALIDATION_RESULT_KEYS = [
+    "contract_info",
+    "deposit_result",
+    "prepaid_result",
+    "termination_result",
+    "price_adjustment_result",
+]
+# Checks running concurrently in this process, across all contracts being validated
+CHECK_SLOTS = threading.BoundedSemaphore(VALIDATION_MAX_CONCURRENCY)
+
+
+def _build_validation_checks(rag_chain, contract_info):
+    """Map each result key to a zero-argument call of its validator"""
+    return {
+        "deposit_result": lambda: validate_deposit_amount(
+            rag_chain, contract_info.deposit_amount, contract_info.monthly_rental_amount
+        ),
+        "prepaid_result": lambda: validate_prepaid_rent(
+            rag_chain, contract_info.prepaid_rent, contract_info.monthly_rental_amount
+        ),
+        "termination_result": lambda: validate_termination_conditions(
+            rag_chain, contract_info.termination_conditions
+        ),
+        "price_adjustment_result": lambda: validate_price_adjustments(
+            rag_chain, contract_info.price_adjustments
+        ),
+    }
+
+
+class _QuestionRecorder:
+    """Stands in for a RAGChain and records the question a validator asks"""
+
+    def __init__(self):
+        self.question = None
+        self.profile = None
+
+    def ask(self, question, profile=None):
+        self.question = question
+        self.profile = profile
+
+
+def validate_contract_infos_in_batch(
+    rag_chain, contract_infos: dict, backend: BatchBackend, **batch_kwargs
+) -> tuple[dict[str, dict], dict[str, str]]:
+    """Validate many contracts, asking all their LLM questions in one batch job.
+
+    Checks that are decided without the LLM are answered right away. Returns
+    the results of each contract keyed like the checks, and an error for each
+    contract that could not be fully validated.
+    """
+    results, questions, profiles = {}, {}, {}
+    for contract_id, contract_info in contract_infos.items():
+        recorder = _QuestionRecorder()
+        results[contract_id] = {}
+        for name, check in _build_validation_checks(recorder, contract_info).items():
+            recorder.question = None
+            result = check()
+            if recorder.question is None:
+                results[contract_id][name] = result
+            else:
+                questions[f"{contract_id}:{name}"] = recorder.question
+                profiles[f"{contract_id}:{name}"] = recorder.profile
+
+    answers, answer_errors = answer_questions_in_batch(
+        rag_chain, questions, backend, profiles=profiles, **batch_kwargs
+    )
+    for question_id, answer in answers.items():
+        contract_id, name = question_id.rsplit(":", 1)
+        results[contract_id][name] = answer
+
+    failures = {}
+    for question_id, error in answer_errors.items():
+        contract_id, name = question_id.rsplit(":", 1)
+        failures.setdefault(contract_id, []).append(f"{name}: {error}")
+        results.pop(contract_id, None)
+    errors = {
+        contract_id: "; ".join(messages) for contract_id, messages in failures.items()
+    }
+
+    check_names = VALIDATION_RESULT_KEYS[1:]
+    return {
+        contract_id: {name: checks[name] for name in check_names}
+        for contract_id, checks in results.items()
+    }, errors
+
+
+def iter_validation_checks(
+    checks, concurrent=CONCURRENT_VALIDATION, max_concurrency=VALIDATION_MAX_CONCURRENCY
+):
+    """Run validation checks, yielding ``(name, result)`` pairs as each one finishes.
+
+    In concurrent mode the checks share a thread pool of at most
+    ``max_concurrency`` workers, so latency is bounded by the slowest check.
+    Each check also takes one of the ``CHECK_SLOTS``, so the simultaneous LLM
+    requests of all validations in the process stay under
+    ``VALIDATION_MAX_CONCURRENCY`` too.
+    """
+    if not concurrent or max_concurrency <= 1:
+        for name, check in checks.items():
+            yield name, check()
+        return
+
+    def run(check):
+        with CHECK_SLOTS:
+            return check()
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(checks))) as pool:
+        futures = {pool.submit(run, check): name for name, check in checks.items()}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def run_validation_checks(
+    checks, concurrent=CONCURRENT_VALIDATION, max_concurrency=VALIDATION_MAX_CONCURRENCY
+):
+    """Run validation checks and return their results keyed like the checks"""
+    results = dict(iter_validation_checks(checks, concurrent, max_concurrency))
+    return {name: results[name] for name in checks}
+
+
+def validate_contract_info(
+    rag_chain,
+    contract_info,
+    concurrent=CONCURRENT_VALIDATION,
+    max_concurrency=VALIDATION_MAX_CONCURRENCY,
+):
+    """Run all validators on extracted contract information"""
+    checks = _build_validation_checks(rag_chain, contract_info)
+    return run_validation_checks(checks, concurrent, max_concurrency)
+
+
+def iter_contract_validation(
+    rag_chain,
+    file_path,
+    concurrent=CONCURRENT_VALIDATION,
+    max_concurrency=VALIDATION_MAX_CONCURRENCY,
+):
+    """Validate a contract file, yielding ``(name, result)`` pairs as each stage finishes.
+
+    The extracted ``contract_info`` comes first, followed by the validation
+    results in the order they complete.
+    """
     # Extract contract information
     contract_info = load_contract_and_extract_info(file_path)
+    yield "contract_info", contract_info
 
     # Perform validations
-    deposit_result = validate_deposit_amount(
-        rag_chain, contract_info.deposit_amount, contract_info.monthly_rental_amount
-    )
+    checks = _build_validation_checks(rag_chain, contract_info)
+    yield from iter_validation_checks(checks, concurrent, max_concurrency)
 
-    prepaid_result = validate_prepaid_rent(
-        rag_chain, contract_info.prepaid_rent, contract_info.monthly_rental_amount
-    )
 
-    termination_result = validate_termination_conditions(
-        rag_chain, contract_info.termination_conditions
+def validate_contract_file(
+    rag_chain,
+    file_path,
+    concurrent=CONCURRENT_VALIDATION,
+    max_concurrency=VALIDATION_MAX_CONCURRENCY,
+):
+    """Validate a contract file and return all validation results"""
+    results = dict(
+        iter_contract_validation(rag_chain, file_path, concurrent, max_concurrency)
     )
+    return {name: results[name] for name in VALIDATION_RESULT_KEYS}
 
-    price_adjustment_result = validate_price_adjustments(
-        rag_chain, contract_info.price_adjustments
-    )
 
-    return {
-        "contract_info": contract_info,
-        "deposit_result": deposit_result,
-        "prepaid_result": prepaid_result,
-        "termination_result": termination_result,
-        "price_adjustment_result": price_adjustment_result,
-    }
+class InFlightValidation:
+    """The stages of a running validation, which any number of callers can follow"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._stages = []
+        self._done = False
+        self._error = None
+
+    def publish(self, name: str, result):
+        with self._condition:
+            self._stages.append((name, result))
+            self._condition.notify_all()
+
+    def finish(self, error: Exception | None = None):
+        with self._condition:
+            if not self._done:
+                self._done = True
+                self._error = error
+                self._condition.notify_all()
+
+    def __iter__(self) -> Iterator[tuple[str, object]]:
+        """Yield every stage from the first, waiting for those still to come"""
+        position = 0
+        while True:
+            with self._condition:
+                while position == len(self._stages) and not self._done:
+                    self._condition.wait()
+                if position == len(self._stages):
+                    if self._error is not None:
+                        raise self._error
+                    return
+                stage = self._stages[position]
+            position += 1
+            yield stage
+
+
+class InFlightRegistry:
+    """Validations in progress, keyed so identical requests share one run.
+
+    The first caller for a key runs the validation and publishes each stage;
+    callers arriving while it runs follow the same stages instead of repeating
+    the OCR and LLM calls. Finished validations are forgotten, since their
+    parsed contract and extracted information are in the cache by then.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._validations = {}
+
+    def __contains__(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._validations
+
+    def iter_validation(
+        self, key: tuple, run: Callable[[], Iterator[tuple[str, object]]]
+    ) -> Iterator[tuple[str, object]]:
+        """Follow the running validation of a key, or start it with ``run``"""
+        with self._lock:
+            validation = self._validations.get(key)
+            is_leader = validation is None
+            if is_leader:
+                validation = self._validations[key] = InFlightValidation()
+        if not is_leader:
+            yield from validation
+            return
+
+        try:
+            for name, result in run():
+                validation.publish(name, result)
+                yield name, result
+            validation.finish()
+        except Exception as e:
+            validation.finish(e)
+            raise
+        finally:
+            with self._lock:
+                del self._validations[key]
+            # Only has an effect if the caller stopped following the validation
+            validation.finish(RuntimeError("The validation was cancelled"))
+
+
+IN_FLIGHT_VALIDATIONS = InFlightRegistry()
+
+
+def iter_shared_contract_validation(
+    rag_chain,
+    file_path,
+    concurrent=CONCURRENT_VALIDATION,
+    max_concurrency=VALIDATION_MAX_CONCURRENCY,
+    registry: InFlightRegistry = IN_FLIGHT_VALIDATIONS,
+):
+    """Like ``iter_contract_validation``, but joins a running validation of the same contract.
+
+    Contracts are identified by the hash of their contents, so the same sample
+    or upload validated by several users at once is only processed once.
+    """
+    key = (hash_file_contents(file_path), id(rag_chain))
+    if key in registry:
+        print(f"Joining the validation in progress of {Path(file_path).name}")
+    yield from registry.iter_validation(
+        key,
+        lambda: iter_contract_validation(
+            rag_chain, file_path, concurrent, max_concurrency
+        ),
+    )
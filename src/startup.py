@@ -0,0 +1,141 @@
+"""Fast app startup: deferred RAG chain construction and a startup report
+
+Building the RAG chain imports the LLM and vector store libraries, opens the
+vector store and may build the law index, which takes seconds. The app
+instead starts with a LazyRAGChain, which builds the chain on first use or in
+a warm-up thread while the server already answers requests.
+
+Usage:
+    python src/startup.py            # Slowest imports of the app and its startup time
+    python src/startup.py --warm-up  # Also time building the RAG chain
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+IMPORT_MARKER = "-- import --"
+
+
+class LazyRAGChain:
+    """Stand-in for a RAGChain that is built on first use or by a warm-up thread.
+
+    Attribute access waits for the chain to be built, so it can be passed
+    wherever a RAGChain is expected. A failed build is retried on next use.
+    """
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._chain = None
+        self._build_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self.error = None
+        self.build_seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self._chain is not None
+
+    def get(self):
+        """Get the chain, building it now if that hasn't happened yet"""
+        if self._chain is not None:
+            return self._chain
+        with self._build_lock:
+            if self._chain is None:
+                start = time.perf_counter()
+                try:
+                    self._chain = self._factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.error = None
+                self.build_seconds = time.perf_counter() - start
+                print(f"RAG chain ready in {self.build_seconds:.1f}s")
+        return self._chain
+
+    def warm_up(self) -> threading.Thread:
+        """Build the chain in a background thread"""
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._warm_up, name="rag-chain-warm-up", daemon=True
+                )
+                self._thread.start()
+        return self._thread
+
+    def _warm_up(self):
+        try:
+            self.get()
+        except Exception as e:
+            print(f"RAG chain warm-up failed, retrying on first use: {e}")
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def import_time_report(module: str = "app", top: int = 20) -> list[dict]:
+    """Import a module in a fresh interpreter with ``-X importtime``.
+
+    Returns the ``top`` imports with the highest cumulative time, slowest first.
+    """
+    # Imports before the marker are the interpreter's own startup
+    code = f"import sys; sys.stderr.write('{IMPORT_MARKER}\\n'); import {module}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).parent,
+        check=True,
+    )
+    lines = result.stderr.splitlines()
+    imports = []
+    for line in lines[lines.index(IMPORT_MARKER) + 1 :]:
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        imports.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_seconds": int(self_us) / 1e6,
+                "cumulative_seconds": int(cumulative_us) / 1e6,
+            }
+        )
+    imports.sort(key=lambda row: -row["cumulative_seconds"])
+    return imports[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the startup time of the app")
+    parser.add_argument("--module", default="app", help="Module to import")
+    parser.add_argument("--top", type=int, default=20, help="Number of imports")
+    parser.add_argument(
+        "--warm-up", action="store_true", help="Also time building the RAG chain"
+    )
+    args = parser.parse_args()
+
+    print(f"Slowest imports of '{args.module}' (cumulative, self):")
+    for row in import_time_report(args.module, args.top):
+        print(
+            f"  {row['cumulative_seconds']:7.3f}s {row['self_seconds']:7.3f}s  "
+            f"{'  ' * row['depth']}{row['module']}"
+        )
+
+    start = time.perf_counter()
+    from app import create_app
+
+    app = create_app(rag_chain_startup="lazy")
+    print(f"App created in {time.perf_counter() - start:.2f}s")
+
+    if args.warm_up:
+        app.rag_chain.get()
+        print(f"RAG chain built in {app.rag_chain.build_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,22 @@ from dash import html
 
 from ui.contracts import SAMPLE_CONTRACTS
 from services.file_service import get_cached_file_path, get_sample_filepath
-from services.validation_service import validate_contract_file
 from ui.components import (
     create_validation_card,
     create_contract_summary_filled,
+    create_contract_summary_placeholder,
+    create_pending_card,
     create_placeholder_card,
 )
 
+# Validation result keys with the title and icon of their card
+VALIDATION_CARDS = [
+    ("deposit_result", "Deposit Amount Validation", "💰"),
+    ("prepaid_result", "Prepaid Rent Validation", "💰"),
+    ("termination_result", "Termination Conditions Validation", "📋"),
+    ("price_adjustment_result", "Price Adjustment Validation", "💹"),
+]
+
 
 def register_callbacks(app, rag_chain):
     """Register all callbacks for the app"""
@@ -155,22 +164,25 @@ def register_callbacks(app, rag_chain):
 
     @app.callback(
         [
-            Output("contract-summary", "children"),
-            Output("deposit-validation", "children"),
-            Output("prepaid-validation", "children"),
-            Output("termination-validation", "children"),
-            Output("price-validation", "children"),
-            Output("validation-results-container", "style", allow_duplicate=True),
-            Output("validation-results-container", "className", allow_duplicate=True),
+            Output("validation-job", "data"),
+            Output("validation-poll", "disabled"),
+            Output("contract-summary", "children", allow_duplicate=True),
+            Output("deposit-validation", "children", allow_duplicate=True),
+            Output("prepaid-validation", "children", allow_duplicate=True),
+            Output("termination-validation", "children", allow_duplicate=True),
+            Output("price-validation", "children", allow_duplicate=True),
         ],
         [Input("validate-button", "n_clicks")],
         [State("contract-store", "data")],
         prevent_initial_call=True,
     )
     def validate_contract(n_clicks, contract_data):
-        """Validate the loaded contract"""
+        """Start validating the loaded contract in the background"""
         if n_clicks is None or contract_data is None:
             raise PreventUpdate
+        # The validation modules load the LLM and vector store libraries, so
+        # they are imported on first use (or by the warm-up) to start fast
+        from services.job_service import submit_validation_job
 
         try:
             # Get file path based on contract type
@@ -183,47 +195,59 @@ def register_callbacks(app, rag_chain):
             else:
                 raise ValueError("No valid contract loaded")
 
-            # Validate the contract
-            results = validate_contract_file(rag_chain, file_path)
-
-            return (
-                create_contract_summary_filled(results["contract_info"]),
-                create_validation_card(
-                    "Deposit Amount Validation", results["deposit_result"]
-                ),
-                create_validation_card(
-                    "Prepaid Rent Validation", results["prepaid_result"]
-                ),
-                create_validation_card(
-                    "Termination Conditions Validation", results["termination_result"]
-                ),
-                create_validation_card(
-                    "Price Adjustment Validation", results["price_adjustment_result"]
-                ),
-                {
-                    "opacity": "1",
-                    "pointer-events": "auto",
-                    "transition": "all 0.3s ease",
-                },
-                "",  # Empty string for className (validation results enabled)
-            )
+            job_id = submit_validation_job(rag_chain, file_path)
 
         except Exception as e:
-            error_message = f"An error occurred while processing the contract: {str(e)}"
-            error_card = dbc.Alert(
-                [
-                    html.H6("❌ Validation Error", className="alert-heading"),
-                    html.P(error_message),
+            return (
+                None,
+                True,  # Polling disabled
+                _create_error_card(e),
+                *[
+                    create_placeholder_card(title, icon)
+                    for _, title, icon in VALIDATION_CARDS
                 ],
-                color="danger",
             )
 
+        return (
+            job_id,
+            False,  # Polling enabled
+            create_contract_summary_placeholder(),
+            *[create_pending_card(title, icon) for _, title, icon in VALIDATION_CARDS],
+        )
+
+    @app.callback(
+        [
+            Output("contract-summary", "children", allow_duplicate=True),
+            Output("deposit-validation", "children", allow_duplicate=True),
+            Output("prepaid-validation", "children", allow_duplicate=True),
+            Output("termination-validation", "children", allow_duplicate=True),
+            Output("price-validation", "children", allow_duplicate=True),
+            Output("validation-poll", "disabled", allow_duplicate=True),
+            Output("validation-results-container", "style", allow_duplicate=True),
+            Output("validation-results-container", "className", allow_duplicate=True),
+        ],
+        [Input("validation-poll", "n_intervals")],
+        [State("validation-job", "data")],
+        prevent_initial_call=True,
+    )
+    def poll_validation_job(n_intervals, job_id):
+        """Render the results of the background validation job finished so far"""
+        if job_id is None:
+            raise PreventUpdate
+        from contract_loader import ContractInfo
+        from rag import LLMOutput
+        from services.job_service import JOB_DONE, JOB_FAILED, JOB_STORE
+
+        job = JOB_STORE.get(job_id)
+        if job is None or job["status"] == JOB_FAILED:
+            error = job["error"] if job else "The validation job was not found"
             return (
-                error_card,
-                create_placeholder_card("Deposit Amount Validation", "💰"),
-                create_placeholder_card("Prepaid Rent Validation", "💰"),
-                create_placeholder_card("Termination Conditions Validation", "📋"),
-                create_placeholder_card("Price Adjustment Validation", "💹"),
+                _create_error_card(error),
+                *[
+                    create_placeholder_card(title, icon)
+                    for _, title, icon in VALIDATION_CARDS
+                ],
+                True,  # Polling disabled
                 {
                     "opacity": "0.4",
                     "pointer-events": "none",
@@ -231,3 +255,42 @@ def register_callbacks(app, rag_chain):
                 },
                 "validation-results-disabled",
             )
+
+        results = job["results"]
+        if "contract_info" not in results:
+            # Nothing to show until the contract information has been extracted
+            raise PreventUpdate
+
+        cards = []
+        for name, title, icon in VALIDATION_CARDS:
+            if name in results:
+                result = results[name]
+                if isinstance(result, dict):
+                    result = LLMOutput(**result)
+                cards.append(create_validation_card(title, result))
+            else:
+                cards.append(create_pending_card(title, icon))
+
+        return (
+            create_contract_summary_filled(ContractInfo(**results["contract_info"])),
+            *cards,
+            job["status"] == JOB_DONE,  # Stop polling once the job is done
+            {
+                "opacity": "1",
+                "pointer-events": "auto",
+                "transition": "all 0.3s ease",
+            },
+            "",  # Empty string for className (validation results enabled)
+        )
+
+
+def _create_error_card(error):
+    """Create an alert for an error while processing the contract"""
+    error_message = f"An error occurred while processing the contract: {str(error)}"
+    return dbc.Alert(
+        [
+            html.H6("❌ Validation Error", className="alert-heading"),
+            html.P(error_message),
+        ],
+        color="danger",
+    )
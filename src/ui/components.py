@@ -61,6 +61,39 @@ def create_placeholder_card(title, icon="📋"):
     )
 
 
+def create_pending_card(title, icon="📋"):
+    """Create a validation accordion for a check that is still running"""
+    return dbc.Accordion(
+        [
+            dbc.AccordionItem(
+                [
+                    html.P(
+                        "The contract is being validated, results will appear here shortly.",
+                        className="text-muted mb-2",
+                    ),
+                ],
+                title=html.Div(
+                    [
+                        html.Span(f"{icon} {title}", className="text-muted"),
+                        dbc.Badge(
+                            [
+                                dbc.Spinner(size="sm", spinner_class_name="me-1"),
+                                "Validating",
+                            ],
+                            color="light",
+                            text_color="secondary",
+                            className="ms-2 float-end",
+                        ),
+                    ]
+                ),
+                item_id=f"pending-{title.lower().replace(' ', '-')}",
+            )
+        ],
+        start_collapsed=True,
+        className="mb-3",
+    )
+
+
 def create_contract_summary_placeholder():
     """Create placeholder contract summary card"""
     return dbc.Card(
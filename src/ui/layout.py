@@ -3,6 +3,7 @@
 import dash_bootstrap_components as dbc
 from dash import dcc, html
 
+from config import VALIDATION_POLL_INTERVAL_MS
 from ui.contracts import SAMPLE_CONTRACTS
 from ui.components import (
     create_sample_contract_card,
@@ -153,9 +154,14 @@ def _create_validation_results_section():
     """Create the validation results section"""
     return html.Div(
         [
-            dcc.Loading(
-                id="loading",
-                type="default",
+            # Polls the background validation job and renders results as they arrive
+            dcc.Store(id="validation-job"),
+            dcc.Interval(
+                id="validation-poll",
+                interval=VALIDATION_POLL_INTERVAL_MS,
+                disabled=True,
+            ),
+            html.Div(
                 children=[
                     html.Div(
                         id="contract-summary",
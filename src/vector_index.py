@@ -0,0 +1,242 @@
+"""Memory-resident vector index for the rental law paragraphs
+
+The law has a few hundred paragraphs, so an exact search with a single
+matrix-vector product over normalized embeddings is faster than going through
+a vector database. The index is stored as a versioned ``.npy`` matrix, memory
+mapped on load, and a JSON file naming it with the document IDs, texts and metadata.
+"""
+
+import glob
+import json
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+
+def matches_filter(metadata: dict, where: dict) -> bool:
+    """Check metadata against a Chroma-style filter.
+
+    Supports ``$and``, ``$or``, ``$eq``, ``$ne``, ``$in``, ``$nin`` and plain
+    equality, e.g. ``{"parent_title": {"$in": ["Kapitel 6"]}}``.
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                matched = value == operand
+            elif operator == "$ne":
+                matched = value != operand
+            elif operator == "$in":
+                matched = value in operand
+            elif operator == "$nin":
+                matched = value not in operand
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if not matched:
+                return False
+    return True
+
+
+class MemoryVectorIndex:
+    """Normalized embedding matrix with the documents of each row"""
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        ids: list[str],
+        documents: list[Document],
+        embedding_model: str | None = None,
+        embedding_backend: str | None = None,
+    ):
+        if len(embeddings) != len(documents) or len(ids) != len(documents):
+            raise ValueError("Embeddings, IDs and documents must have the same length")
+        self.embeddings = embeddings
+        self.ids = ids
+        self.documents = documents
+        self.embedding_model = embedding_model
+        self.embedding_backend = embedding_backend
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """Scale vectors to unit length, so dot products are cosine similarities"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    @classmethod
+    def from_vectors(
+        cls,
+        vectors: list[list[float]],
+        ids: list[str],
+        documents: list[Document],
+        embedding_model: str | None = None,
+        embedding_backend: str | None = None,
+    ) -> "MemoryVectorIndex":
+        return cls(
+            cls.normalize(vectors), ids, documents, embedding_model, embedding_backend
+        )
+
+    @property
+    def dimension(self) -> int:
+        return self.embeddings.shape[1] if len(self.embeddings) else 0
+
+    @property
+    def embedding_signature(self) -> dict:
+        """The embeddings that built the index, see ``check_embedding_signature``"""
+        signature = {"embedding_model": self.embedding_model}
+        if self.embedding_backend:
+            signature["embedding_backend"] = self.embedding_backend
+            signature["embedding_dimension"] = self.dimension
+        return signature
+
+    @staticmethod
+    def _documents_path(directory: Path, name: str) -> Path:
+        return Path(directory) / f"{name}.json"
+
+    @staticmethod
+    def _matrix_path(directory: Path, name: str, data: dict) -> Path:
+        # Indexes saved before matrices were versioned use ``<name>.npy``
+        return Path(directory) / data.get("matrix_file", f"{name}.npy")
+
+    @classmethod
+    def exists(cls, directory: Path, name: str) -> bool:
+        documents_path = cls._documents_path(directory, name)
+        try:
+            with open(documents_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return False
+        return cls._matrix_path(directory, name, data).exists()
+
+    def save(self, directory: Path, name: str):
+        """Save the index as a versioned ``<name>.<version>.npy`` and ``<name>.json``.
+
+        The JSON file names the matrix it belongs to and is renamed into place
+        last, so that single rename switches loaders in other processes from
+        the old matrix and documents to the new ones. Matrices of earlier
+        versions are removed afterwards.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        matrix_file = f"{name}.{uuid.uuid4().hex}.npy"
+        documents_path = self._documents_path(directory, name)
+        documents_tmp = documents_path.with_name(
+            f"{documents_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(directory / matrix_file, "wb") as f:
+            np.save(f, self.embeddings)
+        with open(documents_tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "matrix_file": matrix_file,
+                    "embedding_model": self.embedding_model,
+                    "embedding_backend": self.embedding_backend,
+                    "ids": self.ids,
+                    "documents": [
+                        {"page_content": doc.page_content, "metadata": doc.metadata}
+                        for doc in self.documents
+                    ],
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(documents_tmp, documents_path)
+
+        version = re.compile(rf"{re.escape(name)}(\.[0-9a-f]{{32}})?\.npy")
+        for path in directory.glob(f"{glob.escape(name)}*.npy"):
+            if path.name != matrix_file and version.fullmatch(path.name):
+                path.unlink(missing_ok=True)
+
+    @classmethod
+    def load(
+        cls, directory: Path, name: str, mmap: bool = True, retries: int = 3
+    ) -> "MemoryVectorIndex":
+        """Load an index saved with ``save``, memory mapping the embedding matrix"""
+        with open(cls._documents_path(directory, name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        try:
+            embeddings = np.load(
+                cls._matrix_path(directory, name, data), mmap_mode="r" if mmap else None
+            )
+        except FileNotFoundError:
+            if retries <= 0:
+                raise
+            # Replaced by a newer version since the JSON was read
+            return cls.load(directory, name, mmap, retries - 1)
+        documents = [
+            Document(id=doc_id, **doc)
+            for doc_id, doc in zip(data["ids"], data["documents"])
+        ]
+        return cls(
+            embeddings,
+            data["ids"],
+            documents,
+            data.get("embedding_model"),
+            data.get("embedding_backend"),
+        )
+
+    def search(
+        self, query_vector: list[float], k: int = 5, filter: dict | None = None
+    ) -> list[tuple[Document, float]]:
+        """Exact top-k search by cosine similarity, optionally filtered by metadata"""
+        if len(query_vector) != self.dimension and len(self.embeddings):
+            raise ValueError(
+                f"Query vector has dimension {len(query_vector)}, "
+                f"but the index has dimension {self.dimension}"
+            )
+        scores = self.embeddings @ self.normalize(query_vector)
+        if filter:
+            matching = np.array(
+                [matches_filter(doc.metadata, filter) for doc in self.documents],
+                dtype=bool,
+            )
+            scores = np.where(matching, scores, -np.inf)
+            k = min(k, int(matching.sum()))
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+
+class MemoryVectorRetriever(BaseRetriever):
+    """Retriever over a MemoryVectorIndex, a drop-in for a VectorStoreRetriever"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: MemoryVectorIndex
+    embeddings: Embeddings
+    search_kwargs: dict = {"k": 5}
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs
+    ) -> list[Document]:
+        search_kwargs = self.search_kwargs | kwargs
+        query_vector = self.embeddings.embed_query(query)
+        results = self.index.search(
+            query_vector,
+            k=search_kwargs.get("k", 5),
+            filter=search_kwargs.get("filter"),
+        )
+        return [doc for doc, _ in results]
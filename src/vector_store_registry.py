@@ -0,0 +1,75 @@
+"""Process-wide registry of vector store clients, embeddings and indexes
+
+Opening a Chroma client, constructing embeddings with their HTTP connection
+pool or parsing the law for BM25 is done once per process, however many
+RAGChain instances are created. Each resource is created on first use under
+a lock of its own, so concurrent callers wait for the one initialization
+instead of repeating it, while other resources can be created in parallel.
+"""
+
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import TypeVar
+
+import chromadb
+
+T = TypeVar("T")
+
+
+class VectorStoreRegistry:
+    """Lazily created, shared resources keyed by tuples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._resources = {}
+
+    def get(self, key: tuple, factory: Callable[[], T]) -> T:
+        """Get the resource of a key, calling ``factory`` once to create it.
+
+        A factory that raises leaves nothing behind, so the next call retries.
+        """
+        with self._lock:
+            if key in self._resources:
+                return self._resources[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._resources:
+                    return self._resources[key]
+            resource = factory()
+            with self._lock:
+                self._resources[key] = resource
+            return resource
+
+    def discard(self, *prefix) -> int:
+        """Forget the resources whose key starts with ``prefix``, returning how many"""
+        with self._lock:
+            keys = [key for key in self._resources if key[: len(prefix)] == prefix]
+            for key in keys:
+                del self._resources[key]
+        return len(keys)
+
+    def clear(self):
+        """Forget every resource, e.g. between tests"""
+        with self._lock:
+            self._resources.clear()
+
+    def __contains__(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._resources
+
+    @staticmethod
+    def normalize_path(path: str | Path) -> str:
+        """The same directory gives the same key, however it is written"""
+        return str(Path(path).resolve())
+
+    def get_client(self, persist_directory: str | Path) -> chromadb.ClientAPI:
+        """Get the persistent Chroma client of a directory"""
+        path = self.normalize_path(persist_directory)
+        return self.get(("client", path), lambda: chromadb.PersistentClient(path=path))
+
+
+VECTOR_STORE_REGISTRY = VectorStoreRegistry()
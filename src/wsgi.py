@@ -0,0 +1,73 @@
+"""WSGI entry point for serving the app with several worker processes
+
+    gunicorn --config src/gunicorn.conf.py "wsgi:create_server()"
+
+gunicorn preloads the app in its master process, which loads the BM25 and
+memory indexes of the law into the process-wide registry and creates the
+cache directories once. The forked workers share those pages copy-on-write.
+Chroma clients and their cached Systems, HTTP connection pools and threads
+don't survive a fork, so they are dropped before forking and again in each
+worker, which opens its own and builds its RAG chain once from the preloaded
+indexes.
+"""
+
+from chromadb.api.shared_system_client import SharedSystemClient
+from flask import Flask
+
+from app import create_app
+from cache_store import CACHE_STORES
+from config import RAG_CHAIN_STARTUP, VECTOR_STORE_DIR
+from vector_store_registry import VECTOR_STORE_REGISTRY
+
+# Registry resources holding connections or threads, opened again by each worker
+FORK_UNSAFE_RESOURCES = ("client", "embeddings", "vector_store")
+
+_app = None
+
+
+def drop_fork_unsafe_resources():
+    """Forget the Chroma clients, embeddings and vector stores of this process.
+
+    Chroma also caches the System behind its clients, with its threads and
+    sqlite connection, by path at class level. Dropping that cache makes the
+    next client open a System of its own instead of reusing the inherited one.
+    """
+    for resource in FORK_UNSAFE_RESOURCES:
+        VECTOR_STORE_REGISTRY.discard(resource)
+    SharedSystemClient.clear_system_cache()
+
+
+def preload_resources():
+    """Create the cache directories and load the law indexes before forking"""
+    for store in CACHE_STORES.values():
+        store.directory.mkdir(parents=True, exist_ok=True)
+    VECTOR_STORE_DIR.mkdir(parents=True, exist_ok=True)
+
+    try:
+        from data_loading import load_rental_law_retriever
+
+        load_rental_law_retriever()
+    except Exception as e:
+        print(f"Preloading the law index failed, workers load it on first use: {e}")
+    finally:
+        drop_fork_unsafe_resources()
+
+
+def create_server(preload: bool = True) -> Flask:
+    """Create the app and return its Flask server, the WSGI application.
+
+    The RAG chain is built lazily, so nothing fork-unsafe is created in the
+    master process; ``start_worker`` starts the warm-up in each worker.
+    """
+    global _app
+    _app = create_app(rag_chain_startup="lazy")
+    if preload:
+        preload_resources()
+    return _app.server
+
+
+def start_worker():
+    """Start the warm-up of a forked worker, unless the chain is built lazily"""
+    drop_fork_unsafe_resources()
+    if _app is not None and RAG_CHAIN_STARTUP != "lazy":
+        _app.readiness.start()
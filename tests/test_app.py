@@ -5,7 +5,10 @@ from unittest.mock import patch, MagicMock
 @pytest.fixture
 def mock_rag_chain():
     """Mock RAGChain to avoid OpenAI API key requirement."""
-    with patch("app.RAGChain") as mock:
+    with (
+        patch("app.create_rag_chain") as mock,
+        patch("services.health_service.Readiness.start"),
+    ):
         mock.return_value = MagicMock()
         yield mock
 
@@ -38,3 +41,45 @@ def test_app_has_layout(mock_rag_chain):
 
     # Check that layout is set
     assert app.layout is not None
+
+
+def test_app_defers_building_the_rag_chain(mock_rag_chain):
+    """Test that the RAG chain is only built when it is first used."""
+    from app import create_app
+
+    app = create_app(rag_chain_startup="lazy")
+
+    mock_rag_chain.assert_not_called()
+    assert not app.rag_chain.ready
+
+    app.rag_chain.ask("What is the maximum deposit?")
+
+    mock_rag_chain.assert_called_once()
+    assert app.rag_chain.ready
+    mock_rag_chain.return_value.ask.assert_called_once_with(
+        "What is the maximum deposit?"
+    )
+
+
+def test_app_warms_up_in_the_background_unless_lazy(mock_rag_chain):
+    """Test that the readiness warm-up starts with the app, unless lazy."""
+    from app import create_app
+    from services.health_service import Readiness
+
+    create_app(rag_chain_startup="lazy")
+    Readiness.start.assert_not_called()
+
+    create_app(rag_chain_startup="background")
+    Readiness.start.assert_called_once()
+
+
+def test_app_serves_health_routes(mock_rag_chain):
+    """Test that liveness answers while readiness waits for the warm-up."""
+    from app import create_app
+
+    client = create_app(rag_chain_startup="lazy").server.test_client()
+
+    assert client.get("/healthz").status_code == 200
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.get_json()["checks"]["index"] is False
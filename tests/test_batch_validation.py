@@ -0,0 +1,168 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+import batch_validation
+from batch_validation import find_contract_files, validate_contracts
+from cache_store import CacheStore, ModelCache, SemanticAnswerCache
+from contract_loader import ContractInfo, RentalContract
+from llm_batch import LocalBatchBackend
+from rag import LLMOutput, RAGChain
+from tests.test_validation_service import _contract_info
+
+
+def _write_contracts(directory, count):
+    directory.mkdir()
+    for i in range(count):
+        (directory / f"contract_{i}.pdf").write_bytes(f"contract {i}".encode())
+    return find_contract_files(directory)
+
+
+def _rag_chain():
+    rag_chain = MagicMock()
+    rag_chain.ask.return_value = LLMOutput(
+        should_be_checked=False, description="Within the law", references={}
+    )
+    return rag_chain
+
+
+def _parse(file_path, ocr_workers):
+    if file_path.endswith("contract_2.pdf"):
+        raise ValueError("Unreadable PDF")
+    return RentalContract(text=file_path, file_name=file_path)
+
+
+def test_find_contract_files_from_manifest(tmp_path):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("# Archive\ncontracts/a.pdf\n\ncontracts/b.pdf\n")
+
+    assert find_contract_files(manifest) == [
+        tmp_path / "contracts" / "a.pdf",
+        tmp_path / "contracts" / "b.pdf",
+    ]
+
+
+@patch("batch_validation.extract_contract_info", return_value=_contract_info())
+@patch("batch_validation.parse_contract_pdf_to_text", side_effect=_parse)
+def test_validate_contracts_writes_results_and_resumes(
+    mock_parse, mock_extract, tmp_path
+):
+    file_paths = _write_contracts(tmp_path / "contracts", 4)
+    output_path = tmp_path / "results.jsonl"
+
+    metrics = validate_contracts(
+        file_paths, output_path, _rag_chain(), ocr_workers=1, llm_workers=2
+    )
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert metrics["done"] == 3
+    assert metrics["failed"] == 1
+    assert metrics["stages"]["parse"]["files"] == 4
+    assert metrics["stages"]["validate"]["files"] == 3
+    assert {record["status"] for record in records} == {"done", "failed"}
+    done = [record for record in records if record["status"] == "done"]
+    assert not any(record["deposit_result"]["should_be_checked"] for record in done)
+    assert all(record["termination_result"]["references"] == {} for record in done)
+
+    # A second run only retries the contract that failed
+    mock_parse.reset_mock()
+    metrics = validate_contracts(
+        file_paths, output_path, _rag_chain(), ocr_workers=1, llm_workers=2
+    )
+
+    assert metrics["skipped"] == 3
+    assert mock_parse.call_count == 1
+
+
+@patch("batch_validation.parse_contract_pdf_to_text", side_effect=_parse)
+def test_validate_contracts_with_batch_api(mock_parse, tmp_path):
+    file_paths = _write_contracts(tmp_path / "contracts", 2)
+    contract_info = _contract_info().model_dump_json()
+    answer = LLMOutput(should_be_checked=True, description="Check this", references={})
+    backend = LocalBatchBackend(
+        FakeListChatModel(
+            responses=[contract_info] * 2 + [answer.model_dump_json()] * 4
+        )
+    )
+    rag_chain = RAGChain(
+        retriever=RunnableLambda(lambda question, **kwargs: []),
+        llm=FakeListChatModel(responses=[]),
+        answer_cache=SemanticAnswerCache(
+            CacheStore("answers", root=tmp_path), LLMOutput
+        ),
+    )
+
+    with (
+        patch(
+            "llm_batch.CONTRACT_INFO_CACHE",
+            ModelCache(CacheStore("extractions", root=tmp_path), ContractInfo),
+        ),
+        patch("llm_batch.LLM_BATCH_DIR", tmp_path / "batches"),
+    ):
+        metrics = validate_contracts(
+            file_paths,
+            tmp_path / "results.jsonl",
+            rag_chain,
+            ocr_workers=1,
+            batch_backend=backend,
+        )
+
+    assert metrics["done"] == 2
+    records = [
+        json.loads(line)
+        for line in (tmp_path / "results.jsonl").read_text().splitlines()
+    ]
+    assert all(
+        record["termination_result"] == answer.model_dump() for record in records
+    )
+
+
+@patch("batch_validation.extract_contract_info", return_value=_contract_info())
+@patch("batch_validation.parse_contract_pdf_to_text", side_effect=_parse)
+def test_unreadable_files_fail_without_stopping_the_batch(
+    mock_parse, mock_extract, tmp_path
+):
+    file_paths = _write_contracts(tmp_path / "contracts", 2)
+    missing = tmp_path / "contracts" / "missing.pdf"
+    output_path = tmp_path / "results.jsonl"
+
+    metrics = validate_contracts(
+        [missing, *file_paths], output_path, _rag_chain(), ocr_workers=1
+    )
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert metrics["done"] == 2
+    assert metrics["failed"] == 1
+    failed = [record for record in records if record["status"] == "failed"]
+    assert failed[0]["file"] == str(missing)
+    assert "No such file" in failed[0]["error"]
+
+
+class _CountingExecutor(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        _CountingExecutor.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def test_parsing_runs_at_most_twice_the_workers_ahead():
+    pending = [(f"contract_{i}.pdf", str(i)) for i in range(20)]
+
+    with (
+        patch("batch_validation.ProcessPoolExecutor", _CountingExecutor),
+        patch(
+            "batch_validation._parse_contract",
+            lambda file_path, file_hash: {"sha256": file_hash},
+        ),
+    ):
+        parsed = batch_validation._iter_parsed(pending, ocr_workers=2)
+        next(parsed)
+        assert _CountingExecutor.submitted == 4
+        hashes = {item["sha256"] for item in parsed}
+
+    assert _CountingExecutor.submitted == 20
+    assert len(hashes) == 19
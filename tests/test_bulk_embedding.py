@@ -0,0 +1,127 @@
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from langchain_openai import OpenAIEmbeddings
+
+from bulk_embedding import BulkEmbedder, pack_batches
+
+
+class FlakyEmbeddings:
+    """Fake embeddings that fail the first calls with a connection error"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(texts)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Connection reset")
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class StandInEmbeddingHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /v1/embeddings endpoint"""
+
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(body)
+        data = []
+        for i, text in enumerate(body["input"]):
+            vector = np.array([len(text), 1.0], dtype=np.float32)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        response = json.dumps(
+            {
+                "object": "list",
+                "data": data,
+                "model": body["model"],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInEmbeddingHandler)
+    StandInEmbeddingHandler.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+def test_pack_batches_respects_size_and_token_limits():
+    texts = ["a" * 30, "b" * 30, "c" * 300, "d" * 3, "e" * 3, "f" * 3]
+
+    batches = pack_batches(texts, max_batch_size=2, max_batch_tokens=50)
+
+    assert batches == [[0, 1], [2], [3, 4], [5]]
+
+
+def test_failed_batches_are_retried():
+    flaky = FlakyEmbeddings(failures=2)
+    embedder = BulkEmbedder(flaky, batch_size=2, initial_backoff=0)
+
+    vectors = embedder.embed_documents(["§ 1.", "§ 22.", "§ 333."])
+
+    assert vectors == [[4.0], [5.0], [6.0]]
+    assert embedder.last_metrics["retries"] == 2
+    assert embedder.last_metrics["batches"] == 2
+
+
+def test_gives_up_after_max_retries():
+    embedder = BulkEmbedder(
+        FlakyEmbeddings(failures=5), max_retries=2, initial_backoff=0
+    )
+
+    with pytest.raises(ConnectionError):
+        embedder.embed_documents(["§ 1."])
+
+
+def test_queries_are_not_retried():
+    flaky = FlakyEmbeddings(failures=1)
+    embedder = BulkEmbedder(flaky, initial_backoff=60)
+
+    with pytest.raises(ConnectionError):
+        embedder.embed_query("§ 1.")
+    assert len(flaky.calls) == 1
+
+
+def test_bulk_embedding_against_stand_in_server(stand_in_server):
+    embeddings = OpenAIEmbeddings(
+        model="stand-in",
+        base_url=stand_in_server,
+        api_key="not-needed",
+        check_embedding_ctx_length=False,
+    )
+    embedder = BulkEmbedder(embeddings, batch_size=10, parallel_batches=4)
+    texts = [f"§ {i}. " + "lejer " * i for i in range(1, 36)]
+
+    vectors = embedder.embed_documents(texts)
+
+    assert [vector[0] for vector in vectors] == [float(len(text)) for text in texts]
+    assert len(StandInEmbeddingHandler.requests) == 4
+    assert embedder.last_metrics["chunks"] == 35
+    assert embedder.last_metrics["chunks_per_second"] > 0
@@ -0,0 +1,269 @@
+import os
+import threading
+import time
+
+import pytest
+
+from cache_store import (
+    PRUNE_INTERVAL_SECONDS,
+    CacheStore,
+    ModelCache,
+    SemanticAnswerCache,
+)
+from contract_loader import RentalContract
+
+
+def _set_times(path, accessed, modified):
+    os.utime(path, (accessed, modified))
+
+
+def test_json_round_trip(tmp_path):
+    store = CacheStore("ocr", root=tmp_path)
+
+    assert store.get_json("pdf_parse:abc") is None
+    store.set_json("pdf_parse:abc", {"text": "Lejekontrakt", "file_name": "a.pdf"})
+
+    assert store.get_json("pdf_parse:abc") == {
+        "text": "Lejekontrakt",
+        "file_name": "a.pdf",
+    }
+    assert store.stats()["files"] == 1
+
+
+def test_expired_entries_are_misses(tmp_path):
+    store = CacheStore("ocr", root=tmp_path, ttl_seconds=60)
+    path = store.set_json("key", {"value": 1})
+    old = time.time() - 120
+    _set_times(path, old, old)
+
+    assert store.get_json("key") is None
+    assert not path.exists()
+
+
+def test_prune_evicts_least_recently_used_first(tmp_path):
+    store = CacheStore("uploads", root=tmp_path, max_bytes=25, ttl_seconds=None)
+    now = time.time()
+    paths = [store.put_file(f"file_{i}.pdf", b"x" * 10) for i in range(2)]
+    _set_times(paths[0], now - 200, now - 200)
+    _set_times(paths[1], now - 100, now - 100)
+
+    # Reading file_0 makes file_1 the least recently used entry
+    store.get_file("file_0.pdf")
+    newest = store.put_file("file_2.pdf", b"x" * 10)
+
+    assert paths[0].exists()
+    assert not paths[1].exists()
+    assert newest.exists()
+    assert store.stats()["bytes"] == 20
+
+
+def test_prune_never_evicts_the_file_just_written(tmp_path):
+    store = CacheStore("uploads", root=tmp_path, max_bytes=5, ttl_seconds=None)
+
+    path = store.put_file("large.pdf", b"x" * 10)
+
+    assert path.exists()
+
+
+def test_clear(tmp_path):
+    store = CacheStore("extractions", root=tmp_path)
+    store.set_json("a", {})
+    store.set_json("b", {})
+
+    assert store.clear()["removed"] == 2
+    assert store.stats()["files"] == 0
+
+
+def test_model_cache_serves_repeat_reads_from_memory(tmp_path, mocker):
+    store = CacheStore("ocr", root=tmp_path)
+    store.set_json("key", {"text": "Lejekontrakt", "file_name": "a.pdf"})
+    cache = ModelCache(store, RentalContract)
+    disk_read = mocker.spy(store, "get_json")
+
+    assert cache.get("missing") is None
+    first = cache.get("key")
+    second = cache.get("key")
+
+    assert isinstance(first, RentalContract)
+    assert second is first
+    assert disk_read.call_count == 2  # "missing" and the first read of "key"
+    assert cache.stats() == {
+        "namespace": "ocr",
+        "memory_entries": 1,
+        "memory_hits": 1,
+        "disk_hits": 1,
+        "misses": 1,
+    }
+
+
+def test_model_cache_evicts_least_recently_used(tmp_path):
+    cache = ModelCache(CacheStore("ocr", root=tmp_path), RentalContract, maxsize=2)
+    for name in ("a", "b", "c"):
+        cache.set(name, RentalContract(text=name, file_name=f"{name}.pdf"))
+
+    assert cache.stats()["memory_entries"] == 2
+    # "a" was evicted from memory but is still on disk
+    assert cache.get("a").text == "a"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_put_file_leaves_no_temporary_files(tmp_path):
+    store = CacheStore("ocr", root=tmp_path)
+
+    store.set_json("key", {"value": 1})
+    store.set_json("key", {"value": 2})
+
+    assert [path.name for path in (tmp_path / "ocr").iterdir() if path.is_file()] == [
+        store.key_to_file_name("key")
+    ]
+    assert store.get_json("key") == {"value": 2}
+
+
+def test_unreadable_json_is_a_miss_and_removed(tmp_path):
+    store = CacheStore("ocr", root=tmp_path)
+    path = store.set_json("key", {"text": "Lejekontrakt"})
+    path.write_text('{"text": "Lejekon', encoding="utf-8")
+
+    assert store.get_json("key") is None
+    assert not path.exists()
+
+
+def test_prune_skips_temporary_files_until_stale(tmp_path):
+    store = CacheStore("ocr", root=tmp_path)
+    (tmp_path / "ocr").mkdir()
+    fresh = tmp_path / "ocr" / ".a.json.1.tmp"
+    stale = tmp_path / "ocr" / ".b.json.2.tmp"
+    fresh.write_bytes(b"{")
+    stale.write_bytes(b"{")
+    old = time.time() - 2 * 60 * 60
+    _set_times(stale, old, old)
+
+    store.prune()
+
+    assert store.stats()["files"] == 0
+    assert fresh.exists()
+    assert not stale.exists()
+
+
+def _run_concurrently(functions):
+    results = [None] * len(functions)
+
+    def run(i):
+        results[i] = functions[i]()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(functions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_get_or_create_computes_a_missing_key_once(tmp_path):
+    cache = ModelCache(CacheStore("ocr", root=tmp_path), RentalContract)
+    calls = []
+
+    def parse():
+        calls.append(1)
+        time.sleep(0.05)
+        return RentalContract(text="Lejekontrakt", file_name="a.pdf")
+
+    results = _run_concurrently([lambda: cache.get_or_create("key", parse)] * 8)
+
+    assert len(calls) == 1
+    assert all(result.text == "Lejekontrakt" for result in results)
+    assert cache.get_or_create("key", parse) is results[0]
+
+
+def test_get_or_create_waits_for_other_processes(tmp_path):
+    # Separate stores share only the lock files, like separate worker processes
+    caches = [
+        ModelCache(CacheStore("ocr", root=tmp_path), RentalContract) for _ in range(4)
+    ]
+    calls = []
+
+    def parse():
+        calls.append(1)
+        time.sleep(0.05)
+        return RentalContract(text="Lejekontrakt", file_name="a.pdf")
+
+    results = _run_concurrently(
+        [lambda cache=cache: cache.get_or_create("key", parse) for cache in caches]
+    )
+
+    assert len(calls) == 1
+    assert all(result.text == "Lejekontrakt" for result in results)
+
+
+def test_get_or_create_retries_after_a_failure(tmp_path):
+    cache = ModelCache(CacheStore("extractions", root=tmp_path), RentalContract)
+
+    def failing():
+        raise ConnectionError("LLM unavailable")
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_create("key", failing)
+
+    value = cache.get_or_create(
+        "key", lambda: RentalContract(text="Lejekontrakt", file_name="a.pdf")
+    )
+    assert value.text == "Lejekontrakt"
+    assert cache.store.get_json("key") is not None
+
+
+def test_writes_only_prune_when_over_budget(tmp_path, mocker):
+    store = CacheStore("embeddings", root=tmp_path, max_bytes=1000, ttl_seconds=None)
+    prune = mocker.spy(store, "prune")
+
+    for i in range(50):
+        store.put_file(f"{i}.f32", b"x" * 10)
+
+    assert prune.call_count == 1  # The first write, to learn the namespace size
+
+    for i in range(50, 101):
+        store.put_file(f"{i}.f32", b"x" * 10)
+
+    # Crossing max_bytes evicts down to the low-water mark
+    assert prune.call_count == 2
+    assert store.stats()["bytes"] == 900
+
+
+def test_writes_prune_after_the_interval(tmp_path, mocker):
+    store = CacheStore("embeddings", root=tmp_path, ttl_seconds=None)
+    prune = mocker.spy(store, "prune")
+    store.put_file("a.f32", b"x")
+    store.put_file("b.f32", b"x")
+
+    mocker.patch(
+        "cache_store.time.time", return_value=time.time() + PRUNE_INTERVAL_SECONDS + 1
+    )
+    store.put_file("c.f32", b"x")
+
+    assert prune.call_count == 2
+
+
+def test_answer_caches_sharing_a_directory_keep_each_others_questions(tmp_path):
+    # Separate stores share only the directory, like separate worker processes
+    caches = [
+        SemanticAnswerCache(
+            CacheStore("answers", root=tmp_path),
+            RentalContract,
+            similarity_threshold=0.9,
+        )
+        for _ in range(2)
+    ]
+    questions = ["Is the deposit of 3 months legal", "Is the notice of 3 months legal"]
+    for cache in caches:
+        assert cache.get("Is the rent of 3 months legal", "context") is None
+
+    for cache, question in zip(caches, questions):
+        cache.set(question, "context", RentalContract(text=question, file_name="a.pdf"))
+
+    reader = SemanticAnswerCache(
+        CacheStore("answers", root=tmp_path), RentalContract, similarity_threshold=0.9
+    )
+    for question in questions:
+        assert reader.get(question + "?", "context").text == question
+    assert reader._known_questions("context") == [
+        reader.normalize_question(question) for question in questions
+    ]
@@ -1,9 +1,15 @@
 import pytest
+from langchain.schema import Document
+from cache_store import CacheStore, ModelCache
 from contract_loader import (
     parse_contract_pdf_to_text,
     load_contract_and_extract_info,
+    extract_text_by_page,
+    is_usable_text_layer,
     ContractInfo,
+    RentalContract,
 )
+from ocr import ocr_pdf
 
 
 @pytest.mark.slow
@@ -25,3 +31,83 @@ def test_load_and_extract_contract_info():
     assert extracted_contract_info.tenant == "Martin Hallberg"
     assert extracted_contract_info.monthly_rental_amount == "3000 kr"
     assert extracted_contract_info.deposit_amount == "9000 kr"
+
+
+def test_ocr_pdf_renders_one_page_at_a_time_in_order(mocker):
+    mocker.patch("ocr.get_page_count", return_value=3)
+    convert = mocker.patch(
+        "ocr.convert_from_path",
+        side_effect=lambda path, dpi, first_page, last_page: [f"image-{first_page}"],
+    )
+    mocker.patch(
+        "ocr.pytesseract.image_to_string",
+        side_effect=lambda image, lang: f"text of {image}\n",
+    )
+
+    text = ocr_pdf("contract.pdf", max_workers=1)
+
+    assert text == "text of image-1\ntext of image-2\ntext of image-3\n"
+    assert [call.kwargs["first_page"] for call in convert.call_args_list] == [1, 2, 3]
+    assert all(
+        call.kwargs["first_page"] == call.kwargs["last_page"]
+        for call in convert.call_args_list
+    )
+
+
+def test_is_usable_text_layer():
+    assert is_usable_text_layer("Lejekontrakt for beboelse " * 5)
+    assert not is_usable_text_layer("   \n  ")
+    assert not is_usable_text_layer("§ . , - : ; ( ) " * 10)
+
+
+def test_extract_text_by_page_only_ocrs_pages_that_need_it(mocker):
+    page_texts = [
+        "Lejekontrakt for beboelse " * 5,  # good text layer, but has form values
+        "Lejen betales forud den 1. i hver måned " * 5,  # good text layer
+        "",  # scanned page without text layer
+    ]
+    mocker.patch(
+        "contract_loader.load_pdf_by_page",
+        return_value=[
+            Document(page_content=text, metadata={"page": page})
+            for page, text in enumerate(page_texts)
+        ],
+    )
+    mocker.patch("contract_loader.find_pages_with_form_values", return_value={0})
+    ocr = mocker.patch(
+        "contract_loader.ocr_pages", return_value=["OCR page 1", "OCR page 3"]
+    )
+
+    texts, pages_ocrd = extract_text_by_page("contract.pdf", ocr_workers=2)
+
+    ocr.assert_called_once_with("contract.pdf", [1, 3], 2)
+    assert pages_ocrd == [1, 3]
+    assert texts == ["OCR page 1", page_texts[1], "OCR page 3"]
+
+
+def test_parse_contract_pdf_cache_is_keyed_on_contents(mocker, tmp_path):
+    mocker.patch(
+        "contract_loader.CONTRACT_TEXT_CACHE",
+        ModelCache(CacheStore("ocr", root=tmp_path), RentalContract),
+    )
+    mocker.patch("contract_loader.get_ocr_settings", return_value={"dpi": 200})
+    extract = mocker.patch(
+        "contract_loader.extract_text_by_page", return_value=(["Lejekontrakt"], [])
+    )
+
+    original = tmp_path / "contract.pdf"
+    original.write_bytes(b"%PDF-1.4 contract")
+    renamed = tmp_path / "upload_1234.pdf"
+    renamed.write_bytes(b"%PDF-1.4 contract")
+
+    first = parse_contract_pdf_to_text(str(original))
+    second = parse_contract_pdf_to_text(str(renamed))
+
+    assert extract.call_count == 1
+    assert first.text == second.text == "Lejekontrakt"
+    assert second.file_name == "upload_1234.pdf"
+
+    original.write_bytes(b"%PDF-1.4 changed contract")
+    parse_contract_pdf_to_text(str(original))
+
+    assert extract.call_count == 2
@@ -1,3 +1,7 @@
+import json
+
+import numpy as np
+import pytest
 from data_loading import (
     split_doc_by_regex,
     CHAPTER_REGEX,
@@ -6,7 +10,14 @@ from data_loading import (
     read_and_split_document_by_paragraph,
     load_pdf_by_page,
     add_page_numbers_to_paragraphs,
+    find_pages_with_form_values,
+    export_memory_index,
+    sync_collection,
 )
+from vector_index import MemoryVectorIndex, MemoryVectorRetriever
+from unittest.mock import Mock
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
 
 from langchain.schema import Document
 
@@ -93,3 +104,114 @@ def test_page_to_paragraph_mapping():
     # Check that page numbers are increasing by paragraph
     page_numbers = [para.metadata["page"] for para in paragraphs_with_page_numbers]
     assert page_numbers == sorted(page_numbers)
+
+
+def test_find_pages_with_form_values():
+    filled = find_pages_with_form_values("src/data/contract_everything_correct.pdf")
+    blank = find_pages_with_form_values("src/data/Typeformular-A-18-11-22 (1).pdf")
+
+    assert filled == {0, 1, 2, 3}
+    assert blank == set()
+
+
+def test_memory_index_matches_chroma_results(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=32)
+    documents = [
+        Document(page_content=f"§ {i}. Paragraph about renting number {i}.")
+        for i in range(1, 21)
+    ]
+    vector_store = Chroma.from_documents(
+        documents=documents,
+        embedding=embeddings,
+        collection_name="test_collection",
+        persist_directory=str(tmp_path / "chroma"),
+    )
+
+    export_memory_index(
+        vector_store, "test_collection", "fake-model", directory=tmp_path
+    )
+    index = MemoryVectorIndex.load(tmp_path, "test_collection")
+    retriever = MemoryVectorRetriever(
+        index=index, embeddings=embeddings, search_kwargs={"k": 3}
+    )
+
+    query = "§ 7. Paragraph about renting number 7."
+    expected = vector_store.similarity_search(query, k=3)
+    retrieved = retriever.invoke(query)
+
+    assert index.embedding_model == "fake-model"
+    # A versioned matrix and the JSON naming it, without temporary files
+    assert sorted(
+        path.name.split(".")[-1] for path in tmp_path.glob("test_collection*")
+    ) == ["json", "npy"]
+    assert [doc.id for doc in retrieved] == [doc.id for doc in expected]
+    assert retrieved[0].page_content == query
+
+
+def test_sync_collection_only_embeds_changed_paragraphs(tmp_path):
+    embeddings = Mock(wraps=DeterministicFakeEmbedding(size=32))
+    vector_store = Chroma(
+        collection_name="test_collection",
+        embedding_function=embeddings,
+        persist_directory=str(tmp_path),
+    )
+
+    def paragraphs(texts):
+        return [
+            Document(
+                page_content=f"§ {number}. {text}",
+                metadata={"title": f"§ {number}.", "parent_title": "Kapitel 1"},
+            )
+            for number, text in texts.items()
+        ]
+
+    first = sync_collection(
+        vector_store, paragraphs({1: "Deposit.", 2: "Prepaid rent.", 3: "Notice."})
+    )
+    second = sync_collection(
+        vector_store, paragraphs({1: "Deposit.", 2: "Changed rent.", 4: "New rule."})
+    )
+
+    assert first == {"added": 3, "updated": 0, "deleted": 0, "unchanged": 0}
+    assert second == {"added": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+    embedded = [len(call.args[0]) for call in embeddings.embed_documents.call_args_list]
+    assert embedded == [3, 2]
+    assert sorted(vector_store._collection.get()["ids"]) == ["§ 1.", "§ 2.", "§ 4."]
+    assert vector_store.get(ids=["§ 2."])["documents"] == ["§ 2. Changed rent."]
+
+
+def _index(value: float, doc_id: str) -> MemoryVectorIndex:
+    return MemoryVectorIndex.from_vectors(
+        [[value, 1.0]], [doc_id], [Document(page_content=doc_id)], "model", "local"
+    )
+
+
+def test_memory_index_swaps_matrix_and_documents_together(tmp_path):
+    _index(1.0, "§ 1.").save(tmp_path, "law")
+    old = MemoryVectorIndex.load(tmp_path, "law")
+    old_matrix = next(tmp_path.glob("law.*.npy"))
+
+    _index(2.0, "§ 2.").save(tmp_path, "law")
+    new = MemoryVectorIndex.load(tmp_path, "law")
+
+    assert not old_matrix.exists()
+    assert len(list(tmp_path.glob("law*.npy"))) == 1
+    assert old.ids == ["§ 1."]  # Its memory-mapped matrix stays readable
+    assert old.embeddings[0][0] == pytest.approx(1 / np.sqrt(2))
+    assert new.ids == ["§ 2."]
+    assert new.embeddings[0][0] == pytest.approx(2 / np.sqrt(5))
+
+
+def test_memory_index_loads_the_unversioned_layout(tmp_path):
+    _index(1.0, "§ 1.").save(tmp_path, "law")
+    matrix = next(tmp_path.glob("law.*.npy"))
+    matrix.rename(tmp_path / "law.npy")
+    data = json.loads((tmp_path / "law.json").read_text(encoding="utf-8"))
+    del data["matrix_file"]
+    (tmp_path / "law.json").write_text(json.dumps(data), encoding="utf-8")
+
+    assert MemoryVectorIndex.exists(tmp_path, "law")
+    assert MemoryVectorIndex.load(tmp_path, "law").ids == ["§ 1."]
+
+    _index(2.0, "§ 2.").save(tmp_path, "law")
+    assert not (tmp_path / "law.npy").exists()
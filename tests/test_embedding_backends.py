@@ -0,0 +1,143 @@
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from embedding_backends import (
+    EmbeddingMismatchError,
+    check_embedding_signature,
+    create_embeddings,
+    load_local_embeddings,
+)
+import data_loading
+from data_loading import record_embedding_signature
+from vector_index import MemoryVectorIndex
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from langchain.schema import Document
+
+
+class FakeHuggingFaceEmbeddings(DeterministicFakeEmbedding):
+    model_kwargs: dict = {}
+    encode_kwargs: dict = {}
+    cache_folder: str | None = None
+
+    def __init__(self, model_name, **kwargs):
+        super().__init__(size=384, **kwargs)
+
+    @property
+    def _client(self):
+        return SimpleNamespace(get_sentence_embedding_dimension=lambda: self.size)
+
+
+@pytest.fixture
+def fake_huggingface(monkeypatch):
+    monkeypatch.setitem(
+        sys.modules,
+        "langchain_huggingface",
+        SimpleNamespace(HuggingFaceEmbeddings=FakeHuggingFaceEmbeddings),
+    )
+    load_local_embeddings.cache_clear()
+    yield
+    load_local_embeddings.cache_clear()
+
+
+def test_local_backend_loads_model_once_on_cpu(fake_huggingface, tmp_path):
+    embeddings = load_local_embeddings("local-model", cache_dir=tmp_path)
+
+    assert load_local_embeddings("local-model", cache_dir=tmp_path) is embeddings
+    assert embeddings.model_kwargs == {"device": "cpu"}
+    assert embeddings.cache_folder == str(tmp_path)
+
+
+def test_local_backend_requires_langchain_huggingface(monkeypatch):
+    monkeypatch.setitem(sys.modules, "langchain_huggingface", None)
+    load_local_embeddings.cache_clear()
+
+    with pytest.raises(ImportError, match="langchain-huggingface"):
+        create_embeddings("local", "local-model")
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        create_embeddings("other", "model")
+
+
+def test_collection_records_and_checks_embedding_signature(fake_huggingface, tmp_path):
+    vector_store = Chroma.from_documents(
+        documents=[
+            Document(page_content="§ 1. Depositum.", metadata={"title": "§ 1."})
+        ],
+        embedding=DeterministicFakeEmbedding(size=384),
+        collection_name="test_collection",
+        persist_directory=str(tmp_path),
+    )
+
+    record_embedding_signature(vector_store, "local-model", backend="local")
+    metadata = vector_store._collection.metadata
+
+    assert metadata == {
+        "embedding_backend": "local",
+        "embedding_model": "local-model",
+        "embedding_dimension": 384,
+    }
+    check_embedding_signature("test_collection", metadata, "local", "local-model")
+    with pytest.raises(EmbeddingMismatchError, match="embedding_backend 'local'"):
+        check_embedding_signature(
+            "test_collection", metadata, "openai", "text-embedding-3-small"
+        )
+
+
+def test_dimension_mismatch_fails_fast():
+    recorded = {
+        "embedding_backend": "openai",
+        "embedding_model": "text-embedding-3-small",
+        "embedding_dimension": 384,
+    }
+
+    with pytest.raises(EmbeddingMismatchError, match="embedding_dimension 384"):
+        check_embedding_signature(
+            "test_collection", recorded, "openai", "text-embedding-3-small"
+        )
+    # Collections built before signatures were recorded are not checked
+    check_embedding_signature("test_collection", None, "openai", "other-model")
+
+
+def test_memory_index_rejects_query_of_other_dimension():
+    index = MemoryVectorIndex.from_vectors(
+        [[1.0, 0.0, 0.0]], ["§ 1."], [Document(page_content="§ 1.")], "model", "local"
+    )
+
+    assert index.embedding_signature["embedding_dimension"] == 3
+    with pytest.raises(ValueError, match="dimension 2"):
+        index.search([1.0, 0.0])
+
+
+def test_memory_index_of_other_embeddings_is_rejected_or_reexported(
+    fake_huggingface, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(data_loading, "VECTOR_STORE_DIR", tmp_path)
+    monkeypatch.setattr(data_loading, "EMBEDDING_BACKEND", "local")
+    exported = MemoryVectorIndex.from_vectors(
+        [[1.0, 0.0, 0.0]], ["§ 1."], [Document(page_content="§ 1.")], "model", "local"
+    )
+    exported.save(tmp_path, "test_collection")
+
+    with pytest.raises(EmbeddingMismatchError, match="embedding_model 'model'"):
+        data_loading.load_memory_index("test_collection", "other-model")
+
+    # Indexes without a signature are exported again from the collection
+    legacy = MemoryVectorIndex.from_vectors(
+        [[1.0, 0.0, 0.0]], ["§ 1."], [Document(page_content="§ 1.")], "model"
+    )
+    legacy.save(tmp_path, "test_collection")
+    load_vector_store = MagicMock()
+    monkeypatch.setattr(data_loading, "load_rental_law_vector_store", load_vector_store)
+    export = MagicMock(side_effect=lambda *args: exported.save(tmp_path, args[1]))
+    monkeypatch.setattr(data_loading, "export_memory_index", export)
+
+    index = data_loading.load_memory_index("test_collection", "other-model")
+
+    export.assert_called_once()
+    assert index.embedding_backend == "local"
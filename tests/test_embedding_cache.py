@@ -0,0 +1,65 @@
+from unittest.mock import Mock
+
+import pytest
+from langchain_openai import OpenAIEmbeddings
+
+from cache_store import CacheStore
+from embedding_cache import CachedEmbeddings
+
+
+@pytest.fixture
+def underlying_embeddings():
+    """Mock embeddings returning a distinct vector per text"""
+    embeddings = Mock(spec=OpenAIEmbeddings)
+    embeddings.embed_documents.side_effect = lambda texts: [
+        [float(len(text)), 0.5] for text in texts
+    ]
+    embeddings.embed_query.side_effect = lambda text: [float(len(text)), 0.5]
+    return embeddings
+
+
+def test_documents_are_only_embedded_once(underlying_embeddings, tmp_path):
+    cached = CachedEmbeddings(
+        underlying_embeddings, "model", CacheStore("embeddings", root=tmp_path)
+    )
+
+    first = cached.embed_documents(["§ 1.", "§ 22."])
+    second = cached.embed_documents(["§ 1.", "§ 22.", "§ 333."])
+
+    assert first == [[4.0, 0.5], [5.0, 0.5]]
+    assert second == [[4.0, 0.5], [5.0, 0.5], [6.0, 0.5]]
+    assert underlying_embeddings.embed_documents.call_args_list[1].args == (["§ 333."],)
+    assert cached.stats()["hits"] == 2
+
+
+def test_query_vectors_persist_across_instances(underlying_embeddings, tmp_path):
+    store = CacheStore("embeddings", root=tmp_path)
+    CachedEmbeddings(underlying_embeddings, "model", store).embed_query("depositum")
+
+    vector = CachedEmbeddings(underlying_embeddings, "model", store).embed_query(
+        "depositum"
+    )
+    other_model = CachedEmbeddings(underlying_embeddings, "other-model", store)
+    other_model.embed_query("depositum")
+
+    assert vector == [9.0, 0.5]
+    # Cached for "model", but embedded again for "other-model"
+    assert underlying_embeddings.embed_query.call_count == 2
+
+
+def test_vectors_are_not_shared_between_backends_or_servers(
+    underlying_embeddings, tmp_path
+):
+    store = CacheStore("embeddings", root=tmp_path)
+    setups = [
+        {"backend": "openai"},
+        {"backend": "openai", "api_base": "http://localhost:8080/v1"},
+        {"backend": "local"},
+    ]
+
+    for setup in setups:
+        CachedEmbeddings(underlying_embeddings, "model", store, **setup).embed_query(
+            "depositum"
+        )
+
+    assert underlying_embeddings.embed_query.call_count == len(setups)
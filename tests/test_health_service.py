@@ -0,0 +1,82 @@
+import threading
+from types import SimpleNamespace
+
+from flask import Flask
+from langchain_core.runnables import RunnableLambda
+from services.health_service import Readiness, register_health_routes
+from startup import LazyRAGChain
+
+from langchain.schema import Document
+
+
+def make_chain(results):
+    return SimpleNamespace(retriever=RunnableLambda(lambda question: results))
+
+
+def test_readiness_flips_after_warm_up():
+    readiness = Readiness(
+        LazyRAGChain(lambda: make_chain([Document(page_content="§ 59.")])),
+        sample_contracts=[],
+    )
+
+    assert readiness.status()["status"] == "not_started"
+    readiness.start().join(timeout=5)
+
+    assert readiness.ready
+    assert readiness.status() == {
+        "status": "ready",
+        "checks": {"index": True, "probe": True, "sample_caches": True},
+        "error": None,
+    }
+
+
+def test_readiness_retries_only_failed_steps(mocker):
+    warm_samples = mocker.patch.object(
+        Readiness, "_warm_sample_caches", side_effect=[ConnectionError("No LLM"), None]
+    )
+    readiness = Readiness(make_chain([Document(page_content="§ 59.")]))
+
+    readiness.start().join(timeout=5)
+    status = readiness.status()
+
+    assert status["status"] == "failed"
+    assert status["error"] == "No LLM"
+    assert status["checks"] == {"index": True, "probe": True, "sample_caches": False}
+
+    readiness.start().join(timeout=5)
+
+    assert readiness.ready
+    assert warm_samples.call_count == 2
+
+
+def test_readiness_fails_on_empty_probe():
+    readiness = Readiness(make_chain([]), sample_contracts=[])
+
+    readiness.start().join(timeout=5)
+
+    assert not readiness.ready
+    assert "Probe query" in readiness.error
+
+
+def test_readyz_starts_warm_up_and_reports_ready():
+    index_loaded = threading.Event()
+
+    def load_chain():
+        index_loaded.wait(timeout=5)
+        return make_chain([Document(page_content="§ 59.")])
+
+    server = Flask(__name__)
+    readiness = Readiness(LazyRAGChain(load_chain), sample_contracts=[])
+    register_health_routes(server, readiness)
+    client = server.test_client()
+
+    assert client.get("/healthz").get_json() == {"status": "ok"}
+    first = client.get("/readyz")
+    index_loaded.set()
+    readiness._thread.join(timeout=5)
+    second = client.get("/readyz")
+
+    assert first.status_code == 503
+    assert first.get_json()["status"] == "warming_up"
+    assert second.status_code == 200
+    assert second.get_json()["status"] == "ready"
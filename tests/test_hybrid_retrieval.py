@@ -0,0 +1,193 @@
+import socket
+import time
+
+import embedding_backends
+from hybrid_retrieval import (
+    BM25Index,
+    BM25Retriever,
+    HybridRetriever,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+import data_loading
+from data_loading import load_bm25_retriever
+from vector_index import MemoryVectorIndex
+from vector_store_registry import VECTOR_STORE_REGISTRY
+from retrieval_profiles import DEPOSIT_PROFILE
+from langchain_core.retrievers import BaseRetriever
+
+from langchain.schema import Document
+
+
+def make_docs():
+    return [
+        Document(
+            id="§ 1.",
+            page_content="§ 1. Lejeren betaler depositum ved indflytning.",
+            metadata={"title": "§ 1.", "parent_title": "Kapitel 1"},
+        ),
+        Document(
+            id="§ 2.",
+            page_content="§ 2. Opsigelsen skal være skriftlig.",
+            metadata={"title": "§ 2.", "parent_title": "Kapitel 2"},
+        ),
+        Document(
+            id="§ 3.",
+            page_content="§ 3. Lejen betales månedsvis forud.",
+            metadata={"title": "§ 3.", "parent_title": "Kapitel 2"},
+        ),
+    ]
+
+
+class RecordingRetriever(BaseRetriever):
+    docs: list[Document]
+    kwargs: list[dict] = []
+
+    def _get_relevant_documents(self, query, *, run_manager, **kwargs):
+        self.kwargs.append(kwargs)
+        return self.docs
+
+
+class FailingRetriever(BaseRetriever):
+    calls: int = 0
+
+    def _get_relevant_documents(self, query, *, run_manager, **kwargs):
+        self.calls += 1
+        raise ConnectionError("Embedding API unavailable")
+
+
+def test_tokenize_matches_inflected_forms():
+    assert tokenize("Opsigelsen") == tokenize("opsigelse")
+    assert tokenize("Lejeren betaler") == ["lejer", "betal"]
+
+
+def test_bm25_ranks_exact_term_first():
+    index = BM25Index(make_docs())
+
+    results = index.search("varsel for opsigelse", k=3)
+
+    assert [doc.id for doc, _ in results] == ["§ 2."]
+
+
+def test_bm25_filter_returns_matching_documents_only():
+    index = BM25Index(make_docs())
+
+    results = index.search("depositum", k=3, filter={"title": {"$in": ["§ 3."]}})
+
+    assert [doc.id for doc, _ in results] == ["§ 3."]
+
+
+def test_bm25_retriever_adds_keywords_to_query():
+    retriever = BM25Retriever(index=BM25Index(make_docs()))
+
+    docs = retriever.invoke("How much deposit?", keywords=["depositum"])
+
+    assert [doc.id for doc in docs] == ["§ 1."]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = make_docs()
+
+    fused = reciprocal_rank_fusion([[a, b], [c, b]])
+
+    assert [doc.id for doc in fused] == ["§ 2.", "§ 1.", "§ 3."]
+
+
+def test_hybrid_retriever_passes_keywords_to_keyword_retrievers_only():
+    dense = RecordingRetriever(docs=make_docs()[2:], kwargs=[])
+    retriever = HybridRetriever(
+        retrievers=[BM25Retriever(index=BM25Index(make_docs())), dense],
+        search_kwargs={"k": 2},
+    )
+
+    docs = retriever.invoke("How much deposit?", keywords=["depositum"])
+
+    assert [doc.id for doc in docs] == ["§ 1.", "§ 3."]
+    assert dense.kwargs == [{"k": 20}]
+
+
+def test_hybrid_retriever_falls_back_when_a_retriever_fails():
+    failing = FailingRetriever()
+    retriever = HybridRetriever(
+        retrievers=[failing, BM25Retriever(index=BM25Index(make_docs()))]
+    )
+
+    assert [doc.id for doc in retriever.invoke("depositum")] == ["§ 1."]
+    assert [doc.id for doc in retriever.invoke("opsigelse")] == ["§ 2."]
+    # Skipped while it is marked unavailable
+    assert failing.calls == 1
+
+
+def test_bm25_retriever_over_rental_law_finds_deposit_paragraph():
+    retriever = load_bm25_retriever()
+
+    docs = retriever.invoke(
+        "What is the maximum deposit?",
+        **DEPOSIT_PROFILE.search_kwargs(keywords=True),
+    )
+
+    assert "§ 59." in [doc.id for doc in docs]
+    assert all(doc.metadata["parent_title"] == "Kapitel 6" for doc in docs)
+
+
+def test_hybrid_retriever_searches_bm25_over_its_own_collection(monkeypatch, tmp_path):
+    monkeypatch.setattr(data_loading, "VECTOR_STORE_DIR", tmp_path)
+    docs = make_docs()
+    VECTOR_STORE_REGISTRY.get_client(tmp_path).create_collection("other_act").add(
+        ids=[doc.id for doc in docs],
+        documents=[doc.page_content for doc in docs],
+        metadatas=[doc.metadata for doc in docs],
+        embeddings=[[float(i), 1.0] for i in range(len(docs))],
+    )
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("Embedding API unavailable")
+
+    monkeypatch.setattr(data_loading, "load_memory_retriever", unavailable)
+    try:
+        retriever = data_loading.load_hybrid_retriever("other_act", k=2)
+        default = load_bm25_retriever(k=2)
+
+        assert [doc.id for doc in retriever.invoke("opsigelse")] == ["§ 2."]
+        assert default.index is not retriever.index
+        assert "§ 59." in [doc.id for doc in default.invoke("depositum")]
+    finally:
+        VECTOR_STORE_REGISTRY.clear()
+
+
+def test_hybrid_retriever_answers_from_bm25_when_embeddings_are_unreachable(
+    monkeypatch, tmp_path
+):
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(
+        embedding_backends, "EMBEDDING_API_BASE", f"http://127.0.0.1:{port}/v1"
+    )
+    monkeypatch.setattr(data_loading, "EMBEDDING_BACKEND", "openai")
+    monkeypatch.setattr(data_loading, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(data_loading, "VECTOR_STORE_DIR", tmp_path)
+    docs = make_docs()
+    vectors = [[float(i), 1.0] for i in range(len(docs))]
+    VECTOR_STORE_REGISTRY.get_client(tmp_path).create_collection("other_act").add(
+        ids=[doc.id for doc in docs],
+        documents=[doc.page_content for doc in docs],
+        metadatas=[doc.metadata for doc in docs],
+        embeddings=vectors,
+    )
+    MemoryVectorIndex.from_vectors(
+        vectors, [doc.id for doc in docs], docs, "text-embedding-3-small", "openai"
+    ).save(tmp_path, "other_act")
+    try:
+        retriever = data_loading.load_hybrid_retriever(
+            "other_act", "text-embedding-3-small", k=2
+        )
+        start = time.perf_counter()
+        docs = retriever.invoke("opsigelse")
+
+        assert isinstance(retriever, HybridRetriever)
+        assert [doc.id for doc in docs] == ["§ 2."]
+        assert time.perf_counter() - start < 1.0  # No retries with backoff
+    finally:
+        VECTOR_STORE_REGISTRY.clear()
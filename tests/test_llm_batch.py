@@ -0,0 +1,178 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from langchain.schema import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from cache_store import CacheStore, ModelCache, SemanticAnswerCache
+from contract_loader import ContractInfo, RentalContract
+from llm_batch import (
+    LocalBatchBackend,
+    answer_questions_in_batch,
+    extract_contract_infos_in_batch,
+    make_batch_request,
+    read_batch_output,
+    run_batch,
+)
+from rag import LLMOutput, RAGChain
+from services.validation_service import validate_contract_infos_in_batch
+from tests.test_validation_service import _contract_info
+
+ANSWER = LLMOutput(
+    should_be_checked=False,
+    description="The terms follow the rental law.",
+    references={"§ 50": "15"},
+)
+
+
+@pytest.fixture
+def rag_chain(tmp_path):
+    """RAGChain whose LLM must never be called directly, with an answer cache"""
+    return RAGChain(
+        retriever=RunnableLambda(
+            lambda question, **kwargs: [Document(id="§ 50", page_content="§ 50.")]
+        ),
+        llm=FakeListChatModel(responses=[]),
+        answer_cache=SemanticAnswerCache(
+            CacheStore("answers", root=tmp_path), LLMOutput
+        ),
+    )
+
+
+@pytest.fixture
+def backend():
+    return LocalBatchBackend(FakeListChatModel(responses=[ANSWER.model_dump_json()]))
+
+
+def test_run_batch_returns_answers_by_custom_id(tmp_path):
+    backend = LocalBatchBackend(FakeListChatModel(responses=["first", "second"]))
+    requests = [
+        make_batch_request(f"request-{i}", [HumanMessage(f"Question {i}")])
+        for i in range(2)
+    ]
+
+    answers, errors = run_batch(requests, backend, work_dir=tmp_path)
+
+    assert answers == {"request-0": "first", "request-1": "second"}
+    assert errors == {}
+    input_path = next(tmp_path.glob("*-input.jsonl"))
+    batch_request = json.loads(input_path.read_text().splitlines()[0])
+    assert batch_request["url"] == "/v1/chat/completions"
+    assert batch_request["body"]["messages"] == [
+        {"role": "user", "content": "Question 0"}
+    ]
+
+
+def test_read_batch_output_collects_errors(tmp_path):
+    output_path = tmp_path / "output.jsonl"
+    lines = [
+        {
+            "custom_id": "failed",
+            "response": None,
+            "error": {"code": "server_error", "message": "Server error"},
+        },
+        {
+            "custom_id": "rate_limited",
+            "response": {
+                "status_code": 429,
+                "body": {"error": {"message": "Rate limit reached"}},
+            },
+            "error": None,
+        },
+    ]
+    output_path.write_text("\n".join(json.dumps(line) for line in lines))
+
+    answers, errors = read_batch_output(output_path)
+
+    assert answers == {}
+    assert errors == {"failed": "Server error", "rate_limited": "Rate limit reached"}
+
+
+def test_extract_contract_infos_in_batch_caches_results(tmp_path):
+    contract_info = _contract_info()
+    backend = LocalBatchBackend(
+        FakeListChatModel(responses=[contract_info.model_dump_json()])
+    )
+    contracts = {"contract": RentalContract(text="Lejekontrakt", file_name="a.pdf")}
+
+    with patch(
+        "llm_batch.CONTRACT_INFO_CACHE",
+        ModelCache(CacheStore("extractions", root=tmp_path), ContractInfo),
+    ):
+        first, _ = extract_contract_infos_in_batch(
+            contracts, backend, work_dir=tmp_path
+        )
+        with patch.object(backend, "submit") as submit:
+            second, _ = extract_contract_infos_in_batch(
+                contracts, backend, work_dir=tmp_path
+            )
+
+    assert first == second == {"contract": contract_info}
+    submit.assert_not_called()
+
+
+def test_answer_questions_in_batch_reuses_cached_answers(rag_chain, backend, tmp_path):
+    questions = {"q1": "Is a deposit of 6000 DKK legal?"}
+
+    first, _ = answer_questions_in_batch(
+        rag_chain, questions, backend, work_dir=tmp_path
+    )
+
+    assert first == {"q1": ANSWER}
+    assert rag_chain.ask(questions["q1"]) == ANSWER
+
+
+def test_validate_contract_infos_in_batch_only_sends_llm_questions(
+    rag_chain, backend, tmp_path
+):
+    contract_infos = {"a": _contract_info(), "b": _contract_info()}
+    contract_infos["b"].termination_conditions = "1 month notice"
+
+    with patch.object(backend, "submit", wraps=backend.submit) as submit:
+        results, errors = validate_contract_infos_in_batch(
+            rag_chain, contract_infos, backend, work_dir=tmp_path
+        )
+
+    # Deposit and prepaid rent are checked arithmetically
+    input_path = submit.call_args.args[0]
+    assert len(input_path.read_text().splitlines()) == 4
+    assert errors == {}
+    assert list(results["a"]) == [
+        "deposit_result",
+        "prepaid_result",
+        "termination_result",
+        "price_adjustment_result",
+    ]
+    assert results["b"]["termination_result"] == ANSWER
+    assert results["b"]["deposit_result"].references == {"§ 59, stk. 1": "18"}
+
+
+def test_validate_contract_infos_in_batch_reports_every_failed_question(
+    rag_chain, backend
+):
+    contract_infos = {"a": _contract_info(), "b": _contract_info()}
+    answer_errors = {
+        "a:termination_result": "Rate limited",
+        "a:price_adjustment_result": "Malformed answer",
+    }
+    answers = {
+        "b:termination_result": ANSWER,
+        "b:price_adjustment_result": ANSWER,
+    }
+
+    with patch(
+        "services.validation_service.answer_questions_in_batch",
+        return_value=(answers, answer_errors),
+    ):
+        results, errors = validate_contract_infos_in_batch(
+            rag_chain, contract_infos, backend
+        )
+
+    assert errors == {
+        "a": "termination_result: Rate limited; "
+        "price_adjustment_result: Malformed answer"
+    }
+    assert list(results) == ["b"]
@@ -1,9 +1,17 @@
 import pytest
 from unittest.mock import Mock
 from langchain.schema import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
 from langchain_openai import OpenAIEmbeddings
-from rag import RAGChain, validate_deposit_amount, LLMOutput
+from cache_store import CacheStore, SemanticAnswerCache
+from rag import RAGChain, build_context, validate_deposit_amount, LLMOutput
 from contract_loader import load_contract_and_extract_info
+from data_loading import export_memory_index
+from retrieval_profiles import RetrievalProfile
+from vector_index import MemoryVectorIndex, MemoryVectorRetriever
 
 
 @pytest.fixture
@@ -77,3 +85,140 @@ def test_load_and_extract_contract_info_deposit_incorrect(rag_chain):
     )
 
     assert deposit_answer.should_be_checked is True
+
+
+@pytest.fixture
+def cached_rag_chain(sample_documents, tmp_path):
+    """RAGChain with a fake retriever and LLM, and an answer cache in tmp_path"""
+    for i, doc in enumerate(sample_documents):
+        doc.id = f"doc-{i}"
+    answer = LLMOutput(
+        should_be_checked=False,
+        description="A deposit of up to 3 months rent is legal.",
+        references={"§ 50": "15"},
+    )
+    llm = FakeListChatModel(responses=[answer.model_dump_json()] * 10)
+    answer_cache = SemanticAnswerCache(
+        CacheStore("answers", root=tmp_path), LLMOutput, similarity_threshold=0.9
+    )
+    return RAGChain(
+        retriever=RunnableLambda(lambda question, **kwargs: sample_documents),
+        llm=llm,
+        answer_cache=answer_cache,
+    )
+
+
+def test_rag_chain_reuses_cached_answers(cached_rag_chain):
+    question = "Is a deposit of 12000 DKK legal for a rental property with monthly rent of 4000 DKK?"
+
+    first = cached_rag_chain.ask(question)
+    second = cached_rag_chain.ask(
+        "  is a deposit of 12000 DKK legal for a rental property with monthly rent of 4000 DKK "
+    )
+
+    assert isinstance(first, LLMOutput)
+    assert second == first
+    assert cached_rag_chain.llm.i == 1  # Only the first question reached the LLM
+    assert cached_rag_chain.answer_cache.answers.stats()["memory_hits"] == 1
+
+
+def test_similar_questions_with_different_numbers_are_not_reused(cached_rag_chain):
+    cache = cached_rag_chain.answer_cache
+    cached_rag_chain.ask(
+        "Is a deposit of 12000 DKK legal for a rental property with monthly rent of 4000 DKK?"
+    )
+
+    context_key = next(iter(cache._questions))
+    similar = "Is a deposit of 12000 DKK legal for a rented property with monthly rent of 4000 DKK?"
+    different_amount = "Is a deposit of 13000 DKK legal for a rental property with monthly rent of 4000 DKK?"
+
+    assert cache.get(similar, context_key) is not None
+    assert cache.get(different_amount, context_key) is None
+
+
+def test_parseable_deposit_is_checked_without_the_llm():
+    rag_chain = Mock(spec=RAGChain)
+
+    answer = validate_deposit_amount(
+        rag_chain, deposit_amount="50000 DKK", monthly_rental_amount="4000 DKK"
+    )
+
+    assert isinstance(answer, LLMOutput)
+    assert answer.should_be_checked is True
+    rag_chain.ask.assert_not_called()
+
+
+def test_build_context_cites_and_dedupes_paragraphs(sample_documents):
+    duplicate = Document(page_content=sample_documents[0].page_content)
+
+    context, stats = build_context(
+        [sample_documents[2], sample_documents[0], duplicate], max_tokens=1000
+    )
+
+    assert context.startswith("[page 16]\n§ 50. Maximum deposit")
+    assert context.count("§ 1. This law applies") == 1
+    assert stats["included"] == 2
+    assert stats["context_tokens"] <= 1000
+
+
+def test_build_context_trims_paragraphs_to_the_budget():
+    long_paragraph = Document(
+        page_content="§ 59. Udlejeren kan kræve depositum. "
+        + " ".join(
+            f"Stk. {i}. Bestemmelse om vedligeholdelse nummer {i}."
+            for i in range(2, 40)
+        )
+        + " Stk. 40. Forudbetalt leje må ikke overstige 3 måneders leje.",
+        metadata={"title": "§ 59.", "parent_title": "Kapitel 6", "page": 17},
+    )
+
+    context, stats = build_context(
+        [long_paragraph],
+        question="Is a prepaid rent (forudbetalt leje) legal?",
+        max_tokens=60,
+    )
+
+    assert context.startswith("[§ 59. | Kapitel 6 | page 18]\n§ 59. Udlejeren")
+    assert "Stk. 40. Forudbetalt leje" in context
+    assert "[...]" in context
+    assert stats["context_tokens"] <= 60
+    assert stats["saved_tokens"] > 0
+
+
+def test_retrieval_profiles_filter_and_pin_on_both_backends(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=32)
+    documents = [
+        Document(
+            id=f"§ {i}.",
+            page_content=f"§ {i}. Paragraph about renting number {i}.",
+            metadata={"title": f"§ {i}.", "parent_title": f"Kapitel {i % 3}"},
+        )
+        for i in range(1, 31)
+    ]
+    vector_store = Chroma.from_documents(
+        documents=documents,
+        embedding=embeddings,
+        collection_name="test_collection",
+        persist_directory=str(tmp_path / "chroma"),
+    )
+    export_memory_index(
+        vector_store, "test_collection", "fake-model", directory=tmp_path
+    )
+    memory_retriever = MemoryVectorRetriever(
+        index=MemoryVectorIndex.load(tmp_path, "test_collection"), embeddings=embeddings
+    )
+    profile = RetrievalProfile(chapters=["Kapitel 1"], pinned=["§ 2."], k=3)
+    question = "§ 7. Paragraph about renting number 7."
+
+    retrieved = [
+        RAGChain(
+            retriever=retriever, llm=FakeListChatModel(responses=[]), answer_cache=None
+        ).retrieve_documents(question, profile)
+        for retriever in (vector_store.as_retriever(), memory_retriever)
+    ]
+
+    chroma_ids = [doc.id for doc in retrieved[0]]
+    assert chroma_ids == [doc.id for doc in retrieved[1]]
+    assert chroma_ids[:2] == ["§ 2.", "§ 7."]
+    assert len(chroma_ids) == 4
+    assert all(doc.metadata["parent_title"] == "Kapitel 1" for doc in retrieved[0][1:])
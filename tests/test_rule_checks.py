@@ -0,0 +1,65 @@
+import pytest
+
+from rule_checks import (
+    check_deposit_amount,
+    check_prepaid_rent,
+    parse_amount,
+    parse_months,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("6000 DKK", 6000),
+        ("9000 kr", 9000),
+        ("3000 kr.", 3000),
+        ("kr. 12.000,00", 12000),
+        ("12.000,- kr", 12000),
+        ("DKK 12,000.00", 12000),
+        ("12 000 kr.", 12000),
+        ("3.000,50 kr.", 3000.5),
+        ("4000", 4000),
+        ("Ingen", 0),
+    ],
+)
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["Not specified", "6000 DKK (2 months)", "3000 kr. + 500 kr. aconto", "Se § 11"],
+)
+def test_parse_amount_rejects_ambiguous_text(text):
+    assert parse_amount(text) is None
+
+
+def test_parse_months():
+    assert parse_months("3 måneders leje") == 3
+    assert parse_months("2 months rent") == 2
+    assert parse_months("9000 kr") is None
+
+
+def test_check_deposit_amount():
+    legal = check_deposit_amount("9000 kr", "3000 kr")
+    illegal = check_deposit_amount("kr. 12.000,00", "3000 kr.")
+
+    assert legal["should_be_checked"] is False
+    assert illegal["should_be_checked"] is True
+    assert "§ 59, stk. 1" in illegal["references"]
+
+
+def test_check_prepaid_rent():
+    assert (
+        check_prepaid_rent("3 måneders leje", "Not specified")["should_be_checked"]
+        is False
+    )
+    assert (
+        check_prepaid_rent("4 måneders leje", "4000 DKK")["should_be_checked"] is True
+    )
+
+
+def test_unparseable_amounts_are_left_to_the_llm():
+    assert check_deposit_amount("Not specified", "3000 kr") is None
+    assert check_prepaid_rent("9000 kr", "Se kontraktens § 3") is None
@@ -0,0 +1,39 @@
+import pytest
+from startup import LazyRAGChain, import_time_report
+
+
+def test_lazy_rag_chain_retries_a_failed_build():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("Vector store unavailable")
+        return "chain"
+
+    rag_chain = LazyRAGChain(factory)
+    rag_chain.warm_up().join(timeout=5)
+
+    assert not rag_chain.ready
+    assert rag_chain.error == "Vector store unavailable"
+    assert rag_chain.get() == "chain"
+    assert rag_chain.error is None
+    assert len(attempts) == 2
+
+
+def test_lazy_rag_chain_raises_build_errors_on_use():
+    def factory():
+        raise ConnectionError("Vector store unavailable")
+
+    rag_chain = LazyRAGChain(factory)
+
+    with pytest.raises(ConnectionError):
+        rag_chain.ask("What is the maximum deposit?")
+
+
+def test_import_time_report_lists_slowest_imports_first():
+    report = import_time_report("config", top=5)
+
+    assert "config" in [row["module"] for row in report]
+    seconds = [row["cumulative_seconds"] for row in report]
+    assert seconds == sorted(seconds, reverse=True)
@@ -0,0 +1,263 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from contract_loader import ContractInfo, hash_file_contents
+from services.job_service import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_RUNNING,
+    JobStore,
+    submit_validation_job,
+)
+from config import VALIDATION_MAX_CONCURRENCY
+from services.validation_service import (
+    InFlightRegistry,
+    iter_shared_contract_validation,
+    run_validation_checks,
+    validate_contract_file,
+)
+
+
+def _contract_info():
+    return ContractInfo(
+        landlord="John Doe",
+        tenant="Maria Smith",
+        monthly_rental_amount="3000 DKK",
+        payment_terms="First of each month",
+        rental_type="Ejerlejlighed",
+        property_address="Street 123, City, ZIP",
+        lease_start_date="2023-01-01",
+        lease_duration="12 months",
+        termination_conditions="3 months notice",
+        price_adjustments="Rent can be adjusted annually based on CPI",
+        deposit_amount="6000 DKK",
+        prepaid_rent="3000 DKK",
+        amenities="Parking",
+    )
+
+
+def test_run_validation_checks_runs_concurrently():
+    """All checks must be in flight at the same time in concurrent mode."""
+    barrier = threading.Barrier(4, timeout=5)
+
+    def check(value):
+        barrier.wait()
+        return value
+
+    checks = {f"check_{i}": (lambda i=i: check(i)) for i in range(4)}
+    results = run_validation_checks(checks, concurrent=True, max_concurrency=4)
+
+    assert results == {"check_0": 0, "check_1": 1, "check_2": 2, "check_3": 3}
+
+
+def test_run_validation_checks_respects_concurrency_cap():
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def check():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        threading.Event().wait(0.05)
+        with lock:
+            in_flight -= 1
+        return True
+
+    checks = {f"check_{i}": check for i in range(6)}
+    results = run_validation_checks(checks, concurrent=True, max_concurrency=2)
+
+    assert all(results.values())
+    assert peak <= 2
+
+
+def test_concurrent_validations_share_the_concurrency_cap():
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def check():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        threading.Event().wait(0.05)
+        with lock:
+            in_flight -= 1
+        return True
+
+    checks = {f"check_{i}": check for i in range(VALIDATION_MAX_CONCURRENCY)}
+    validations = [
+        threading.Thread(target=run_validation_checks, args=(checks, True))
+        for _ in range(3)
+    ]
+    for validation in validations:
+        validation.start()
+    for validation in validations:
+        validation.join()
+
+    assert peak <= VALIDATION_MAX_CONCURRENCY
+
+
+def test_validate_contract_file_keeps_result_keys():
+    rag_chain = MagicMock()
+    rag_chain.ask.side_effect = lambda question, profile=None: question
+
+    with patch(
+        "services.validation_service.load_contract_and_extract_info",
+        return_value=_contract_info(),
+    ):
+        sequential = validate_contract_file(rag_chain, "contract.pdf", concurrent=False)
+        concurrent = validate_contract_file(rag_chain, "contract.pdf", concurrent=True)
+
+    assert list(sequential) == [
+        "contract_info",
+        "deposit_result",
+        "prepaid_result",
+        "termination_result",
+        "price_adjustment_result",
+    ]
+    assert sequential == concurrent
+    assert concurrent["deposit_result"].should_be_checked is False
+    assert "3 months notice" in concurrent["termination_result"]
+
+
+def test_validation_job_stores_results_as_they_finish(tmp_path, mocker):
+    job_store = JobStore(tmp_path / "jobs.sqlite3")
+    contract_info = _contract_info()
+    mocker.patch(
+        "services.job_service.iter_shared_contract_validation",
+        return_value=iter(
+            [("contract_info", contract_info), ("termination_result", "Legal")]
+        ),
+    )
+
+    job_id = submit_validation_job(MagicMock(), "contract.pdf", job_store=job_store)
+    for _ in range(100):
+        job = job_store.get(job_id)
+        if job["status"] != JOB_RUNNING:
+            break
+        time.sleep(0.05)
+
+    assert job["status"] == JOB_DONE
+    assert job["results"] == {
+        "contract_info": contract_info.model_dump(),
+        "termination_result": "Legal",
+    }
+
+
+def test_validation_job_records_errors(tmp_path, mocker):
+    job_store = JobStore(tmp_path / "jobs.sqlite3")
+    mocker.patch(
+        "services.job_service.iter_shared_contract_validation",
+        side_effect=ValueError("Could not read contract"),
+    )
+
+    job_id = submit_validation_job(MagicMock(), "contract.pdf", job_store=job_store)
+    for _ in range(100):
+        job = job_store.get(job_id)
+        if job["status"] != JOB_RUNNING:
+            break
+        time.sleep(0.05)
+
+    assert job["status"] == JOB_FAILED
+    assert job["error"] == "Could not read contract"
+
+
+def test_identical_validations_share_one_run(tmp_path):
+    registry = InFlightRegistry()
+    rag_chain = MagicMock()
+    rag_chain.ask.side_effect = lambda question, profile=None: question
+    extraction_started = threading.Event()
+    release = threading.Event()
+    extractions = []
+
+    def extract(file_path):
+        extractions.append(file_path)
+        extraction_started.set()
+        release.wait(timeout=5)
+        return _contract_info()
+
+    sample = tmp_path / "contract.pdf"
+    sample.write_bytes(b"%PDF-1.4 contract")
+    copy = tmp_path / "upload_1234.pdf"
+    copy.write_bytes(b"%PDF-1.4 contract")
+
+    results = {}
+
+    def validate(name, file_path):
+        results[name] = dict(
+            iter_shared_contract_validation(
+                rag_chain, str(file_path), registry=registry
+            )
+        )
+
+    with patch("services.validation_service.load_contract_and_extract_info", extract):
+        leader = threading.Thread(target=validate, args=("leader", sample))
+        leader.start()
+        assert extraction_started.wait(timeout=5)
+        followers = [
+            threading.Thread(target=validate, args=(f"follower_{i}", path))
+            for i, path in enumerate([sample, copy, sample])
+        ]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.05)  # Let the followers join the running validation
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(timeout=5)
+
+    assert len(extractions) == 1
+    assert len(results) == 4
+    assert all(result == results["leader"] for result in results.values())
+    assert "termination_result" in results["leader"]
+    assert (hash_file_contents(str(sample)), id(rag_chain)) not in registry
+
+
+def test_followers_receive_the_error_of_a_failed_validation():
+    registry = InFlightRegistry()
+    started = threading.Event()
+    release = threading.Event()
+
+    def run():
+        yield "contract_info", "info"
+        started.set()
+        release.wait(timeout=5)
+        raise ValueError("Could not read contract")
+
+    errors = []
+
+    def follow():
+        stages = []
+        try:
+            for stage in registry.iter_validation(("hash",), run):
+                stages.append(stage)
+        except ValueError as e:
+            errors.append((stages, str(e)))
+
+    leader = threading.Thread(target=follow)
+    leader.start()
+    assert started.wait(timeout=5)
+    follower = threading.Thread(target=follow)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+
+    assert errors == [([("contract_info", "info")], "Could not read contract")] * 2
+    assert ("hash",) not in registry
+
+
+def test_a_finished_validation_is_run_again():
+    registry = InFlightRegistry()
+    runs = []
+
+    def run():
+        runs.append(1)
+        yield "contract_info", len(runs)
+
+    assert list(registry.iter_validation(("hash",), run)) == [("contract_info", 1)]
+    assert list(registry.iter_validation(("hash",), run)) == [("contract_info", 2)]
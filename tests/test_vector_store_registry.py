@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+from vector_store_registry import VectorStoreRegistry
+import data_loading
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+
+def test_concurrent_gets_create_the_resource_once():
+    registry = VectorStoreRegistry()
+    calls = []
+
+    def factory():
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get(("a",), factory)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_failed_factory_is_retried():
+    registry = VectorStoreRegistry()
+
+    def failing():
+        raise ConnectionError("Unavailable")
+
+    with pytest.raises(ConnectionError):
+        registry.get(("a",), failing)
+
+    assert registry.get(("a",), lambda: "created") == "created"
+
+
+def test_discard_forgets_keys_with_prefix():
+    registry = VectorStoreRegistry()
+    registry.get(("index", "dir", "law_2025"), object)
+    registry.get(("index", "dir", "law_2024"), object)
+    registry.get(("client", "dir"), object)
+
+    assert registry.discard("index", "dir") == 2
+    assert ("client", "dir") in registry
+    assert ("index", "dir", "law_2025") not in registry
+
+
+def test_client_is_shared_per_directory(tmp_path):
+    registry = VectorStoreRegistry()
+
+    client = registry.get_client(tmp_path)
+
+    assert registry.get_client(tmp_path / ".") is client
+    assert registry.get_client(tmp_path / "other") is not client
+
+
+def test_vector_store_is_shared_across_loads(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        data_loading, "get_embeddings", lambda model: DeterministicFakeEmbedding(size=8)
+    )
+
+    vector_store = data_loading.get_vector_store(
+        "test_collection", "fake-model", tmp_path
+    )
+
+    assert (
+        data_loading.get_vector_store("test_collection", "fake-model", tmp_path)
+        is vector_store
+    )
+    assert (
+        data_loading.get_vector_store("other_collection", "fake-model", tmp_path)
+        is not vector_store
+    )
+    assert vector_store._client is data_loading.VECTOR_STORE_REGISTRY.get_client(
+        tmp_path
+    )
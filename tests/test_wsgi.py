@@ -0,0 +1,86 @@
+from unittest.mock import MagicMock, patch
+
+import chromadb
+import pytest
+from cache_store import CacheStore
+from vector_store_registry import VECTOR_STORE_REGISTRY
+import wsgi
+
+
+@pytest.fixture
+def mock_rag_chain():
+    with (
+        patch("app.create_rag_chain") as mock,
+        patch("services.health_service.Readiness.start") as start,
+    ):
+        mock.return_value = MagicMock()
+        yield start
+    VECTOR_STORE_REGISTRY.clear()
+
+
+def test_create_server_returns_the_flask_server(mock_rag_chain):
+    server = wsgi.create_server(preload=False)
+
+    response = server.test_client().get("/healthz")
+
+    assert response.status_code == 200
+    assert not mock_rag_chain.called  # Nothing is built before forking
+
+
+def test_preload_keeps_indexes_and_drops_fork_unsafe_resources(tmp_path):
+    def load_retriever():
+        VECTOR_STORE_REGISTRY.get(("bm25_index", "law.pdf"), object)
+        VECTOR_STORE_REGISTRY.get(("client", "vector_stores"), object)
+        VECTOR_STORE_REGISTRY.get(("embeddings", "openai", "model"), object)
+
+    with (
+        patch.object(wsgi, "CACHE_STORES", {"ocr": CacheStore("ocr", root=tmp_path)}),
+        patch.object(wsgi, "VECTOR_STORE_DIR", tmp_path / "vector_stores"),
+        patch("data_loading.load_rental_law_retriever", load_retriever),
+    ):
+        wsgi.preload_resources()
+
+    assert (tmp_path / "ocr").is_dir()
+    assert ("bm25_index", "law.pdf") in VECTOR_STORE_REGISTRY
+    assert ("client", "vector_stores") not in VECTOR_STORE_REGISTRY
+    assert ("embeddings", "openai", "model") not in VECTOR_STORE_REGISTRY
+    VECTOR_STORE_REGISTRY.clear()
+
+
+def test_preload_failure_leaves_loading_to_the_workers(tmp_path):
+    def load_retriever():
+        VECTOR_STORE_REGISTRY.get(("client", "vector_stores"), object)
+        raise ConnectionError("Embedding API unavailable")
+
+    with (
+        patch.object(wsgi, "CACHE_STORES", {}),
+        patch.object(wsgi, "VECTOR_STORE_DIR", tmp_path / "vector_stores"),
+        patch("data_loading.load_rental_law_retriever", load_retriever),
+    ):
+        wsgi.preload_resources()
+
+    assert ("client", "vector_stores") not in VECTOR_STORE_REGISTRY
+
+
+@pytest.mark.parametrize("startup, warms_up", [("background", True), ("lazy", False)])
+def test_start_worker_warms_up_unless_lazy(mock_rag_chain, startup, warms_up):
+    wsgi.create_server(preload=False)
+
+    with patch.object(wsgi, "RAG_CHAIN_STARTUP", startup):
+        wsgi.start_worker()
+
+    assert mock_rag_chain.called == warms_up
+
+
+def test_workers_open_their_own_chroma_system(monkeypatch, tmp_path):
+    monkeypatch.setattr(wsgi, "_app", None)  # Only the fork-unsafe resources
+    inherited = VECTOR_STORE_REGISTRY.get_client(tmp_path)
+    inherited_system = inherited._system  # Looked up in Chroma's class-level cache
+
+    wsgi.start_worker()
+    reopened = VECTOR_STORE_REGISTRY.get_client(tmp_path)
+
+    assert reopened is not inherited
+    assert reopened._system is not inherited_system
+    assert chromadb.PersistentClient(path=str(tmp_path))._system is reopened._system
+    VECTOR_STORE_REGISTRY.clear()